@@ -0,0 +1,48 @@
+# Standard library imports
+import argparse
+from pathlib import Path
+
+# Local application imports
+from simulation.data_loader import build_gt_store, load_gt_store
+
+NETWORK_NAMES = ["1ramp", "2corridor", "3junction", "4smallRegion", "5fullRegion"]
+
+# =====================
+# Set Project Base Path
+# =====================
+
+project_root = Path(__file__).resolve().parent.parent
+base_path = str(project_root)
+
+
+def main():
+    """
+    Pack the ground-truth sensor CSV files into one memory-mapped array per network.
+
+    Writes sensor_data/gt_store_<network>.npy (dates x hours x sensors, NaN where there is no
+    data) and sensor_data/gt_store_<network>.json (axis labels and the row order of every GT file).
+    Once a store exists, GT is read from it instead of the CSV files; rerun this script after
+    changing sensor_data.
+    """
+    parser = argparse.ArgumentParser(description="Build the memory-mapped ground-truth sensor stores")
+    parser.add_argument(
+        "--network_name",
+        type=str,
+        nargs="+",
+        default=NETWORK_NAMES,
+        choices=NETWORK_NAMES,
+        help="Networks to build (default: all)",
+    )
+    args = parser.parse_args()
+
+    for network_name in args.network_name:
+        array_file, _ = build_gt_store(base_path, network_name)
+        gt_store = load_gt_store(base_path, network_name)
+        print(
+            f"[Saved] {array_file} | {len(gt_store.dates)} dates x {len(gt_store.hours)} hours "
+            f"x {len(gt_store.link_ids)} sensors"
+        )
+
+
+if __name__ == "__main__":
+    main()
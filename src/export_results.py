@@ -0,0 +1,32 @@
+# Standard library imports
+import argparse
+from pathlib import Path
+
+# Local application imports
+from utils.results_store import open_results_store
+
+
+def main():
+    """
+    Export the result CSV files of a full optimization run from its results store.
+
+    Useful while a run is in progress, since data_set.csv, sensor_flow_simul.csv and
+    model_run_time.csv are otherwise only written at the end of the run (or every
+    `export_csv_every` epochs).
+    """
+    parser = argparse.ArgumentParser(description="Export result CSV files from a run's results store")
+    parser.add_argument(
+        "path_result",
+        type=str,
+        help="Result directory of the run (e.g., output/full_optimization/<run>/result)",
+    )
+    args = parser.parse_args()
+
+    results_store = open_results_store(Path(args.path_result))
+    results_store.export_csv(args.path_result)
+    results_store.close()
+    print(f"[Saved] Result CSV files in {args.path_result}")
+
+
+if __name__ == "__main__":
+    main()
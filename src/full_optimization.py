@@ -1,5 +1,6 @@
 # Standard library imports
 import argparse
+import multiprocessing as mp
 import os
 import pprint
 import sys
@@ -16,7 +17,9 @@ from botorch.exceptions import BadInitialCandidatesWarning
 # Local application imports
 from optimizers.initial_search import run_initial_search_procedure
 from optimizers.optimization_loop import run_optimization_loop
-from simulation.data_loader import load_config_full_opt, od_xml_to_df
+from simulation.data_loader import load_config_full_opt, load_sensor_gt, od_xml_to_df
+from simulation.sumo_runner import create_sensor_additional_xml
+from simulation.worker_pool import create_evaluation_pool
 from utils.params import get_params
 from utils.path_utils import prepare_run_paths
 from utils.plot_utils import save_convergence_plot, save_fit_to_gt_plots
@@ -119,6 +122,11 @@ def main():
         default=6,
         help="Maximum number of CPU cores for parallel processing",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted optimization from its last completed epoch",
+    )
     args = parser.parse_args()
     print(args)
 
@@ -141,6 +149,7 @@ def main():
         model_name=args.model_name,
         config_file_name=f"sim_setup_network_{args.network_name}.json",
     )
+    config["seed"] = seed
     pprint.pprint(dict(config))
 
     # =====================
@@ -163,8 +172,7 @@ def main():
     routes_df = pd.read_csv(routes_csv, index_col=0)
 
     # Load ground-truth sensor flow data
-    true_sensor_file_name = f"gt_link_data_{network_name}_{date}_{hour}.csv"
-    sensor_flow_gt = pd.read_csv(base_path + f"/sensor_data/{date}/" + true_sensor_file_name)
+    sensor_flow_gt = load_sensor_gt(base_path, network_name, date, hour)
 
     # Extract the list of links where sensors are located
     link_selection = sensor_flow_gt["link_id"].tolist()
@@ -187,7 +195,7 @@ def main():
     # =====================
 
     # Set up initial search paths
-    path_init_detail, path_init_simul, path_init_result, init_existence = prepare_run_paths(
+    path_init_detail, path_init_simul, path_init_result, _ = prepare_run_paths(
         config["path_init"], date, hour, routes_per_od, seed
     )
 
@@ -196,57 +204,76 @@ def main():
         config["path_opt"], date, hour, routes_per_od, seed
     )
 
+    # Restrict SUMO edgeData output to the sensor links of this run
+    config["additional_xml"] = create_sensor_additional_xml(
+        config["additional_xml"],
+        link_selection,
+        config["sensor_start_time"],
+        config["sensor_end_time"],
+        Path(base_path, path_init_detail, "additional_sensors.xml"),
+    )
+
     # =====================
     # Run initial search and optimization model
     # =====================
 
-    # Run initial search procedure
-    data_set_init_search = run_initial_search_procedure(
-        config=config,
-        model_name=model_name,
-        dim_od=dim_od,
-        bounds=bounds,
-        dtype=dtype,
-        device=device,
-        seed=seed,
-        n_init_search=n_init_search,
-        cpu_max=cpu_max,
-        od_df_base=od_df_base,
-        base_path=base_path,
-        routes_df=routes_df,
-        routes_per_od=routes_per_od,
-        sensor_flow_gt=sensor_flow_gt,
-        link_selection=link_selection,
-        path_init_detail=path_init_detail,
-        path_init_simul=path_init_simul,
-        path_init_result=path_init_result,
-        init_existence=init_existence,
-    )
-
-    # Run optimization loop
-    if model_name != "initSearch":
-        data_set_total, sensor_flow_simul = run_optimization_loop(
+    # One pool for the whole run; its workers load the static inputs once
+    evaluation_context = {
+        "config": config,
+        "base_od": od_df_base,
+        "base_path": base_path,
+        "routes_df": routes_df,
+        "routes_per_od": routes_per_od,
+        "sensor_flow_gt": sensor_flow_gt,
+        "link_selection": link_selection,
+        "dim_od": dim_od,
+        "path_init_simul": path_init_simul,
+        "path_opt_simul": path_opt_simul,
+    }
+    num_processes = max(1, min(mp.cpu_count() - 1, cpu_max))
+    with create_evaluation_pool(num_processes, evaluation_context) as evaluation_pool:
+        # Run initial search procedure
+        data_set_init_search, pending_init = run_initial_search_procedure(
             config=config,
             model_name=model_name,
             dim_od=dim_od,
-            params=params,
             bounds=bounds,
             dtype=dtype,
             device=device,
             seed=seed,
-            cpu_max=cpu_max,
-            data_set_init_search=data_set_init_search,
-            od_df_base=od_df_base,
-            base_path=base_path,
-            routes_df=routes_df,
-            routes_per_od=routes_per_od,
-            sensor_flow_gt=sensor_flow_gt,
-            link_selection=link_selection,
-            path_opt_simul=path_opt_simul,
-            path_opt_result=path_opt_result,
-            path_opt_detail=path_opt_detail,
+            n_init_search=n_init_search,
+            evaluation_pool=evaluation_pool,
+            path_init_detail=path_init_detail,
+            path_init_result=path_init_result,
         )
 
+        # Run optimization loop
+        if model_name != "initSearch":
+            data_set_total, sensor_flow_simul = run_optimization_loop(
+                config=config,
+                model_name=model_name,
+                dim_od=dim_od,
+                params=params,
+                bounds=bounds,
+                dtype=dtype,
+                device=device,
+                seed=seed,
+                evaluation_pool=evaluation_pool,
+                data_set_init_search=data_set_init_search,
+                od_df_base=od_df_base,
+                base_path=base_path,
+                routes_df=routes_df,
+                routes_per_od=routes_per_od,
+                sensor_flow_gt=sensor_flow_gt,
+                link_selection=link_selection,
+                path_opt_simul=path_opt_simul,
+                path_opt_result=path_opt_result,
+                path_opt_detail=path_opt_detail,
+                resume=args.resume,
+                pending_init=pending_init,
+            )
+
+    if model_name != "initSearch":
         # Result visualization
         save_convergence_plot(data_set_total, path_opt_detail)
         save_fit_to_gt_plots(
@@ -0,0 +1,206 @@
+# Standard library imports
+import time
+
+# Third-party imports
+import numpy as np
+import torch
+from botorch.utils.transforms import normalize
+from tqdm import tqdm
+
+# Local application imports
+from optimizers.checkpoint import get_rng_state, save_checkpoint
+from simulation.executor import EvaluationExecutor
+from utils.misc import set_seed
+
+
+def run_async_bo_loop(
+    strategy,
+    history,
+    results_store,
+    evaluation_pool,
+    params,
+    config,
+    bounds,
+    dtype,
+    device,
+    seed,
+    model_name,
+    dim_od,
+    path_opt_result,
+    checkpoint=None,
+    pending_init=None,
+):
+    """
+    Run Bayesian optimization asynchronously, refilling a worker as soon as its simulation ends.
+
+    The first `bo_batch_size` candidates are suggested together. From then on, every completed
+    simulation is added to the history right away and one new candidate is suggested, with the
+    points still being simulated passed to the strategy as `X_pending`, and dispatched to the
+    free worker. The evaluation budget is the same as in synchronous mode
+    (n_epoch * bo_batch_size). Evaluations are labeled by their dispatch index k as
+    epoch k // bo_batch_size + 1 and batch k % bo_batch_size + 1, and the wall-clock dispatch and
+    completion times of each one are recorded in the results store. A failed or timed-out
+    evaluation uses up its slot of the budget without being added to the history.
+
+    A checkpoint is saved every `bo_batch_size` completed evaluations, the last one included. It
+    records the number of completed evaluations (including failures) and the dispatch indices
+    still running, which are suggested anew on resume so the labels stay within the budget.
+
+    Parameters
+    ----------
+    strategy : BaseStrategy
+        Initialized BO strategy.
+    history : EvaluationHistory
+        History holding the initial search (and, on resume, the completed evaluations).
+    results_store : ResultsStore
+        Store of the run.
+    evaluation_pool : multiprocessing.pool.Pool
+        Pool of the run created by create_evaluation_pool.
+    params : dict
+        Parameter dictionary including number of epochs and batch size.
+    config : dict
+        Configuration dictionary for simulation and optimization.
+    bounds : Tensor
+        Bounds for normalization of input variables.
+    dtype : torch.dtype
+        Torch data type for tensors.
+    device : torch.device
+        Torch device ('cpu' or 'cuda').
+    seed : int
+        Random seed for reproducibility.
+    model_name : str
+        Name of the strategy, stored in checkpoints.
+    dim_od : int
+        Dimension of the OD variables, stored in checkpoints.
+    path_opt_result : Path
+        Result directory of the run.
+    checkpoint : dict, optional
+        Checkpoint to resume from. Evaluations that were still running, or finished after the
+        checkpoint was saved, are suggested anew under their dispatch index.
+    pending_init : PendingInitialSamples, optional
+        Initial search samples still being simulated; merged into the history before each
+        suggestion.
+    """
+    batch_size = params["bo_batch_size"]
+    budget = params["n_epoch"] * batch_size
+    export_every = int(config.get("export_csv_every", 0)) * batch_size
+
+    next_dispatch = 0
+    n_completed = 0  # finished evaluations, failed ones included
+    free_slots = []  # dispatch indices to suggest anew before continuing at next_dispatch
+    update_buffer = []  # completed losses not yet passed to strategy.update
+    if checkpoint is not None:
+        async_state = checkpoint["async_state"]
+        next_dispatch = async_state["next_dispatch"]
+        n_completed = async_state.get("n_completed", int((history.run_info[:, 1] > 0).sum()))
+        free_slots = sorted(async_state.get("in_flight", []))
+        update_buffer = list(async_state["update_buffer"])
+
+    loop_start_time = time.time()
+    executor = EvaluationExecutor(evaluation_pool, config)
+    pending = {}  # dispatch index -> (OD vector, dispatch time)
+
+    def labels(k):
+        return k // batch_size + 1, k % batch_size + 1
+
+    def suggest_and_dispatch(n_new):
+        nonlocal next_dispatch
+        k_first = free_slots[0] if free_slots else next_dispatch
+        epoch, _ = labels(k_first)
+        set_seed(seed + k_first + 1)
+        if pending_init is not None:
+            pending_init.merge_into(history, results_store)
+
+        X_all_fullD_norm = normalize(torch.tensor(history.X, dtype=dtype, device=device), bounds)
+        Y_all_real = -torch.tensor(history.loss, dtype=dtype, device=device).unsqueeze(-1)
+        X_pending = None
+        if pending:
+            X_pending_real = np.stack([x for x, _ in pending.values()])
+            X_pending = normalize(torch.tensor(X_pending_real, dtype=dtype, device=device), bounds)
+
+        model_run_time_start = time.time()
+        X_new_fullD_real = strategy.suggest(
+            X_all_fullD_norm,
+            Y_all_real,
+            epoch=epoch,
+            seed=seed + k_first + 1,
+            X_pending=X_pending,
+            batch_size=n_new,
+        )
+        model_run_time = time.time() - model_run_time_start
+        results_store.append_model_run_time(epoch, history.n, model_run_time)
+
+        best_loss = float(history.loss.min())
+        for x in X_new_fullD_real.cpu().numpy():
+            if free_slots:
+                k = free_slots.pop(0)
+            else:
+                k = next_dispatch
+                next_dispatch += 1
+            epoch_k, batch_k = labels(k)
+            pending[k] = (x, time.time() - loop_start_time)
+            executor.submit("sample", (k,), (batch_k, x, epoch_k, history.n, best_loss))
+
+    if n_completed < budget:
+        suggest_and_dispatch(min(batch_size, budget - n_completed))
+
+    def checkpoint_state(epoch):
+        save_checkpoint(
+            path_opt_result,
+            {
+                "epoch": epoch,
+                "model_name": model_name,
+                "dim_od": dim_od,
+                "history": history.state_dict(),
+                "strategy": strategy.state_dict(),
+                "rng": get_rng_state(),
+                "n_model_runs": results_store.count("model_run_time"),
+                "async_state": {
+                    "next_dispatch": next_dispatch,
+                    "n_completed": n_completed,
+                    "in_flight": sorted(pending) + free_slots,
+                    "update_buffer": update_buffer,
+                },
+            },
+        )
+
+    progress = tqdm(total=budget, initial=n_completed, desc="Async Optimization Loop")
+    while pending:
+        record = executor.next_completed()
+        k = record.key[0]
+        x, dispatch_time = pending.pop(k)
+        completion_time = time.time() - loop_start_time
+        n_completed += 1
+        progress.update(1)
+
+        if record.ok:
+            run_simul_info, curr_loss, link_flow = record.result
+
+            # Record the finished evaluation
+            n_prev = history.n
+            history.append(np.array([run_simul_info]), np.array([curr_loss]), x[np.newaxis], link_flow[np.newaxis])
+            results_store.append_evaluations(history.run_info[n_prev:], history.loss[n_prev:], history.X[n_prev:])
+            results_store.append_sensor_flow(history.link_stats_frame(n_prev))
+            results_store.append_timeline(run_simul_info[1], run_simul_info[2], dispatch_time, completion_time)
+
+            # Strategy state (TuRBO trust region) advances once per bo_batch_size results, as in sync mode
+            update_buffer.append(-curr_loss)
+            if hasattr(strategy, "update") and len(update_buffer) == batch_size:
+                strategy.update(torch.tensor(update_buffer, dtype=dtype, device=device).unsqueeze(-1))
+                update_buffer = []
+        else:
+            epoch_k, batch_k = labels(k)
+            print(f"[Failed] Epoch {epoch_k} — Batch {batch_k} ({record.status}): {record.error}")
+
+        if export_every > 0 and n_completed % export_every == 0:
+            results_store.export_csv(path_opt_result)
+
+        # The budget is a multiple of bo_batch_size, so the last completion is also saved
+        if n_completed % batch_size == 0:
+            checkpoint_state(labels(k)[0])
+
+        # Refill the free worker
+        if n_completed + len(pending) < budget:
+            suggest_and_dispatch(1)
+
+    progress.close()
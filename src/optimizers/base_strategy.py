@@ -7,7 +7,9 @@ class BaseStrategy(ABC):
     Abstract base class for all optimization strategies.
 
     All custom strategies must implement `initialize` and `suggest` methods
-    to manage internal state and propose new candidate solutions.
+    to manage internal state and propose new candidate solutions. Strategies with state that
+    carries over between epochs extend `state_dict` and `load_state_dict`, which are used to
+    checkpoint and resume the optimization loop.
     """
 
     def __init__(self, params, config, bounds, device, dtype):
@@ -24,5 +26,18 @@ class BaseStrategy(ABC):
 
     @abstractmethod
     def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed):
-        """Suggest new candidates. Returns X_new_fullD_real (np.ndarray)."""
+        """
+        Suggest new candidates. Returns X_new_fullD_real (np.ndarray).
+
+        BO strategies also accept `X_pending` (normalized points still being simulated) and
+        `batch_size` (number of candidates, defaults to bo_batch_size) for asynchronous runs.
+        """
+        pass
+
+    def state_dict(self):
+        """Return the internal state carried over between epochs."""
+        return {}
+
+    def load_state_dict(self, state):
+        """Restore the internal state saved by `state_dict` (after `initialize`)."""
         pass
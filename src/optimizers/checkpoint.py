@@ -0,0 +1,73 @@
+# Standard library imports
+import os
+import random
+from pathlib import Path
+from typing import Optional
+
+# Third-party imports
+import numpy as np
+import torch
+
+CHECKPOINT_NAME = "checkpoint.pt"
+
+
+def get_rng_state() -> dict:
+    """Return the states of the Python, NumPy and PyTorch random number generators."""
+    return {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+        "torch_cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else [],
+    }
+
+
+def set_rng_state(state: dict) -> None:
+    """Restore random number generator states saved by `get_rng_state`."""
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if state["torch_cuda"] and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["torch_cuda"])
+
+
+def save_checkpoint(path_result: Path, checkpoint: dict) -> None:
+    """
+    Save the optimization loop state after a completed epoch.
+
+    The file is written under a temporary name and then renamed, so a crash while saving
+    leaves the previous checkpoint intact.
+
+    Parameters
+    ----------
+    path_result : Path
+        Result directory of the run.
+    checkpoint : dict
+        Loop state: "epoch", "model_name", "dim_od", "history", "strategy" and "rng".
+    """
+    path = Path(path_result) / CHECKPOINT_NAME
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    torch.save(checkpoint, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path_result: Path, model_name: str, dim_od: int) -> Optional[dict]:
+    """
+    Load the last checkpoint of a run, or return None if there is none.
+
+    Raises
+    ------
+    ValueError
+        If the checkpoint was written by a different model or OD dimension.
+    """
+    path = Path(path_result) / CHECKPOINT_NAME
+    if not path.exists():
+        return None
+
+    # The checkpoint holds NumPy arrays and RNG states, not only tensors
+    checkpoint = torch.load(path, weights_only=False)
+    if checkpoint["model_name"] != model_name or checkpoint["dim_od"] != dim_od:
+        raise ValueError(
+            f"Checkpoint {path} belongs to model {checkpoint['model_name']} with {checkpoint['dim_od']} OD pairs, "
+            f"not {model_name} with {dim_od}."
+        )
+    return checkpoint
@@ -0,0 +1,187 @@
+# Standard library imports
+from pathlib import Path
+from typing import Optional, Union
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+RUN_INFO_COLUMNS = ["init_search", "epoch", "batch", "run_time", "num_train_data"]
+
+
+class EvaluationHistory:
+    """
+    Growable, array-backed history of the evaluations of one optimization run.
+
+    Stores the OD vectors (evaluations x OD pairs), losses, run metadata (init_search, epoch,
+    batch, run_time, num_train_data) and simulated sensor counts and speeds (evaluations x
+    sensors, NaN for sensors without output) in preallocated float64 arrays whose capacity
+    doubles when full, so appending a batch does not copy the whole history. With `memmap_dir`,
+    the arrays are np.memmap files in that directory instead of RAM.
+    """
+
+    def __init__(
+        self,
+        dim_od: int,
+        link_ids: list,
+        capacity: int = 64,
+        memmap_dir: Optional[Union[str, Path]] = None,
+    ):
+        self.dim_od = dim_od
+        self.link_ids = [str(link_id) for link_id in link_ids]
+        self.memmap_dir = None if memmap_dir is None else Path(memmap_dir)
+        if self.memmap_dir is not None:
+            self.memmap_dir.mkdir(parents=True, exist_ok=True)
+
+        self.n = 0
+        self.capacity = 0
+        self._shapes = {
+            "x": (dim_od,),
+            "loss": (),
+            "run_info": (len(RUN_INFO_COLUMNS),),
+            "counts": (len(self.link_ids),),
+            "speeds": (len(self.link_ids),),
+        }
+        self._arrays = {}
+        self._reserve(max(capacity, 1))
+
+    def _allocate(self, name: str, capacity: int) -> np.ndarray:
+        shape = (capacity, *self._shapes[name])
+        if self.memmap_dir is None:
+            return np.full(shape, np.nan)
+        array = np.memmap(self.memmap_dir / f"{name}_{capacity}.dat", dtype=np.float64, mode="w+", shape=shape)
+        array[:] = np.nan
+        return array
+
+    def _reserve(self, n_required: int) -> None:
+        """Grow every array to hold at least `n_required` evaluations, doubling the capacity."""
+        if n_required <= self.capacity:
+            return
+        capacity = max(n_required, 2 * self.capacity)
+        for name in self._shapes:
+            array = self._allocate(name, capacity)
+            old = self._arrays.get(name)
+            if old is not None:
+                array[: self.n] = old[: self.n]
+                self._release(old)
+            self._arrays[name] = array
+        self.capacity = capacity
+
+    @staticmethod
+    def _release(array: np.ndarray) -> None:
+        """Delete the file behind a memmap array; existing views stay valid until unreferenced."""
+        if isinstance(array, np.memmap):
+            try:
+                Path(array.filename).unlink(missing_ok=True)
+            except PermissionError:  # mapped files cannot be deleted on Windows
+                pass
+
+    def append(
+        self,
+        run_info: np.ndarray,
+        loss: np.ndarray,
+        x: np.ndarray,
+        link_flow: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Append a batch of evaluations.
+
+        Parameters
+        ----------
+        run_info : np.ndarray
+            (batch x 5) run metadata.
+        loss : np.ndarray
+            (batch,) losses.
+        x : np.ndarray
+            (batch x dim_od) OD vectors.
+        link_flow : Optional[np.ndarray]
+            (batch x 2 x sensors) simulated counts and speeds aligned with `link_ids`,
+            as returned by run_sample_evaluation. NaN if not given.
+        """
+        x = np.asarray(x, dtype=np.float64).reshape(-1, self.dim_od)
+        n_new = len(x)
+        start, end = self.n, self.n + n_new
+        self._reserve(end)
+
+        self._arrays["x"][start:end] = x
+        self._arrays["loss"][start:end] = np.asarray(loss, dtype=np.float64).reshape(n_new)
+        self._arrays["run_info"][start:end] = np.asarray(run_info, dtype=np.float64).reshape(n_new, -1)
+        if link_flow is not None:
+            link_flow = np.asarray(link_flow, dtype=np.float64).reshape(n_new, 2, len(self.link_ids))
+            self._arrays["counts"][start:end] = link_flow[:, 0]
+            self._arrays["speeds"][start:end] = link_flow[:, 1]
+        self.n = end
+
+    @property
+    def X(self) -> np.ndarray:
+        return self._arrays["x"][: self.n]
+
+    @property
+    def loss(self) -> np.ndarray:
+        return self._arrays["loss"][: self.n]
+
+    @property
+    def run_info(self) -> np.ndarray:
+        return self._arrays["run_info"][: self.n]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._arrays["counts"][: self.n]
+
+    @property
+    def speeds(self) -> np.ndarray:
+        return self._arrays["speeds"][: self.n]
+
+    def link_stats_frame(self, start: int = 0) -> pd.DataFrame:
+        """
+        Return the simulated sensor statistics of evaluations `start:` in the long format of
+        sensor_flow_simul.csv, skipping sensors without output.
+        """
+        counts, speeds = self.counts[start:], self.speeds[start:]
+        rows, cols = np.nonzero(~np.isnan(counts))
+        run_info = self.run_info[start:]
+        return pd.DataFrame(
+            {
+                "epoch": run_info[rows, 1].astype(int),
+                "batch": run_info[rows, 2].astype(int),
+                "link_id": np.asarray(self.link_ids, dtype=object)[cols],
+                "interval_nVehContrib": counts[rows, cols],
+                "interval_harmonicMeanSpeed": speeds[rows, cols],
+            }
+        )
+
+    def state_dict(self) -> dict:
+        """Return copies of the filled part of every array and the sensor order, for checkpointing."""
+        state = {name: np.array(array[: self.n]) for name, array in self._arrays.items()}
+        state["link_ids"] = list(self.link_ids)
+        return state
+
+    def load_state_dict(self, state: dict) -> None:
+        """
+        Replace the history with the arrays saved by `state_dict`.
+
+        Sensor columns are reordered to `link_ids` if the checkpoint lists the same sensors in
+        another order (e.g. a checkpoint written by a GT store built before it kept the CSV order).
+        """
+        counts, speeds = state["counts"], state["speeds"]
+        saved_link_ids = state.get("link_ids", self.link_ids)
+        if list(saved_link_ids) != self.link_ids:
+            position = {link_id: k for k, link_id in enumerate(saved_link_ids)}
+            if len(position) != len(self.link_ids) or any(link_id not in position for link_id in self.link_ids):
+                raise ValueError("The checkpoint was saved for a different set of sensors.")
+            columns = [position[link_id] for link_id in self.link_ids]
+            counts, speeds = counts[:, columns], speeds[:, columns]
+
+        self.n = 0
+        self.append(
+            state["run_info"],
+            state["loss"],
+            state["x"],
+            np.stack([counts, speeds], axis=1),
+        )
+
+    def close(self) -> None:
+        """Release the arrays, deleting the memmap files if any."""
+        for array in self._arrays.values():
+            self._release(array)
+        self._arrays = {}
@@ -1,16 +1,20 @@
 # Standard library imports
-import multiprocessing as mp
+import math
 import os
 import time
 
 # Third-party imports
+import numpy as np
 import pandas as pd
 import torch
 from botorch.utils.transforms import unnormalize
 
 # Local application imports
-from simulation.evaluation import run_initial_evaluation
+from simulation.executor import EvaluationExecutor
 from utils.misc import set_seed
+from utils.results_store import RESULTS_DB_NAME, ResultsStore
+
+INIT_COLUMNS = ["init_search", "epoch", "batch", "loss", "run_time", "num_train_data"]
 
 
 def run_initial_search_procedure(
@@ -22,24 +26,19 @@ def run_initial_search_procedure(
     device,
     seed,
     n_init_search,
-    cpu_max,
-    od_df_base,
-    base_path,
-    routes_df,
-    routes_per_od,
-    sensor_flow_gt,
-    link_selection,
+    evaluation_pool,
     path_init_detail,
-    path_init_simul,
     path_init_result,
-    init_existence,
 ):
     """
     Run the initial search phase using Sobol sampling and parallel evaluation.
 
-    This function generates Sobol samples, performs simulations in parallel,
-    saves results to CSV, and returns the aggregated dataset. If the result already exists,
-    it skips simulation and loads from disk.
+    This function generates Sobol samples, performs simulations in parallel, saves results to
+    CSV, and returns the aggregated dataset. Every evaluated sample is stored right away in the
+    results store of the initial search directory, keyed by its Sobol index. Since the scrambled
+    Sobol sequence of a seed is deterministic, an interrupted search only simulates its missing
+    samples, and a larger `n_init_search` reuses the existing samples and simulates only the new
+    ones.
 
     Parameters
     ----------
@@ -59,101 +58,205 @@ def run_initial_search_procedure(
         Random seed for reproducibility.
     n_init_search : int
         Number of initial search samples.
-    cpu_max : int
-        Maximum number of CPU cores to use.
-    od_df_base : pd.DataFrame
-        Base OD matrix dataframe.
-    base_path : Path
-        Base experiment directory.
-    routes_df : pd.DataFrame
-        Route information dataframe.
-    routes_per_od : str
-        Type of routes to use for the simulation (single or multiple).
-    sensor_flow_gt : pd.DataFrame
-        Ground truth traffic flow data.
-    link_selection : list[str]
-        List of sensor link IDs used in evaluation.
+    evaluation_pool : multiprocessing.pool.Pool
+        Pool of the run created by create_evaluation_pool, holding the base OD, routes, ground
+        truth, sensor links, and simulation output directory.
     path_init_detail : Path
         Directory to save metadata or runtime info.
-    path_init_simul : Path
-        Directory to store simulation outputs.
     path_init_result : Path
         Directory to store initial search results.
-    init_existence : bool
-        Flag indicating whether initial results already exist.
 
     Returns
     -------
     pd.DataFrame
         DataFrame containing the evaluated initial search dataset.
+    PendingInitialSamples or None
+        With `init_pipeline_fraction` < 1 (and a model to run after the initial search), the
+        function returns as soon as that fraction of samples has been evaluated. The DataFrame
+        then holds only those samples, and the returned object tracks the samples still running.
+        Otherwise None.
+
+    Raises
+    ------
+    ValueError
+        If stored samples do not match the Sobol points of this configuration (e.g., the OD
+        bounds changed).
     """
     set_seed(seed)
+    code_init_start_time = time.time()
+
+    # Generate initial Sobol samples (normalized [0, 1])
+    sobol = torch.quasirandom.SobolEngine(dimension=dim_od, scramble=True, seed=seed)
+    X_init_fullD_norm = sobol.draw(n_init_search).to(dtype=dtype, device=device)
+
+    # Unnormalize to real OD scale
+    X_init_fullD_real = unnormalize(X_init_fullD_norm, bounds).cpu().numpy()
+
+    # Samples evaluated by earlier runs with the same seed
+    init_store = ResultsStore(path_init_result / RESULTS_DB_NAME, dim_od)
+    init_csv_file = path_init_result / "data_set.csv"
+    if init_store.count("evaluations") == 0 and init_csv_file.exists():
+        data_set_csv = pd.read_csv(init_csv_file)
+        init_store.append_evaluations(
+            data_set_csv[["init_search", "epoch", "batch", "run_time", "num_train_data"]].to_numpy(),
+            data_set_csv["loss"].to_numpy(),
+            data_set_csv.filter(like="x_").to_numpy(),
+        )
+    data_set_stored = load_initial_samples(init_store, n_init_search)
+    stored_index = data_set_stored["init_search"].to_numpy(dtype=int) - 1
+    if not np.allclose(data_set_stored.filter(like="x_").to_numpy(), X_init_fullD_real[stored_index], rtol=1e-6):
+        raise ValueError(
+            f"Stored initial samples in {path_init_result} do not match the Sobol points of this "
+            "configuration. Remove the directory to run a new initial search."
+        )
+    missing = sorted(set(range(n_init_search)) - set(stored_index))
+
+    if not missing:
+        print(f"[Skip] Initial search dataset already exists: {init_csv_file}")
+        init_store.close()
+        save_initial_data_set(data_set_stored, init_csv_file)
+        return data_set_stored, None
+    if len(data_set_stored) > 0:
+        print(f"[Resume] Reusing {len(data_set_stored)} initial samples, simulating {len(missing)} more")
+
+    # Evaluate missing samples in parallel (static inputs are already loaded in the pool workers)
+    executor = EvaluationExecutor(evaluation_pool, config)
+    for i in missing:
+        executor.submit("initial", (i,), (i, X_init_fullD_real[i].tolist()))
+    pending_init = PendingInitialSamples(
+        executor, data_set_stored, init_store, path_init_detail, path_init_result, code_init_start_time
+    )
+
+    # Pipelined mode: hand the first fraction of samples to the optimizer, the rest follow later
+    pipeline_fraction = float(config.get("init_pipeline_fraction", 1.0))
+    if model_name != "initSearch" and pipeline_fraction < 1.0:
+        n_wait = max(1, math.ceil(pipeline_fraction * n_init_search)) - len(data_set_stored)
+        data_set_new = pending_init.collect(min_rows=max(n_wait, 0))
+        data_set_init_search = pd.concat([data_set_stored, data_set_new], ignore_index=True)
+        print(f"[Pipeline] Starting optimization with {len(data_set_init_search)}/{n_init_search} initial samples")
+        return data_set_init_search, pending_init
+
+    data_set_new = pending_init.collect(block=True)
+    return pd.concat([data_set_stored, data_set_new], ignore_index=True), None
+
+
+def load_initial_samples(init_store, n_init_search):
+    """
+    Return the stored initial samples with Sobol index 1..n_init_search, one row per index, in
+    the layout of the initial search data_set.csv.
+    """
+    data_set = init_store.data_set()
+    data_set = data_set[(data_set["init_search"] >= 1) & (data_set["init_search"] <= n_init_search)]
+    data_set = data_set.drop_duplicates("init_search").sort_values("init_search").reset_index(drop=True)
+    return data_set[INIT_COLUMNS + [col for col in data_set.columns if col.startswith("x_")]]
+
+
+def save_initial_data_set(data_set_init_search, init_csv_file):
+    """Save the initial search dataset in sample order."""
+    data_set_init_search = data_set_init_search.sort_values("init_search").astype(
+        {"init_search": int, "epoch": int, "batch": int, "num_train_data": int}
+    )
+    data_set_init_search.to_csv(init_csv_file, index=False)
+    print(f"[Saved] Initial search dataset: {init_csv_file}")
+
 
-    if (model_name == "initSearch") or (not init_existence):
-
-        code_init_start_time = time.time()
-
-        # Generate initial Sobol samples (normalized [0, 1])
-        sobol = torch.quasirandom.SobolEngine(dimension=dim_od, scramble=True, seed=seed)
-        X_init_fullD_norm = sobol.draw(n_init_search).to(dtype=dtype, device=device)
-
-        # Unnormalize to real OD scale
-        X_init_fullD_real = unnormalize(X_init_fullD_norm, bounds)
-
-        # Prepare multiprocessing environment
-        mp.freeze_support()
-        with mp.Manager() as manager:
-            lock = manager.Lock()
-            ods_epsilon = manager.list()
-            loss_all = manager.list()
-            batch_data_i = manager.list()
-
-            num_processes = min(mp.cpu_count() - 1, n_init_search + 1, cpu_max)
-            base_od = od_df_base.copy()
-
-            with mp.Pool(processes=num_processes) as pool:
-                pool.starmap(
-                    run_initial_evaluation,
-                    [
-                        (
-                            i,
-                            x,
-                            base_od,
-                            config,
-                            base_path,
-                            lock,
-                            ods_epsilon,
-                            loss_all,
-                            batch_data_i,
-                            str(path_init_simul),
-                            routes_df,
-                            routes_per_od,
-                            link_selection,
-                            sensor_flow_gt,
-                            dim_od,
-                        )
-                        for i, x in enumerate(X_init_fullD_real.cpu().tolist())
-                    ],
-                )
-
-            # Save dataset
-            data_set_init_search = pd.concat(batch_data_i)
-            init_csv_file = path_init_result / "data_set.csv"
-            data_set_init_search.to_csv(init_csv_file, index=False)
-            print(f"[Saved] Initial search dataset: {init_csv_file}")
-
-        # Save runtime
-        code_init_duration = time.time() - code_init_start_time
+class PendingInitialSamples:
+    """
+    Initial search samples submitted to the evaluation pool and not yet collected.
+
+    Each collected sample is added to the initial search results store. Samples that failed
+    or timed out are left out, so the next run with the same seed simulates them again. Once
+    every sample has returned, the initial search dataset (including the samples reused from
+    earlier runs) is saved in sample order, together with the run time of the initial search.
+    """
+
+    def __init__(self, executor, data_set_stored, init_store, path_init_detail, path_init_result, start_time):
+        self.executor = executor
+        self.rows = [data_set_stored]
+        self.init_store = init_store
+        self.path_init_detail = path_init_detail
+        self.path_init_result = path_init_result
+        self.start_time = start_time
+
+    def __len__(self):
+        return len(self.executor)
+
+    def collect(self, block=False, min_rows=0):
+        """
+        Return the rows of samples that finished since the last call.
+
+        Parameters
+        ----------
+        block : bool, optional
+            If True, wait for all remaining samples. Defaults to False.
+        min_rows : int, optional
+            Wait until at least this many new rows are available (or none are pending).
+
+        Returns
+        -------
+        pd.DataFrame
+            Newly finished initial search rows (possibly empty).
+        """
+        new_rows = []
+        while len(self.executor) > 0:
+            satisfied = not block and len(new_rows) >= min_rows
+            record = self.executor.next_completed(timeout=0 if satisfied else 0.5)
+            if record is None:
+                if satisfied:
+                    break
+                continue
+            if not record.ok:
+                print(f"[Failed] Initial sample {record.key[0] + 1} ({record.status}): {record.error}")
+                continue
+
+            df_curr = record.result
+            self.init_store.append_evaluations(
+                df_curr[["init_search", "epoch", "batch", "run_time", "num_train_data"]].to_numpy(),
+                df_curr["loss"].to_numpy(),
+                df_curr.filter(like="x_").to_numpy(),
+            )
+            new_rows.append(df_curr)
+
+        self.rows.extend(new_rows)
+        if len(self.executor) == 0 and self.init_store is not None:
+            self._save()
+        if not new_rows:
+            return pd.DataFrame()
+        return pd.concat(new_rows).sort_values("init_search").reset_index(drop=True)
+
+    def merge_into(self, history, results_store, block=False):
+        """
+        Append the initial samples that finished since the last call to the training history
+        and the results store of the optimization loop.
+
+        Returns
+        -------
+        int
+            Number of merged samples.
+        """
+        new_rows = self.collect(block=block)
+        if new_rows.empty:
+            return 0
+        n_prev = history.n
+        history.append(
+            new_rows[["init_search", "epoch", "batch", "run_time", "num_train_data"]].to_numpy(),
+            new_rows["loss"].to_numpy(),
+            new_rows.filter(like="x_").to_numpy(),
+        )
+        results_store.append_evaluations(history.run_info[n_prev:], history.loss[n_prev:], history.X[n_prev:])
+        print(f"[Pipeline] Merged {len(new_rows)} initial samples ({len(self)} still running)")
+        return len(new_rows)
+
+    def _save(self):
+        """Save the complete initial search dataset and its run time."""
+        self.init_store.close()
+        self.init_store = None
+        save_initial_data_set(pd.concat(self.rows, ignore_index=True), self.path_init_result / "data_set.csv")
+
+        code_init_duration = time.time() - self.start_time
         h, m = divmod(int(code_init_duration), 3600)
         m, s = divmod(m, 60)
 
-        run_time_file_init = os.path.join(path_init_detail, f"code run time is {h}h {m}m {s}s.txt")
+        run_time_file_init = os.path.join(self.path_init_detail, f"code run time is {h}h {m}m {s}s.txt")
         with open(run_time_file_init, "w") as f:
             f.write(f"Total code run time: {h}h {m}m {s}s")
-
-    else:
-        print(f"[Skip] Initial search dataset already exists: {init_existence}")
-        init_csv_file = path_init_result / "data_set.csv"
-        data_set_init_search = pd.read_csv(init_csv_file)
-
-    return data_set_init_search
@@ -1,19 +1,21 @@
 # Standard library imports
-import multiprocessing as mp
 import os
 import time
 
 # Third-party imports
 import numpy as np
-import pandas as pd
 import torch
 from botorch.utils.transforms import normalize
 from tqdm import trange
 
 # Local application imports
+from optimizers.async_loop import run_async_bo_loop
+from optimizers.checkpoint import get_rng_state, load_checkpoint, save_checkpoint, set_rng_state
+from optimizers.evaluation_history import EvaluationHistory
 from optimizers.strategy_registry import strategy_registery
-from simulation.evaluation import run_sample_evaluation
+from simulation.executor import EvaluationExecutor
 from utils.misc import set_seed
+from utils.results_store import RESULTS_DB_NAME, ResultsStore
 
 
 def run_optimization_loop(
@@ -25,7 +27,7 @@ def run_optimization_loop(
     dtype,
     device,
     seed,
-    cpu_max,
+    evaluation_pool,
     data_set_init_search,
     od_df_base,
     base_path,
@@ -36,6 +38,8 @@ def run_optimization_loop(
     path_opt_simul,
     path_opt_result,
     path_opt_detail,
+    resume=False,
+    pending_init=None,
 ):
     """
     Run a full optimization loop over multiple epochs using the specified optimization strategy.
@@ -58,8 +62,8 @@ def run_optimization_loop(
         Torch device ('cpu' or 'cuda').
     seed : int
         Random seed for reproducibility.
-    cpu_max : int
-        Maximum number of CPU processes to use.
+    evaluation_pool : multiprocessing.pool.Pool
+        Pool of the run created by create_evaluation_pool. Also used by the SPSA strategy.
     data_set_init_search : pd.DataFrame
         Initial dataset used to start the optimization loop.
     od_df_base : pd.DataFrame
@@ -77,9 +81,15 @@ def run_optimization_loop(
     path_opt_simul : Path
         Path to the simulation output directory.
     path_opt_result : Path
-        Path to save optimization results (e.g., CSV files).
+        Path to save optimization results (results store and exported CSV files).
     path_opt_detail : Path
         Path to save runtime statistics and logs.
+    resume : bool, optional
+        If True, continue from the checkpoint of the last completed epoch in `path_opt_result`
+        instead of starting over. Defaults to False.
+    pending_init : PendingInitialSamples, optional
+        Initial search samples still being simulated when the loop starts (pipelined initial
+        search). They are added to the training data as they finish, before each suggestion.
 
     Returns
     -------
@@ -91,23 +101,31 @@ def run_optimization_loop(
     code_opt_start_time = time.time()
     n_epoch = params["n_epoch"]
 
-    # Prepare training data
-    X_all_fullD_real = torch.tensor(data_set_init_search.filter(like="x_").values, dtype=dtype, device=device)
-    Y_all_real = -torch.tensor(data_set_init_search[["loss"]].values, dtype=dtype, device=device)
-
-    run_simul_info_total = data_set_init_search[
-        ["init_search", "epoch", "batch", "run_time", "num_train_data"]
-    ].to_numpy()
-    sensor_flow_simul = pd.DataFrame(
-        columns=[
-            "epoch",
-            "batch",
-            "link_id",
-            "interval_nVehContrib",
-            "interval_harmonicMeanSpeed",
-        ]
+    # Prepare training data (optionally memory-mapped for very long runs)
+    memmap_dir = path_opt_result / "history" if config.get("history_memmap") == "True" else None
+    history = EvaluationHistory(dim_od, link_selection, memmap_dir=memmap_dir)
+    history.append(
+        data_set_init_search[["init_search", "epoch", "batch", "run_time", "num_train_data"]].to_numpy(),
+        data_set_init_search["loss"].to_numpy(),
+        data_set_init_search.filter(like="x_").to_numpy(),
     )
-    model_run_time_df = pd.DataFrame(columns=["epoch", "num_train_data", "run_time"])
+    X_all_fullD_real = torch.tensor(history.X, dtype=dtype, device=device)
+    Y_all_real = -torch.tensor(history.loss, dtype=dtype, device=device).unsqueeze(-1)
+
+    # Asynchronous dispatch is available for the BO strategies
+    async_bo = config.get("async_bo") == "True" and model_name != "spsa"
+
+    checkpoint = load_checkpoint(path_opt_result, model_name, dim_od) if resume else None
+    if resume and checkpoint is None:
+        print("[Resume] No checkpoint found, starting from the first epoch.")
+    if checkpoint is not None and ("async_state" in checkpoint) != async_bo:
+        raise ValueError("Cannot resume a run with a different async_bo setting.")
+
+    # Results are appended to the store as they come in; CSV files are exported from it
+    results_store = ResultsStore(path_opt_result / RESULTS_DB_NAME, dim_od, reset=checkpoint is None)
+    if checkpoint is None:
+        results_store.append_evaluations(history.run_info, history.loss, history.X)
+    export_csv_every = int(config.get("export_csv_every", 0))
 
     # Instantiate strategy
     strategy_class = strategy_registery[model_name]
@@ -122,118 +140,135 @@ def run_optimization_loop(
         routes_df=routes_df,
         sensor_flow_gt=sensor_flow_gt,
         link_selection=link_selection,
+        evaluation_pool=evaluation_pool,
     )
 
-    for i in trange(1, n_epoch + 1, desc="Optimization Loop"):
-        seed_i = seed + i
-        set_seed(seed_i)
-        print(f"\n>>> Optimization epoch {i}")
-        num_train_data = len(Y_all_real)
+    # Restore the loop state of the last completed epoch
+    start_epoch = 1
+    if checkpoint is not None:
+        history.load_state_dict(checkpoint["history"])
+        strategy.load_state_dict(checkpoint["strategy"])
+        set_rng_state(checkpoint["rng"])
+        results_store.truncate(history.n, checkpoint["n_model_runs"])
+        X_all_fullD_real = torch.tensor(history.X, dtype=dtype, device=device)
+        Y_all_real = -torch.tensor(history.loss, dtype=dtype, device=device).unsqueeze(-1)
+        start_epoch = checkpoint["epoch"] + 1
+        print(f"[Resume] Continuing after epoch {checkpoint['epoch']} with {history.n} evaluations.")
 
-        model_run_time_start = time.time()
-        X_all_fullD_norm = normalize(X_all_fullD_real, bounds)
-        X_new_fullD_real = strategy.suggest(X_all_fullD_norm, Y_all_real, epoch=i, seed=seed_i)
-        model_run_time = time.time() - model_run_time_start
+    if pending_init is not None and checkpoint is not None:
+        raise ValueError("Cannot resume a run while its initial search is still running.")
 
-        model_run_time_new_row = pd.DataFrame(
-            [{"epoch": i, "num_train_data": num_train_data, "run_time": model_run_time}]
+    if async_bo:
+        run_async_bo_loop(
+            strategy,
+            history,
+            results_store,
+            evaluation_pool,
+            params,
+            config,
+            bounds,
+            dtype,
+            device,
+            seed,
+            model_name,
+            dim_od,
+            path_opt_result,
+            checkpoint,
+            pending_init,
         )
-        if model_run_time_df.empty:
-            model_run_time_df = model_run_time_new_row.copy()
-        else:
-            model_run_time_df = pd.concat([model_run_time_df, model_run_time_new_row], ignore_index=True)
-
-        # Run simulations
-        base_od = od_df_base.copy()
-
-        if model_name == "spsa":
-            with mp.Pool(processes=1) as pool:
-                results = pool.starmap(
-                    run_sample_evaluation,
-                    [
-                        (
-                            3,
-                            X_new_fullD_real[0],
-                            i,
-                            config,
-                            base_od,
-                            path_opt_simul,
-                            base_path,
-                            routes_df,
-                            routes_per_od,
-                            sensor_flow_gt,
-                            link_selection,
-                            num_train_data,
-                        )
-                    ],
-                )
-            X_new_fullD_real = X_new_fullD_real.reshape(1, -1)
-
-        else:
-            if X_new_fullD_real.sum() == 0:
-                print("All-zero sample, skipping.")
+    else:
+        executor = EvaluationExecutor(evaluation_pool, config)
+        epochs = trange(start_epoch, n_epoch + 1, initial=start_epoch - 1, total=n_epoch, desc="Optimization Loop")
+        for i in epochs:
+            seed_i = seed + i
+            set_seed(seed_i)
+            print(f"\n>>> Optimization epoch {i}")
+            if pending_init is not None and pending_init.merge_into(history, results_store):
+                X_all_fullD_real = torch.tensor(history.X, dtype=dtype, device=device)
+                Y_all_real = -torch.tensor(history.loss, dtype=dtype, device=device).unsqueeze(-1)
+            num_train_data = history.n
+
+            model_run_time_start = time.time()
+            X_all_fullD_norm = normalize(X_all_fullD_real, bounds)
+            X_new_fullD_real = strategy.suggest(X_all_fullD_norm, Y_all_real, epoch=i, seed=seed_i)
+            model_run_time = time.time() - model_run_time_start
+
+            results_store.append_model_run_time(i, num_train_data, model_run_time)
+
+            # Run simulations (tasks carry only the OD vector and its indices)
+            if model_name == "spsa":
+                X_new_fullD_real = np.asarray(X_new_fullD_real).reshape(1, -1)
+                tasks = [("sample", (i, 3), (3, X_new_fullD_real[0], i, num_train_data))]
+
+            else:
+                if X_new_fullD_real.sum() == 0:
+                    print("All-zero sample, skipping.")
+                    continue
+
+                X_new_fullD_real = X_new_fullD_real.cpu().numpy()
+                best_loss = float(history.loss.min())
+                tasks = [
+                    ("sample", (i, j), (j, X_new_fullD_real[j - 1], i, num_train_data, best_loss))
+                    for j in range(1, len(X_new_fullD_real) + 1)
+                ]
+
+            # Failed or timed-out simulations are left out of the training data
+            records = []
+            for record in executor.imap_unordered(tasks):
+                if record.ok:
+                    records.append(record)
+                else:
+                    print(f"[Failed] Epoch {i} — Batch {record.key[1]} ({record.status}): {record.error}")
+            if not records:
                 continue
+            records.sort(key=lambda record: record.key)
+            results = [record.result for record in records]
+            task_x = {key: args[1] for _, key, args in tasks}
+
+            # Update datasets
+            n_prev = history.n
+            history.append(
+                np.array([res[0] for res in results]),
+                np.array([res[1] for res in results]),
+                np.stack([task_x[record.key] for record in records]),
+                np.stack([res[2] for res in results]),
+            )
+            X_all_fullD_real = torch.tensor(history.X, dtype=dtype, device=device)
+            Y_all_real = -torch.tensor(history.loss, dtype=dtype, device=device).unsqueeze(-1)
+            Y_new_real = Y_all_real[n_prev:]
+
+            if hasattr(strategy, "update"):
+                strategy.update(Y_new_real)
+
+            # Save results (only the rows of this epoch)
+            results_store.append_evaluations(history.run_info[n_prev:], history.loss[n_prev:], history.X[n_prev:])
+            results_store.append_sensor_flow(history.link_stats_frame(n_prev))
+            if export_csv_every > 0 and i % export_csv_every == 0:
+                results_store.export_csv(path_opt_result)
+
+            save_checkpoint(
+                path_opt_result,
+                {
+                    "epoch": i,
+                    "model_name": model_name,
+                    "dim_od": dim_od,
+                    "history": history.state_dict(),
+                    "strategy": strategy.state_dict(),
+                    "rng": get_rng_state(),
+                    "n_model_runs": results_store.count("model_run_time"),
+                },
+            )
+            print(f"[Saved] Epoch {i} results")
+
+    # Initial samples still running after the last epoch are kept in the results
+    if pending_init is not None:
+        pending_init.merge_into(history, results_store, block=True)
 
-            X_new_fullD_real = X_new_fullD_real.cpu().numpy()
-            num_processes = min(mp.cpu_count() - 1, params["bo_batch_size"] + 1, cpu_max)
-            with mp.Pool(processes=num_processes) as pool:
-                results = pool.starmap(
-                    run_sample_evaluation,
-                    [
-                        (
-                            j,
-                            X_new_fullD_real[j - 1],
-                            i,
-                            config,
-                            base_od,
-                            str(path_opt_simul),
-                            base_path,
-                            routes_df,
-                            routes_per_od,
-                            sensor_flow_gt,
-                            link_selection,
-                            num_train_data,
-                        )
-                        for j in range(1, params["bo_batch_size"] + 1)
-                    ],
-                )
-
-        # Update datasets
-        run_simul_info_batch = [res[0] for res in results if res]
-        curr_loss_batch = [res[1] for res in results if res]
-        curr_loop_stats_batch_df = pd.concat([res[2] for res in results if res], ignore_index=True)
-
-        X_all_fullD_real = torch.cat([X_all_fullD_real, torch.tensor(X_new_fullD_real, dtype=dtype)], dim=0)
-        Y_new_real = -torch.tensor(curr_loss_batch, dtype=dtype).unsqueeze(-1)
-        Y_all_real = torch.cat([Y_all_real, Y_new_real], dim=0)
-
-        run_simul_info_total = np.vstack([run_simul_info_total, np.array(run_simul_info_batch)])
-        if sensor_flow_simul.empty:
-            sensor_flow_simul = curr_loop_stats_batch_df.copy()
-        else:
-            sensor_flow_simul = pd.concat([sensor_flow_simul, curr_loop_stats_batch_df], ignore_index=True)
-
-        if hasattr(strategy, "update"):
-            strategy.update(Y_new_real)
-
-        # Save results
-        data_np = np.concatenate([run_simul_info_total, Y_all_real.numpy(), X_all_fullD_real.numpy()], axis=1)
-        columns = [
-            "init_search",
-            "epoch",
-            "batch",
-            "run_time",
-            "num_train_data",
-            "loss",
-        ] + [f"x_{j}" for j in range(1, dim_od + 1)]
-        data_set_total = pd.DataFrame(data_np, columns=columns)
-        data_set_total["loss"] = data_set_total["loss"] * (-1)
-
-        data_set_total.to_csv(path_opt_result / "data_set.csv", index=False)
-        sensor_flow_simul.to_csv(path_opt_result / "sensor_flow_simul.csv", index=False)
-        model_run_time_df.to_csv(path_opt_result / "model_run_time.csv", index=False)
-
-        print(f"[Saved] Epoch {i} results")
+    results_store.export_csv(path_opt_result)
+    data_set_total = results_store.data_set()
+    sensor_flow_simul = results_store.sensor_flow_simul()
+    results_store.close()
+    history.close()
 
     # Save runtime
     code_opt_duration = time.time() - code_opt_start_time
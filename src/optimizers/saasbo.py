@@ -36,7 +36,7 @@ class SAASBOStrategy(BaseStrategy):
         """Initialize the strategy with initial data."""
         pass  # No internal state needed for SAASBO
 
-    def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed):
+    def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed, X_pending=None, batch_size=None):
         """
         Suggest new candidates using the SAASBO acquisition function.
 
@@ -50,6 +50,10 @@ class SAASBOStrategy(BaseStrategy):
             Current epoch index.
         seed : int
             Random seed for reproducibility.
+        X_pending : torch.Tensor, optional
+            Normalized points still being simulated, taken into account by the acquisition function.
+        batch_size : int, optional
+            Number of candidates to suggest. Defaults to bo_batch_size.
 
         Returns
         -------
@@ -72,7 +76,7 @@ class SAASBOStrategy(BaseStrategy):
         print("Median lengthscales:", gp_model.median_lengthscale.detach())
 
         # Define acquisition function
-        acq = qExpectedImprovement(model=gp_model, best_f=best_f)
+        acq = qExpectedImprovement(model=gp_model, best_f=best_f, X_pending=X_pending)
 
         # Optimize acquisition function
         X_new_fullD_real = optimize_acqf_and_create_candidate(
@@ -80,7 +84,7 @@ class SAASBOStrategy(BaseStrategy):
             bounds=self.bounds,
             device=self.device,
             dtype=self.dtype,
-            batch_size=self.params["bo_batch_size"],
+            batch_size=batch_size or self.params["bo_batch_size"],
             num_restarts=self.params["bo_num_restarts"],
             raw_samples=self.params["bo_raw_samples"],
         )
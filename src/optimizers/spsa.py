@@ -1,6 +1,3 @@
-# Standard library imports
-import multiprocessing as mp
-
 # Third-party imports
 import numpy as np
 import torch
@@ -8,7 +5,7 @@ from botorch.utils.transforms import normalize, unnormalize
 
 # Local application imports
 from optimizers.base_strategy import BaseStrategy
-from simulation.evaluation import run_sample_evaluation
+from simulation.executor import EvaluationExecutor
 
 
 def spsa_update(f, d, a=0.2, c=0.1, A=10, alpha=0.602, gamma=0.101, k=0):
@@ -71,6 +68,7 @@ class SPSAStrategy(BaseStrategy):
         routes_df,
         sensor_flow_gt,
         link_selection,
+        evaluation_pool,
     ):
         """
         Initialize the SPSA strategy using the best initial solution and experiment context.
@@ -95,6 +93,8 @@ class SPSAStrategy(BaseStrategy):
             Ground truth traffic flow data.
         link_selection : list[str]
             List of link IDs used in evaluation.
+        evaluation_pool : multiprocessing.pool.Pool
+            Pool of the run, used for the two perturbed evaluations of each step.
         """
         best_idx = Y_init.argmax().item()
         initial_solution = X_init[best_idx].cpu().numpy()
@@ -108,6 +108,7 @@ class SPSAStrategy(BaseStrategy):
         self.routes_df = routes_df
         self.sensor_flow_gt = sensor_flow_gt
         self.link_selection = link_selection
+        self.executor = EvaluationExecutor(evaluation_pool, self.config)
 
     def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed):
         """
@@ -136,41 +137,18 @@ class SPSAStrategy(BaseStrategy):
         x_minus = unnormalize(torch.tensor(d_minus), self.bounds).numpy()
 
         # Run two evaluations in parallel
-        with mp.Pool(processes=2) as pool:
-            results_temp = pool.starmap(
-                run_sample_evaluation,
-                [
-                    (
-                        1,
-                        x_plus,
-                        epoch,
-                        self.config,
-                        self.base_od,
-                        self.path_opt_simul,
-                        self.base_path,
-                        self.routes_df,
-                        self.sensor_flow_gt,
-                        self.link_selection,
-                        len(Y_all_real),
-                    ),
-                    (
-                        2,
-                        x_minus,
-                        epoch,
-                        self.config,
-                        self.base_od,
-                        self.path_opt_simul,
-                        self.base_path,
-                        self.routes_df,
-                        self.sensor_flow_gt,
-                        self.link_selection,
-                        len(Y_all_real),
-                    ),
-                ],
-            )
+        records = self.executor.map(
+            [
+                ("sample", (epoch, 1), (1, x_plus, epoch, len(Y_all_real))),
+                ("sample", (epoch, 2), (2, x_minus, epoch, len(Y_all_real))),
+            ]
+        )
+        for record in records:
+            if not record.ok:
+                raise RuntimeError(f"SPSA perturbation evaluation {record.key} {record.status}: {record.error}")
 
         # Compute gradient estimate from finite differences
-        f_plus, f_minus = results_temp[0][1], results_temp[1][1]
+        f_plus, f_minus = records[0].result[1], records[1].result[1]
         g_k = (f_plus - f_minus) / (2 * ck * delta)
 
         # Update normalized solution and convert back to real scale
@@ -178,3 +156,12 @@ class SPSAStrategy(BaseStrategy):
         X_new_fullD_real = unnormalize(torch.tensor(self.d_k), self.bounds).numpy().reshape(1, -1)
 
         return X_new_fullD_real
+
+    def state_dict(self):
+        """Return the current normalized solution."""
+        return {**super().state_dict(), "d_k": self.d_k}
+
+    def load_state_dict(self, state):
+        """Restore the current normalized solution."""
+        super().load_state_dict(state)
+        self.d_k = state["d_k"]
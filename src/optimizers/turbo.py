@@ -1,6 +1,6 @@
 # Standard library imports
 import math
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Optional
 
 # Third-party imports
@@ -155,7 +155,7 @@ class TurboStrategy(BaseStrategy):
         """Initialize TuRBO state based on input dimensionality and batch size."""
         self.state = TurboState(dim=X_init.shape[1], batch_size=self.params["bo_batch_size"])
 
-    def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed):
+    def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed, X_pending=None, batch_size=None):
         """
         Suggest new candidates using the current TuRBO state and GP surrogate model.
 
@@ -169,6 +169,11 @@ class TurboStrategy(BaseStrategy):
             Current optimization epoch.
         seed : int
             Random seed for reproducibility.
+        X_pending : torch.Tensor, optional
+            Normalized points still being simulated, added to the GP as
+            fantasies at their posterior mean (kriging believer).
+        batch_size : int, optional
+            Number of candidates to suggest. Defaults to bo_batch_size.
 
         Returns
         -------
@@ -183,6 +188,12 @@ class TurboStrategy(BaseStrategy):
         with max_cholesky_size(self.params["cholesky_limit"]):
             safe_fit_gp_model(mll, X_all_fullD_norm, Y_all_real)
 
+            # Thompson sampling has no X_pending; condition on the predicted values instead
+            if X_pending is not None and len(X_pending) > 0:
+                with torch.no_grad():
+                    Y_pending = gp_model.posterior(X_pending).mean
+                gp_model = gp_model.condition_on_observations(X_pending, Y_pending)
+
             X_new_fullD_real = optimize_acqf_and_create_candidate(
                 state=self.state,
                 model=gp_model,
@@ -192,7 +203,7 @@ class TurboStrategy(BaseStrategy):
                 device=self.device,
                 dtype=self.dtype,
                 seed=seed,
-                batch_size=self.params["bo_batch_size"],
+                batch_size=batch_size or self.params["bo_batch_size"],
                 n_candidates=self.params["bo_n_candidates"],
                 num_restarts=self.params["bo_num_restarts"],
                 raw_samples=self.params["bo_raw_samples"],
@@ -211,3 +222,12 @@ class TurboStrategy(BaseStrategy):
             Newly observed objective values from last suggestion.
         """
         self.state = update_state(self.state, Y_next=Y_new)
+
+    def state_dict(self):
+        """Return the trust region state."""
+        return {**super().state_dict(), "turbo_state": asdict(self.state)}
+
+    def load_state_dict(self, state):
+        """Restore the trust region state."""
+        super().load_state_dict(state)
+        self.state = TurboState(**state["turbo_state"])
@@ -102,7 +102,7 @@ class VanillaBOStrategy(BaseStrategy):
         """
         pass  # No internal state needed for Vanilla BO
 
-    def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed):
+    def suggest(self, X_all_fullD_norm, Y_all_real, epoch, seed, X_pending=None, batch_size=None):
         """
         Suggest new candidates using a fitted GP model and acquisition function.
 
@@ -116,6 +116,10 @@ class VanillaBOStrategy(BaseStrategy):
             Current optimization epoch.
         seed : int
             Random seed for reproducibility.
+        X_pending : torch.Tensor, optional
+            Normalized points still being simulated, taken into account by the acquisition function.
+        batch_size : int, optional
+            Number of candidates to suggest. Defaults to bo_batch_size.
 
         Returns
         -------
@@ -134,6 +138,7 @@ class VanillaBOStrategy(BaseStrategy):
                 model=gp_model,
                 best_f=best_f,
                 sampler=StochasticSampler(sample_shape=torch.Size([self.params["bo_sample_shape"]])),
+                X_pending=X_pending,
             )
 
         X_new_fullD_real = optimize_acqf_and_create_candidate(
@@ -141,7 +146,7 @@ class VanillaBOStrategy(BaseStrategy):
             bounds=self.bounds,
             device=self.device,
             dtype=self.dtype,
-            batch_size=self.params["bo_batch_size"],
+            batch_size=batch_size or self.params["bo_batch_size"],
             num_restarts=self.params["bo_num_restarts"],
             raw_samples=self.params["bo_raw_samples"],
         )
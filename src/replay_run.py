@@ -0,0 +1,188 @@
+# Standard library imports
+import argparse
+import os
+import pprint
+import sys
+from pathlib import Path
+
+# Third-party imports
+import pandas as pd
+
+# Local application imports
+from simulation.data_loader import load_config_full_opt, load_sensor_gt, od_xml_to_df
+from simulation.evaluation import run_sample_evaluation
+from simulation.sumo_runner import create_sensor_additional_xml
+from utils.results_store import open_results_store
+
+
+# =====================
+# SUMO Environment Setup
+# =====================
+
+# Set SUMO installation path (edit this according to your OS/environment)
+default_sumo_paths = [
+    "/opt/sumo-1.12/share/sumo",  # Linux
+    "C:/Program Files (x86)/Eclipse/Sumo",  # Windows
+]
+
+sumo_home = os.environ.get("SUMO_HOME")
+if not sumo_home:
+    sumo_home = next((p for p in default_sumo_paths if os.path.exists(p)), None)
+    if not sumo_home:
+        sys.exit("SUMO_HOME is not set and no default path exists.")
+    os.environ["SUMO_HOME"] = sumo_home
+
+os.environ["LIBSUMO_AS_TRACI"] = "1"  # Optional: faster simulation
+
+# Add SUMO tools to Python path
+tools_path = os.path.join(os.environ["SUMO_HOME"], "tools")
+if os.path.exists(tools_path):
+    sys.path.append(tools_path)
+else:
+    sys.exit(f"Cannot find SUMO tools at {tools_path}")
+
+
+# =====================
+# Set Project Base Path
+# =====================
+
+project_root = Path(__file__).resolve().parent.parent
+base_path = str(project_root)
+
+# Check for whitespace in path (SUMO limitation)
+if " " in base_path:
+    raise ValueError("base_path should not contain spaces. SUMO does not support whitespace in paths.")
+
+# Set working directory
+os.chdir(project_root)
+
+
+# =====================
+# Main Function
+# =====================
+
+
+def main():
+    """
+    Re-simulate one (epoch, batch) evaluation of a full optimization run with vehroutes output.
+
+    The OD vector is read from the run's results store and simulated with the same configuration,
+    demand random seed ([seed, epoch, batch]) and SUMO seed as during optimization, so the replay
+    reproduces the original evaluation. The vehroutes file is written next to the other outputs
+    of the run, where sumo_gui_runner.py expects it. Evaluations are stored as they finish, so
+    runs that are still in progress or were interrupted can be replayed too.
+    """
+    # =====================
+    # Parse command-line arguments
+    # =====================
+    parser = argparse.ArgumentParser(description="Replay an optimization evaluation with vehroutes output")
+    parser.add_argument(
+        "--network_name",
+        type=str,
+        default="1ramp",
+        choices=["1ramp", "2corridor", "3junction", "4smallRegion", "5fullRegion"],
+    )
+    parser.add_argument(
+        "--model_name",
+        type=str,
+        default="spsa",
+        choices=["spsa", "vanillabo", "saasbo", "turbo"],
+    )
+    parser.add_argument("--seed", type=int, default=33, help="Random seed of the optimization run")
+    parser.add_argument("--epoch", type=int, required=True, help="Epoch index (e.g., 1)")
+    parser.add_argument("--batch", type=int, required=True, help="Batch index (e.g., 1)")
+    parser.add_argument("--date", type=int, default=221014, help="Date for simulation")
+    parser.add_argument(
+        "--hour",
+        type=str,
+        default="08-09",
+        choices=["06-07", "08-09", "17-18"],
+        help="Time for simulation",
+    )
+    parser.add_argument(
+        "--routes_per_od",
+        type=str,
+        default='single',
+        choices=["single", "multiple"],
+        help="Type of routes to use for the simulation",
+    )
+    args = parser.parse_args()
+    print(args)
+
+    if args.epoch < 1:
+        raise ValueError("Only optimization epochs (epoch >= 1) can be replayed.")
+
+    # =====================
+    # Load configuration
+    # =====================
+    config = load_config_full_opt(
+        base_path,
+        model_name=args.model_name,
+        config_file_name=f"sim_setup_network_{args.network_name}.json",
+    )
+    config["seed"] = args.seed
+    config["write_vehroutes"] = "True"
+    config["sim_cache_dir"] = ""  # always simulate, a cache hit would not write vehroutes
+    pprint.pprint(dict(config))
+
+    # =====================
+    # Load input data
+    # =====================
+    od_df_base = od_xml_to_df(config["od_xml"])
+
+    routes_csv = config["routes_csv"].with_name(f"routes_{args.routes_per_od}.csv")
+    routes_df = pd.read_csv(routes_csv, index_col=0)
+
+    sensor_flow_gt = load_sensor_gt(base_path, args.network_name, args.date, args.hour)
+    link_selection = sensor_flow_gt["link_id"].tolist()
+
+    # =====================
+    # Locate the stored evaluation
+    # =====================
+    run_name = f"{args.date}_{args.hour}_{args.routes_per_od}_seed-{args.seed:02d}"
+    path_init_detail = Path(f"{config['path_init']}{run_name}")
+    path_opt_detail = Path(f"{config['path_opt']}{run_name}")
+    path_opt_simul = path_opt_detail / "simulation"
+    path_opt_result = path_opt_detail / "result"
+
+    results_store = open_results_store(path_opt_result)
+    data_set = results_store.data_set()
+    results_store.close()
+    row = data_set[
+        (data_set["init_search"] == 0) & (data_set["epoch"] == args.epoch) & (data_set["batch"] == args.batch)
+    ]
+    if len(row) != 1:
+        raise ValueError(f"Expected one evaluation for epoch {args.epoch}, batch {args.batch}, found {len(row)}.")
+    x = row.filter(like="x_").to_numpy()[0]
+
+    # Same sensor-only edgeData setup as the optimization run
+    config["additional_xml"] = create_sensor_additional_xml(
+        config["additional_xml"],
+        link_selection,
+        config["sensor_start_time"],
+        config["sensor_end_time"],
+        Path(base_path, path_init_detail, "additional_sensors.xml"),
+    )
+
+    # =====================
+    # Replay the evaluation
+    # =====================
+    _, curr_loss, _ = run_sample_evaluation(
+        args.batch,
+        x,
+        args.epoch,
+        config,
+        od_df_base,
+        path_opt_simul,
+        base_path,
+        routes_df,
+        args.routes_per_od,
+        sensor_flow_gt,
+        link_selection,
+        int(row["num_train_data"].iloc[0]),
+    )
+    print(f"Replayed loss: {curr_loss:.4f} | Recorded loss: {row['loss'].iloc[0]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Standard library imports
+import argparse
+import json
+from pathlib import Path
+
+# Third-party imports
+import pandas as pd
+
+# Local application imports
+from simulation.data_loader import load_sensor_gt, load_sensor_gt_matrix
+from utils.link_flow_analysis import score_sensor_flow_simul
+from utils.results_store import RESULTS_DB_NAME, open_results_store
+
+# =====================
+# Set Project Base Path
+# =====================
+
+project_root = Path(__file__).resolve().parent.parent
+base_path = str(project_root)
+
+
+def main():
+    """
+    Re-score an archived optimization run against ground truth of other dates or hours.
+
+    Reads the simulated sensor flows of a full optimization run from its results store (or from
+    result/sensor_flow_simul.csv for runs without one) and computes the NRMSE of every
+    (epoch, batch) against the GT of all dates at the run's hour ("dates"), or of all hours at
+    the run's date ("hours"), without running any simulation. The table is saved as
+    result/rescored_<across>.csv with one loss column per target.
+    """
+    parser = argparse.ArgumentParser(description="Re-score archived simulation results against other GT targets")
+    parser.add_argument(
+        "--network_name",
+        type=str,
+        default="1ramp",
+        choices=["1ramp", "2corridor", "3junction", "4smallRegion", "5fullRegion"],
+    )
+    parser.add_argument(
+        "--model_name",
+        type=str,
+        default="spsa",
+        choices=["spsa", "vanillabo", "saasbo", "turbo"],
+    )
+    parser.add_argument("--seed", type=int, default=33, help="Random seed of the optimization run")
+    parser.add_argument("--date", type=int, default=221014, help="Date of the optimization run")
+    parser.add_argument(
+        "--hour",
+        type=str,
+        default="08-09",
+        choices=["06-07", "08-09", "17-18"],
+        help="Hour of the optimization run",
+    )
+    parser.add_argument(
+        "--routes_per_od",
+        type=str,
+        default='single',
+        choices=["single", "multiple"],
+        help="Type of routes used for the simulation",
+    )
+    parser.add_argument(
+        "--across",
+        type=str,
+        default="dates",
+        choices=["dates", "hours"],
+        help="Score against all dates at the run's hour, or all hours at the run's date",
+    )
+    args = parser.parse_args()
+    print(args)
+
+    # Output directory naming of load_config_full_opt, without requiring a SUMO installation
+    with open(Path(base_path, "config", f"sim_setup_network_{args.network_name}.json"), "r") as f:
+        network_dir_name = json.load(f)["network_name"]
+    run_name = f"{args.date}_{args.hour}_{args.routes_per_od}_seed-{args.seed:02d}"
+    path_result = Path(
+        base_path, "output/full_optimization", f"{network_dir_name}_{args.model_name}_{run_name}", "result"
+    )
+    if (path_result / RESULTS_DB_NAME).exists():
+        results_store = open_results_store(path_result)
+        sensor_flow_simul = results_store.sensor_flow_simul()
+        results_store.close()
+    elif (path_result / "sensor_flow_simul.csv").exists():
+        sensor_flow_simul = pd.read_csv(path_result / "sensor_flow_simul.csv")
+    else:
+        raise FileNotFoundError(f"Optimization results not found in {path_result}")
+
+    # Ground truth of the run defines the sensor set; other targets are aligned to it
+    targets, gt_matrix, link_ids = load_sensor_gt_matrix(
+        base_path,
+        args.network_name,
+        dates=None if args.across == "dates" else [args.date],
+        hours=[args.hour] if args.across == "dates" else None,
+        link_ids=load_sensor_gt(base_path, args.network_name, args.date, args.hour)["link_id"].tolist(),
+    )
+    target_names = [f"loss_{row.date}_{row.hour}" for row in targets.itertuples()]
+
+    rescored = score_sensor_flow_simul(sensor_flow_simul, gt_matrix, link_ids, target_names)
+    output_file = path_result / f"rescored_{args.across}.csv"
+    rescored.to_csv(output_file, index=False)
+    print(f"[Saved] {output_file}")
+
+
+if __name__ == "__main__":
+    main()
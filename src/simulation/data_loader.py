@@ -4,11 +4,14 @@ import multiprocessing as mp
 import os
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Union
+from typing import Optional, Tuple, Union
 
 # Third-party imports
+import numpy as np
 import pandas as pd
 
+SENSOR_HOURS = ["06-07", "08-09", "17-18"]
+
 
 def load_config_full_opt(base_path: str, model_name: str, config_file_name: str) -> dict:
     """Load and format full optimization simulation configuration into a flat dictionary."""
@@ -38,10 +41,54 @@ def load_config_full_opt(base_path: str, model_name: str, config_file_name: str)
 
     # Simulation output file names
     kwargs_config["link_data_out_str"] = "edge_data.xml"
-    kwargs_config["trips_xml_out_str"] = "trips.xml"
+    kwargs_config["write_link_flow_csv"] = sim_setup.get("write_link_flow_csv", "False")
+    kwargs_config["trips_xml_out_str"] = "trips.xml.gz" if sim_setup.get("compress_trips") == "True" else "trips.xml"
 
     # Environment settings
     kwargs_config["sumo_path"] = os.environ["SUMO_HOME"]
+    kwargs_config["sim_backend"] = sim_setup.get("sim_backend", "subprocess")
+
+    # Demand generation settings
+    kwargs_config["demand_mode"] = sim_setup.get("demand_mode", "trips")
+    kwargs_config["trip_generator"] = sim_setup.get("trip_generator", "numpy")
+    kwargs_config["precomputed_routes"] = sim_setup.get("precomputed_routes", "False")
+    kwargs_config["common_random_numbers"] = sim_setup.get("common_random_numbers", "False")
+    kwargs_config["trip_cache_size"] = sim_setup.get("trip_cache_size", 4)
+
+    # Output settings (vehroutes can be regenerated on demand with replay_run.py)
+    kwargs_config["write_vehroutes"] = sim_setup.get("write_vehroutes", "False")
+
+    # Simulation result cache, e.g. "cache/simulation" (empty disables it). Results are only reused
+    # across evaluations and runs of the same seed with common_random_numbers (see SimulationCache)
+    kwargs_config["sim_cache_dir"] = sim_setup.get("sim_cache_dir", "")
+    kwargs_config["sim_cache_max_mb"] = sim_setup.get("sim_cache_max_mb", 256)
+
+    # Early abort of candidates whose loss bound exceeds this multiple of the best loss (0 disables it)
+    kwargs_config["early_abort_factor"] = sim_setup.get("early_abort_factor", 0)
+
+    # RAM-backed directory for per-evaluation intermediate files, e.g. /dev/shm (empty disables it)
+    kwargs_config["scratch_dir"] = sim_setup.get("scratch_dir", "")
+
+    # Stream edgeData through a named pipe instead of writing it to disk (subprocess backend)
+    kwargs_config["stream_edge_data"] = sim_setup.get("stream_edge_data", "False")
+
+    # Export the result CSV files from the results store every N epochs (0: only at the end of the run)
+    kwargs_config["export_csv_every"] = sim_setup.get("export_csv_every", 0)
+
+    # Keep the in-memory evaluation history in np.memmap files under the result directory
+    kwargs_config["history_memmap"] = sim_setup.get("history_memmap", "False")
+
+    # Suggest and dispatch one BO candidate whenever a simulation finishes, instead of per batch
+    kwargs_config["async_bo"] = sim_setup.get("async_bo", "False")
+
+    # Start the optimizer once this fraction of the initial search has finished (1.0 waits for all)
+    kwargs_config["init_pipeline_fraction"] = sim_setup.get("init_pipeline_fraction", 1.0)
+
+    # Wall-clock limit per SUMO run in seconds and extra attempts after a failure. 0 (the shipped
+    # default) disables the limit and with it the termination of hung workers (see
+    # EvaluationExecutor), so a simulation that hangs blocks the run
+    kwargs_config["sim_timeout"] = sim_setup.get("sim_timeout", 0)
+    kwargs_config["sim_retries"] = sim_setup.get("sim_retries", 0)
 
     # Simulation time settings
     kwargs_config["sim_start_time"] = sim_setup["sim_start_time"]
@@ -98,10 +145,22 @@ def load_config_single_od_run(base_path: str, config_file_name: str) -> dict:
 
     # Simulation output file names
     kwargs_config["link_data_out_str"] = "edge_data.xml"
-    kwargs_config["trips_xml_out_str"] = "trips.xml"
+    kwargs_config["write_link_flow_csv"] = sim_setup.get("write_link_flow_csv", "False")
+    kwargs_config["trips_xml_out_str"] = "trips.xml.gz" if sim_setup.get("compress_trips") == "True" else "trips.xml"
 
     # Environment settings
     kwargs_config["sumo_path"] = os.environ["SUMO_HOME"]
+    kwargs_config["sim_backend"] = sim_setup.get("sim_backend", "subprocess")
+
+    # Demand generation settings
+    kwargs_config["demand_mode"] = sim_setup.get("demand_mode", "trips")
+    kwargs_config["trip_generator"] = sim_setup.get("trip_generator", "numpy")
+    kwargs_config["precomputed_routes"] = sim_setup.get("precomputed_routes", "False")
+    kwargs_config["common_random_numbers"] = sim_setup.get("common_random_numbers", "False")
+    kwargs_config["trip_cache_size"] = sim_setup.get("trip_cache_size", 4)
+
+    # Single runs are inspected in the SUMO GUI, so they always write vehroutes
+    kwargs_config["write_vehroutes"] = "True"
 
     # Simulation time settings
     kwargs_config["sim_start_time"] = sim_setup["sim_start_time"]
@@ -123,6 +182,298 @@ def load_config_single_od_run(base_path: str, config_file_name: str) -> dict:
     return kwargs_config
 
 
+def load_sensor_gt(base_path: str, network_name: str, date, hour: str) -> pd.DataFrame:
+    """
+    Load the ground-truth sensor counts of one date and hour.
+
+    Reads from the network's memory-mapped GT store if it has been built and holds the target
+    (see build_gt_store), otherwise from the target's CSV file.
+
+    Parameters
+    ----------
+    base_path : str
+        Project root containing the "sensor_data" directory.
+    network_name : str
+        Network name as used in the GT file names (e.g. "1ramp").
+    date : int or str
+        Date (YYMMDD).
+    hour : str
+        Hour (e.g. "08-09").
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per sensor with data, with "link_id" and "interval_nVehContrib" columns.
+    """
+    gt_store = load_gt_store(base_path, network_name)
+    if gt_store is not None and gt_store.has_target(date, hour):
+        columns = gt_store.row_columns(date, hour)
+        return pd.DataFrame(
+            {
+                "link_id": np.asarray(gt_store.link_ids, dtype=object)[columns],
+                "interval_nVehContrib": gt_store.vector(date, hour)[columns],
+            }
+        )
+
+    gt_file = Path(base_path, "sensor_data", str(date), f"gt_link_data_{network_name}_{date}_{hour}.csv")
+    return pd.read_csv(gt_file, dtype={"link_id": str})
+
+
+def load_sensor_gt_matrix(
+    base_path: str,
+    network_name: str,
+    dates: Optional[list[int]] = None,
+    hours: Optional[list[str]] = None,
+    link_ids: Optional[list[str]] = None,
+) -> Tuple[pd.DataFrame, np.ndarray, list[str]]:
+    """
+    Load the ground-truth sensor counts of many dates and hours into one aligned matrix.
+
+    Reads from the network's memory-mapped GT store if it has been built (see build_gt_store),
+    otherwise from the per-target CSV files.
+
+    Parameters
+    ----------
+    base_path : str
+        Project root containing the "sensor_data" directory.
+    network_name : str
+        Network name as used in the GT file names (e.g. "1ramp").
+    dates : Optional[list[int]]
+        Dates to load (YYMMDD). Defaults to every date in sensor_data.
+    hours : Optional[list[str]]
+        Hours to load (e.g. "08-09"). Defaults to all hours.
+    link_ids : Optional[list[str]]
+        Sensor columns of the matrix. Defaults to the union of sensors in first-seen order.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, np.ndarray, list[str]]
+        - One row per loaded target with "date" and "hour" columns
+        - (targets x sensors) count matrix, NaN where a sensor has no data for a target
+        - Sensor link IDs of the matrix columns
+    """
+    gt_store = load_gt_store(base_path, network_name)
+    if gt_store is not None:
+        return gt_store.select(dates, hours, link_ids)
+
+    targets, frames = _read_gt_files(base_path, network_name, dates, hours)
+    if link_ids is None:
+        link_ids = list(dict.fromkeys(link_id for frame in frames for link_id in frame.index))
+    link_ids = [str(link_id) for link_id in link_ids]
+
+    gt_matrix = np.full((len(frames), len(link_ids)), np.nan)
+    for k, frame in enumerate(frames):
+        gt_matrix[k] = frame.reindex(link_ids).to_numpy(dtype=np.float64)
+
+    return pd.DataFrame(targets, columns=["date", "hour"]), gt_matrix, link_ids
+
+
+def _read_gt_files(
+    base_path: str,
+    network_name: str,
+    dates: Optional[list[int]] = None,
+    hours: Optional[list[str]] = None,
+) -> Tuple[list[dict], list[pd.Series]]:
+    """Read the GT CSV files of a network into one count Series per target, in file row order."""
+    sensor_path = Path(base_path, "sensor_data")
+    if dates is None:
+        dates = sorted(int(path.name) for path in sensor_path.iterdir() if path.name.isdigit())
+    if hours is None:
+        hours = SENSOR_HOURS
+
+    targets, frames = [], []
+    for date in dates:
+        for hour in hours:
+            gt_file = sensor_path / str(date) / f"gt_link_data_{network_name}_{date}_{hour}.csv"
+            if not gt_file.exists():
+                continue
+            gt_df = pd.read_csv(gt_file)
+            frames.append(pd.Series(gt_df["interval_nVehContrib"].to_numpy(), index=gt_df["link_id"].astype(str)))
+            targets.append({"date": date, "hour": hour})
+
+    return targets, frames
+
+
+class SensorGTStore:
+    """
+    Ground-truth sensor counts of one network as a (dates x hours x sensors) array.
+
+    The array is memory-mapped from `sensor_data/gt_store_<network>.npy`, with the date, hour
+    and sensor link ID of each axis in `sensor_data/gt_store_<network>.json`. Sensors without
+    data for a target, and targets without a GT file, are NaN. The index also keeps the row
+    order of every GT file as sensor axis positions, so a target reads back like its CSV file.
+    """
+
+    def __init__(
+        self,
+        counts: np.ndarray,
+        dates: list[int],
+        hours: list[str],
+        link_ids: list[str],
+        row_order: list[list[list[int]]],
+    ):
+        self.counts = counts
+        self.dates = [int(date) for date in dates]
+        self.hours = list(hours)
+        self.link_ids = [str(link_id) for link_id in link_ids]
+        self.row_order = row_order
+        self._date_index = {date: i for i, date in enumerate(self.dates)}
+        self._hour_index = {hour: i for i, hour in enumerate(self.hours)}
+        self._link_index = {link_id: i for i, link_id in enumerate(self.link_ids)}
+
+    def has_target(self, date: int, hour: str) -> bool:
+        """Return True if the store holds ground truth for this date and hour."""
+        i, j = self._date_index.get(int(date)), self._hour_index.get(hour)
+        return i is not None and j is not None and not np.isnan(self.counts[i, j]).all()
+
+    def row_columns(self, date: int, hour: str) -> np.ndarray:
+        """Return the sensor axis positions of one target in the row order of its GT file."""
+        if not self.has_target(date, hour):
+            raise KeyError(f"No ground truth for date {date}, hour {hour} in the GT store.")
+        return np.asarray(self.row_order[self._date_index[int(date)]][self._hour_index[hour]], dtype=np.intp)
+
+    def link_columns(self, link_ids: list[str]) -> np.ndarray:
+        """Return the sensor axis positions of `link_ids`, -1 for sensors not in the store."""
+        return np.array([self._link_index.get(str(link_id), -1) for link_id in link_ids], dtype=np.intp)
+
+    def vector(self, date: int, hour: str, link_ids: Optional[list[str]] = None) -> np.ndarray:
+        """
+        Return the GT counts of one date and hour.
+
+        Parameters
+        ----------
+        date : int
+            Date (YYMMDD).
+        hour : str
+            Hour (e.g. "08-09").
+        link_ids : Optional[list[str]]
+            Sensors to return, in this order. Defaults to all sensors of the store.
+
+        Returns
+        -------
+        np.ndarray
+            Counts, NaN for sensors without data.
+        """
+        if not self.has_target(date, hour):
+            raise KeyError(f"No ground truth for date {date}, hour {hour} in the GT store.")
+        row = self.counts[self._date_index[int(date)], self._hour_index[hour]]
+        if link_ids is None:
+            return np.array(row)
+        return _take_columns(row[np.newaxis], self.link_columns(link_ids))[0]
+
+    def select(
+        self,
+        dates: Optional[list[int]] = None,
+        hours: Optional[list[str]] = None,
+        link_ids: Optional[list[str]] = None,
+    ) -> Tuple[pd.DataFrame, np.ndarray, list[str]]:
+        """
+        Return the GT counts of many dates and hours, in the format of load_sensor_gt_matrix.
+
+        Targets without ground truth are skipped. Without `link_ids`, the columns are the sensors
+        with data for at least one selected target.
+        """
+        dates = self.dates if dates is None else [int(date) for date in dates]
+        hours = SENSOR_HOURS if hours is None else list(hours)
+        targets = [(date, hour) for date in dates for hour in hours if self.has_target(date, hour)]
+
+        rows = self.counts[
+            [self._date_index[date] for date, _ in targets],
+            [self._hour_index[hour] for _, hour in targets],
+        ]
+        if link_ids is None:
+            columns = np.flatnonzero(~np.isnan(rows).all(axis=0))
+            link_ids = [self.link_ids[k] for k in columns]
+        else:
+            link_ids = [str(link_id) for link_id in link_ids]
+            columns = self.link_columns(link_ids)
+
+        return pd.DataFrame(targets, columns=["date", "hour"]), _take_columns(rows, columns), link_ids
+
+
+def _take_columns(rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Gather sensor columns of a count matrix, NaN where a column index is -1."""
+    out = np.asarray(rows, dtype=np.float64)[:, columns]
+    out[:, columns < 0] = np.nan
+    return out
+
+
+_GT_STORES: dict = {}
+
+
+def gt_store_paths(base_path: str, network_name: str) -> Tuple[Path, Path]:
+    """Return the array and index file paths of a network's GT store."""
+    sensor_path = Path(base_path, "sensor_data")
+    return sensor_path / f"gt_store_{network_name}.npy", sensor_path / f"gt_store_{network_name}.json"
+
+
+def build_gt_store(base_path: str, network_name: str) -> Tuple[Path, Path]:
+    """
+    Pack the GT CSV files of a network into a single array file with a JSON index.
+
+    Parameters
+    ----------
+    base_path : str
+        Project root containing the "sensor_data" directory.
+    network_name : str
+        Network name as used in the GT file names (e.g. "1ramp").
+
+    Returns
+    -------
+    Tuple[Path, Path]
+        Paths of the array (.npy) and index (.json) files.
+    """
+    array_file, index_file = gt_store_paths(base_path, network_name)
+    _GT_STORES.pop(str(array_file), None)
+    for path in (array_file, index_file):
+        path.unlink(missing_ok=True)  # read the CSV files, not a previous store
+
+    targets, frames = _read_gt_files(base_path, network_name)
+    if len(targets) == 0:
+        raise FileNotFoundError(f"No GT files found for network {network_name}.")
+    dates = sorted({target["date"] for target in targets})
+    link_ids = list(dict.fromkeys(link_id for frame in frames for link_id in frame.index))
+    link_index = {link_id: k for k, link_id in enumerate(link_ids)}
+
+    counts = np.full((len(dates), len(SENSOR_HOURS), len(link_ids)), np.nan)
+    row_order = [[[] for _ in SENSOR_HOURS] for _ in dates]
+    date_index = {date: i for i, date in enumerate(dates)}
+    for target, frame in zip(targets, frames):
+        i, j = date_index[target["date"]], SENSOR_HOURS.index(target["hour"])
+        columns = [link_index[link_id] for link_id in frame.index]
+        counts[i, j, columns] = frame.to_numpy(dtype=np.float64)
+        row_order[i][j] = columns
+
+    # Write both files under temporary names first, so readers never see a partial store
+    tmp_array_file = array_file.with_name(f"{array_file.stem}.{os.getpid()}.tmp.npy")
+    tmp_index_file = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+    np.save(tmp_array_file, counts)
+    with open(tmp_index_file, "w") as f:
+        json.dump({"dates": dates, "hours": SENSOR_HOURS, "link_ids": link_ids, "row_order": row_order}, f)
+    os.replace(tmp_index_file, index_file)
+    os.replace(tmp_array_file, array_file)
+
+    return array_file, index_file
+
+
+def load_gt_store(base_path: str, network_name: str) -> Optional[SensorGTStore]:
+    """Return the memory-mapped GT store of a network, or None if it has not been built."""
+    array_file, index_file = gt_store_paths(base_path, network_name)
+    if str(array_file) not in _GT_STORES:
+        if not (array_file.exists() and index_file.exists()):
+            return None
+        with open(index_file, "r") as f:
+            index = json.load(f)
+        if "row_order" not in index:
+            print(f"[Warning] {index_file} predates the GT row order; rebuild it with build_gt_store.py.")
+            return None
+        counts = np.load(array_file, mmap_mode="r")
+        _GT_STORES[str(array_file)] = SensorGTStore(
+            counts, index["dates"], index["hours"], index["link_ids"], index["row_order"]
+        )
+    return _GT_STORES[str(array_file)]
+
+
 def od_xml_to_df(file_path: Path) -> pd.DataFrame:
     """Parse an OD XML file and return it as a pandas DataFrame."""
     tree = ET.parse(file_path)
@@ -131,6 +482,14 @@ def od_xml_to_df(file_path: Path) -> pd.DataFrame:
     return gt_od_df
 
 
+def od_interval_xml_to_df(file_path: Path) -> Tuple[pd.DataFrame, float, float]:
+    """Parse a TAZ relation XML file and return its relations with float counts and the interval bounds."""
+    interval = ET.parse(file_path).getroot().find("interval")
+    od_df = pd.DataFrame([rel.attrib for rel in interval.iter("tazRelation")])
+    od_df["count"] = od_df["count"].astype(float)
+    return od_df, float(interval.get("begin", 0)), float(interval.get("end"))
+
+
 def xml2df_str(root: ET.Element, row_str: str) -> pd.DataFrame:
     """Convert matching XML elements under a root into a pandas DataFrame."""
     return pd.DataFrame(list(iter_str(root, row_str)))
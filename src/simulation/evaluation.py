@@ -1,6 +1,7 @@
 # Standard library imports
 import os
 import time
+from dataclasses import dataclass
 from pathlib import Path
 
 # Third-party imports
@@ -8,8 +9,349 @@ import numpy as np
 import pandas as pd
 
 # Local application imports
+from simulation.result_cache import get_simulation_cache
+from simulation.scratch import get_scratch_additional_xml, get_scratch_root, release_scratch_files
 from simulation.sumo_runner import create_od_tazrelation_xml, simulate_od
-from utils.link_flow_analysis import compute_nrmse_counts_all_links, parse_link_flow_xml_to_pandas
+from simulation.trip_generator import CommonRandomNumbers
+from utils.link_flow_analysis import NRMSEScorer, compute_nrmse_counts_all_links, parse_link_flow_xml_to_pandas
+
+
+def cleanup_simulation_files(config, base_path, prefix_output_simul, sim_link_out):
+    """
+    Remove intermediate SUMO files of one evaluation, skipping files the run did not produce.
+
+    The vehroutes file (if written) is kept for SUMO GUI visualization.
+
+    Parameters
+    ----------
+    config : dict
+        Simulation configuration parameters.
+    base_path : str
+        Base directory for input/output files.
+    prefix_output_simul : str
+        Output prefix of the evaluation.
+    sim_link_out : str
+        Path to the edgeData output file.
+    """
+    trips_out = config["trips_xml_out_str"]
+    intermediate_files = [
+        sim_link_out,
+        f"{base_path}/{prefix_output_simul}_{trips_out.split('.')[0]}_beforeRteUpdates.xml",
+        f"{base_path}/{prefix_output_simul}_{trips_out}",
+    ]
+    for file in intermediate_files:
+        try:
+            os.remove(file)
+        except FileNotFoundError:
+            pass
+
+
+def record_early_abort(record_file, epoch, batch, loss_bound, abort_loss):
+    """
+    Append one early-aborted evaluation to a CSV record shared by parallel workers.
+
+    Parameters
+    ----------
+    record_file : Path
+        Path to the early abort record (created with a header on first use).
+    epoch : int
+        Epoch index of the evaluation.
+    batch : int
+        Batch index of the evaluation.
+    loss_bound : float
+        NRMSE lower bound at the time the simulation was stopped (used as its loss).
+    abort_loss : float
+        Abort threshold of the evaluation.
+    """
+    try:
+        with open(record_file, "x") as f:
+            f.write("epoch,batch,early_abort,loss_bound,abort_loss\n")
+    except FileExistsError:
+        pass
+    with open(record_file, "a") as f:
+        f.write(f"{epoch},{batch},True,{loss_bound},{abort_loss}\n")
+
+
+def get_demand_rng(config, *stream_key):
+    """
+    Return the random source used for demand generation of one evaluation.
+
+    With common random numbers enabled, every evaluation shares the same per-OD streams derived
+    from the run seed. Otherwise an independent generator is seeded from the run seed and
+    `stream_key` (e.g. epoch and batch index) so each evaluation stays reproducible.
+
+    Parameters
+    ----------
+    config : dict
+        Simulation configuration parameters.
+    *stream_key : int
+        Indices identifying the evaluation within the run.
+
+    Returns
+    -------
+    np.random.Generator or CommonRandomNumbers
+        Random source passed to `simulate_od`.
+    """
+    seed = config.get("seed", 0)
+    if config.get("common_random_numbers") == "True":
+        return CommonRandomNumbers(seed)
+    return np.random.default_rng([seed, *stream_key])
+
+
+def simulate_link_stats(
+    config,
+    base_path,
+    od_df,
+    new_od_xml,
+    prefix_output_simul,
+    routes_df,
+    routes_per_od,
+    link_selection,
+    stream_key,
+    gt_counts=None,
+    abort_loss=None,
+):
+    """
+    Simulate one OD matrix and return its sensor link statistics, reusing cached results.
+
+    The simulation cache is consulted before any file is written. On a miss the OD XML is
+    written, SUMO is run, and the aggregated link statistics are stored in the cache. With
+    `scratch_dir` set, all per-evaluation files are written to the process scratch root and
+    only the kept artifacts are moved to the output tree, even if the simulation fails.
+
+    Parameters
+    ----------
+    config : dict
+        Simulation configuration parameters.
+    base_path : str
+        Base directory for input/output files.
+    od_df : pd.DataFrame
+        OD matrix with "from", "to" and rounded "count" columns.
+    new_od_xml : str
+        Path of the OD TAZ relation XML to write.
+    prefix_output_simul : str
+        Output prefix of the evaluation.
+    routes_df : pd.DataFrame
+        Route information DataFrame.
+    routes_per_od : str
+        Type of routes to use for the simulation (single or multiple).
+    link_selection : list
+        List of links selected for evaluation.
+    stream_key : tuple
+        Indices identifying the evaluation within the run, used to seed the demand generation
+        (see `get_demand_rng`) and as part of the cache key.
+    gt_counts : np.ndarray, optional
+        Ground-truth counts aligned with `link_selection`, used for early abort.
+    abort_loss : float, optional
+        NRMSE lower bound above which the simulation is stopped early. None disables it.
+
+    Returns
+    -------
+    tuple
+        - curr_link_stats (pd.DataFrame): Aggregated sensor link statistics. Stopped runs carry
+          `attrs["early_abort"]` and `attrs["loss_bound"]` and are not cached.
+        - run_time (float): Simulation wall time in seconds (0 for cache hits).
+    """
+    sim_cache = get_simulation_cache(config, base_path)
+    if sim_cache is not None:
+        cache_key = sim_cache.key(config, routes_df, routes_per_od, od_df, link_selection, stream_key)
+        cached_link_stats = sim_cache.get(cache_key)
+        if cached_link_stats is not None:
+            return cached_link_stats, 0.0
+
+    # Per-evaluation files go to a RAM-backed scratch root with a bare output prefix if configured
+    if config.get("scratch_dir"):
+        work_dir = get_scratch_root(config["scratch_dir"])
+        work_prefix = Path(prefix_output_simul).name
+        work_od_xml = work_dir / f"{work_prefix}_od.xml"
+        additional_xml = get_scratch_additional_xml(config["additional_xml"], work_dir)
+    else:
+        work_dir = base_path
+        work_prefix = prefix_output_simul
+        work_od_xml = new_od_xml
+        additional_xml = config["additional_xml"]
+
+    sim_link_out = f"{work_dir}/{work_prefix}_{config['link_data_out_str']}"
+
+    try:
+        # Save OD as TAZ XML
+        create_od_tazrelation_xml(
+            od_df=od_df,
+            output_file=Path(work_od_xml),
+            od_end_time_seconds=config["od_end_time"],
+        )
+
+        # Run SUMO simulation
+        start_time = time.time()
+        direct_link_stats = simulate_od(
+            work_od_xml,
+            work_prefix,
+            work_dir,
+            config["net_xml"],
+            config["taz_xml"],
+            additional_xml,
+            routes_df,
+            routes_per_od,
+            config["sim_end_time"],
+            config["trips_xml_out_str"],
+            sim_backend=config["sim_backend"],
+            demand_mode=config["demand_mode"],
+            trip_generator=config["trip_generator"],
+            precomputed_routes=config["precomputed_routes"] == "True",
+            rng=get_demand_rng(config, *stream_key),
+            trip_cache_size=config["trip_cache_size"],
+            write_vehroutes=config["write_vehroutes"] == "True",
+            gt_counts=gt_counts,
+            abort_loss=abort_loss,
+            edge_data_fifo=sim_link_out if config.get("stream_edge_data") == "True" else None,
+            edge_data_xml=sim_link_out,
+            sim_timeout=float(config.get("sim_timeout", 0)) or None,
+            link_list=link_selection,
+            sensor_start_time=config["sensor_start_time"],
+            sensor_end_time=config["sensor_end_time"],
+        )
+        run_time = time.time() - start_time
+
+        # Load simulation output
+        if direct_link_stats is not None:
+            curr_link_stats = direct_link_stats
+        else:
+            curr_link_stats, _, _ = parse_link_flow_xml_to_pandas(
+                work_dir,
+                sim_link_out,
+                work_prefix,
+                config["sensor_start_time"],
+                config["sensor_end_time"],
+                link_list=link_selection,
+                write_csv=config["write_link_flow_csv"] == "True",
+            )
+    finally:
+        if config.get("scratch_dir"):
+            release_scratch_files(
+                work_dir,
+                work_prefix,
+                Path(base_path, prefix_output_simul).parent,
+                keep_all=config["eliminate_sumo_run_files"] != "True",
+            )
+
+    if sim_cache is not None and not curr_link_stats.attrs.get("early_abort", False):
+        sim_cache.put(cache_key, curr_link_stats)
+
+    return curr_link_stats, run_time
+
+
+@dataclass
+class EvaluationResult:
+    """
+    Outcome of simulating and scoring one OD vector.
+
+    Attributes
+    ----------
+    link_stats : pd.DataFrame
+        Aggregated sensor link statistics.
+    loss : float
+        NRMSE of the simulated counts, or the NRMSE lower bound of an early-aborted run.
+    run_time : float
+        Simulation wall time in seconds (0 for cache hits).
+    early_abort : bool
+        True if the simulation was stopped early.
+    """
+
+    link_stats: pd.DataFrame
+    loss: float
+    run_time: float
+    early_abort: bool = False
+
+
+def evaluate_od(
+    config,
+    base_path,
+    x,
+    base_od,
+    new_od_xml,
+    prefix_output_simul,
+    routes_df,
+    routes_per_od,
+    link_selection,
+    sensor_flow_gt,
+    stream_key,
+    abort_loss=None,
+    scorer=None,
+):
+    """
+    Write, simulate, parse, and score one OD vector, then clean up its intermediate files.
+
+    This is the evaluation pipeline shared by the initial search, optimization, and single OD
+    runs; they only differ in their output file names and in what they record.
+
+    Parameters
+    ----------
+    config : dict
+        Simulation and optimization configuration parameters.
+    base_path : str
+        Base directory for input/output files.
+    x : array-like
+        OD demand values.
+    base_od : pd.DataFrame
+        Base OD matrix DataFrame.
+    new_od_xml : str
+        Path of the OD TAZ relation XML to write.
+    prefix_output_simul : str
+        Output prefix of the evaluation.
+    routes_df : pd.DataFrame
+        Route information DataFrame.
+    routes_per_od : str
+        Type of routes to use for the simulation (single or multiple).
+    link_selection : list
+        List of links selected for evaluation.
+    sensor_flow_gt : pd.DataFrame
+        Ground truth sensor data for comparison.
+    stream_key : tuple
+        Indices identifying the evaluation within the run (see `get_demand_rng`).
+    abort_loss : float, optional
+        NRMSE lower bound above which the simulation is stopped early. None disables it.
+    scorer : NRMSEScorer, optional
+        Scorer of the sensor links of `sensor_flow_gt`, reused across evaluations.
+
+    Returns
+    -------
+    EvaluationResult
+        Link statistics, loss, and run time of the evaluation.
+    """
+    # Prepare OD matrix
+    curr_od = np.asarray(x, dtype=np.float64)
+    print(f"Total expected demand: {curr_od.sum():.1f}")
+
+    base_od_copy = base_od.copy()
+    base_od_copy["count"] = [round(elem, 1) for elem in curr_od]
+    base_od_copy = base_od_copy.rename(columns={"fromTaz": "from", "toTaz": "to"})
+
+    # Run SUMO simulation (or reuse a cached result)
+    curr_link_stats, run_time = simulate_link_stats(
+        config,
+        base_path,
+        base_od_copy,
+        new_od_xml,
+        prefix_output_simul,
+        routes_df,
+        routes_per_od,
+        link_selection,
+        stream_key,
+        gt_counts=sensor_flow_gt["interval_nVehContrib"].to_numpy(dtype=np.float64),
+        abort_loss=abort_loss,
+    )
+    early_abort = curr_link_stats.attrs.get("early_abort", False)
+    if early_abort:
+        curr_loss = curr_link_stats.attrs["loss_bound"]
+    else:
+        curr_loss = compute_nrmse_counts_all_links(sensor_flow_gt, curr_link_stats, scorer=scorer)
+
+    # Clean up intermediate simulation files (optional)
+    if config["eliminate_sumo_run_files"] == "True":
+        sim_link_out = f"{base_path}/{prefix_output_simul}_{config['link_data_out_str']}"
+        cleanup_simulation_files(config, base_path, prefix_output_simul, sim_link_out)
+
+    return EvaluationResult(curr_link_stats, curr_loss, run_time, early_abort)
 
 
 def run_initial_evaluation(
@@ -18,19 +360,16 @@ def run_initial_evaluation(
     base_od,
     config,
     base_path,
-    lock,
-    ods_epsilon,
-    loss_all,
-    batch_data_i,
     path_init_simul,
     routes_df,
     routes_per_od,
     link_selection,
     sensor_flow_gt,
     dim_od,
+    scorer=None,
 ):
     """
-    Run a simulation for an initial OD (Origin-Destination) sample and record the results.
+    Run a simulation for an initial OD (Origin-Destination) sample and return its dataset row.
 
     Parameters
     ----------
@@ -44,14 +383,6 @@ def run_initial_evaluation(
         Simulation and optimization configuration parameters.
     base_path : str
         Base directory for input/output files.
-    lock : threading.Lock
-        Lock object for multiprocessing (not used directly here).
-    ods_epsilon : list
-        List to collect all initial OD samples.
-    loss_all : list
-        List to collect all initial sample losses.
-    batch_data_i : list
-        List to collect DataFrames of sample metadata.
     path_init_simul : str
         Output path for initial search simulations.
     routes_df : pd.DataFrame
@@ -64,88 +395,43 @@ def run_initial_evaluation(
         Ground truth sensor data for comparison.
     dim_od : int
         Dimension of OD matrix (number of OD pairs).
+    scorer : NRMSEScorer, optional
+        Scorer of the sensor links, reused across evaluations (e.g. one per pool worker).
 
     Returns
     -------
-    None
+    pd.DataFrame
+        One-row DataFrame with the sample metadata, loss, and OD values.
     """
     i += 1
     print(f"\n########### Initial OD Sample: {i} ###########")
 
-    # Prepare file paths
-    new_od_xml = f"{path_init_simul}/init_{i}_od.xml"
-    prefix_output_simul = f"{path_init_simul}/init_{i}"
-
-    # Prepare OD matrix
-    curr_od = np.array(x)
-    print(f"Total expected demand: {curr_od.sum():.1f}")
-
-    base_od_copy = base_od.copy()
-    base_od_copy["count"] = [round(elem, 1) for elem in curr_od]
-    base_od_copy = base_od_copy.rename(columns={"fromTaz": "from", "toTaz": "to"})
-
-    # Save OD as TAZ XML
-    create_od_tazrelation_xml(
-        od_df=base_od_copy,
-        output_file=Path(new_od_xml),
-        od_end_time_seconds=config["od_end_time"],
-    )
-
-    # Save current OD sample
-    ods_epsilon.append(curr_od)
-
-    # Run SUMO simulation
-    start_time = time.time()
-    simulate_od(
-        new_od_xml,
-        prefix_output_simul,
+    result = evaluate_od(
+        config,
         base_path,
-        config["net_xml"],
-        config["taz_xml"],
-        config["additional_xml"],
+        x,
+        base_od,
+        f"{path_init_simul}/init_{i}_od.xml",
+        f"{path_init_simul}/init_{i}",
         routes_df,
         routes_per_od,
-        config["sim_end_time"],
-        config["trips_xml_out_str"],
+        link_selection,
+        sensor_flow_gt,
+        (0, i),
+        scorer=scorer,
     )
-    run_time = time.time() - start_time
+    print(f"Loss: {result.loss:.4f}")
 
-    # Load simulation output and compute loss
-    sim_link_out = f"{base_path}/{prefix_output_simul}_{config['link_data_out_str']}"
-    curr_link_stats, _, _ = parse_link_flow_xml_to_pandas(
-        base_path,
-        sim_link_out,
-        prefix_output_simul,
-        config["sensor_start_time"],
-        config["sensor_end_time"],
-        link_list=link_selection,
-    )
-    curr_loss = compute_nrmse_counts_all_links(sensor_flow_gt, curr_link_stats)
-    print(f"Loss: {curr_loss:.4f}")
-
-    # Save loss
-    loss_all.append(curr_loss)
-
-    # Save sample metadata
-    df_curr = pd.DataFrame(curr_od.reshape(1, -1), columns=[f"x_{j}" for j in range(1, dim_od + 1)])
+    # Sample metadata
+    df_curr = pd.DataFrame(np.reshape(x, (1, -1)), columns=[f"x_{j}" for j in range(1, dim_od + 1)])
     df_curr.insert(0, "init_search", i)
     df_curr.insert(1, "epoch", 0)
     df_curr.insert(2, "batch", 0)
-    df_curr.insert(3, "loss", curr_loss)
-    df_curr.insert(4, "run_time", run_time)
+    df_curr.insert(3, "loss", result.loss)
+    df_curr.insert(4, "run_time", result.run_time)
     df_curr.insert(5, "num_train_data", 0)
-    batch_data_i.append(df_curr)
 
-    # Clean up intermediate simulation files (optional)
-    if config["eliminate_sumo_run_files"] == "True":
-        trips_out = config["trips_xml_out_str"]
-        try:
-            os.remove(sim_link_out)
-            os.remove(f"{base_path}/{prefix_output_simul}_{trips_out[:-4]}_beforeRteUpdates.xml")
-            os.remove(f"{base_path}/{prefix_output_simul}_{trips_out}")
-            # os.remove(f"{base_path}/{prefix_output_simul}_routes.vehroutes.xml")
-        except FileNotFoundError:
-            print("[Warning] Some intermediate files were not found during cleanup.")
+    return df_curr
 
 
 def run_sample_evaluation(
@@ -161,9 +447,11 @@ def run_sample_evaluation(
     sensor_flow_gt,
     link_selection,
     num_train_data,
+    best_loss=None,
+    scorer=None,
 ):
     """
-    Run a simulation for a single sample and return loss and link statistics.
+    Run a simulation for a single sample and return its loss and sensor statistics as arrays.
 
     Parameters
     ----------
@@ -191,6 +479,13 @@ def run_sample_evaluation(
         List of links selected for evaluation.
     num_train_data : int
         Number of training data points collected so far.
+    best_loss : float, optional
+        Best loss observed so far. With `early_abort_factor` > 0, the simulation is stopped once
+        its NRMSE lower bound exceeds `early_abort_factor * best_loss`, and the bound is used as
+        the loss. The stop is recorded in early_abort.csv next to the simulation outputs.
+    scorer : NRMSEScorer, optional
+        Scorer of `link_selection`, reused across evaluations (e.g. one per pool worker).
+        Built for this call if None.
 
     Returns
     -------
@@ -200,74 +495,47 @@ def run_sample_evaluation(
         - run_simul_info (list): Metadata about the simulation run
           (e.g., [strategy_id, epoch, batch, runtime, num_train_data]).
         - curr_loss (float): NRMSE loss between simulated and ground-truth link flows.
-        - curr_link_stats (pd.DataFrame): DataFrame with detailed simulation results for each link.
+        - link_flow (np.ndarray): (2 x sensors) simulated counts and harmonic mean speeds,
+          aligned with `link_selection`, NaN for sensors without output.
     """
     print(f"\n##### Epoch {i} — Batch {j} #####")
 
-    # Prepare file paths
-    new_od_xml = f"{path_opt_simul}/opt_{i}_{j}_od.xml"
-    prefix_output_simul = f"{path_opt_simul}/opt_{i}_{j}"
-
-    # Prepare OD matrix
-    curr_od = x_j
-    base_od_copy = base_od.copy()
-    base_od_copy["count"] = [round(elem, 1) for elem in curr_od]
-    base_od_copy = base_od_copy.rename(columns={"fromTaz": "from", "toTaz": "to"})
-
-    # Save OD as TAZ XML
-    create_od_tazrelation_xml(
-        od_df=base_od_copy,
-        output_file=Path(new_od_xml),
-        od_end_time_seconds=config["od_end_time"],
-    )
-    print(f"Total expected demand: {x_j.sum():.1f}")
+    # Stop hopeless simulations early relative to the incumbent (traci backend only)
+    abort_loss = None
+    if best_loss is not None and config.get("early_abort_factor", 0) > 0:
+        abort_loss = config["early_abort_factor"] * best_loss
 
-    # Run SUMO simulation
-    start_time = time.time()
-    simulate_od(
-        new_od_xml,
-        prefix_output_simul,
+    if scorer is None:
+        scorer = NRMSEScorer(link_selection)
+    result = evaluate_od(
+        config,
         base_path,
-        config["net_xml"],
-        config["taz_xml"],
-        config["additional_xml"],
+        x_j,
+        base_od,
+        f"{path_opt_simul}/opt_{i}_{j}_od.xml",
+        f"{path_opt_simul}/opt_{i}_{j}",
         routes_df,
         routes_per_od,
-        config["sim_end_time"],
-        config["trips_xml_out_str"],
+        link_selection,
+        sensor_flow_gt,
+        (i, j),
+        abort_loss=abort_loss,
+        scorer=scorer,
     )
-    run_time = time.time() - start_time
-
-    # Load simulation output and compute loss
-    sim_link_out = f"{base_path}/{prefix_output_simul}_{config['link_data_out_str']}"
-    curr_link_stats, _, _ = parse_link_flow_xml_to_pandas(
-        base_path,
-        sim_link_out,
-        prefix_output_simul,
-        config["sensor_start_time"],
-        config["sensor_end_time"],
-        link_list=link_selection,
+    if result.early_abort:
+        record_early_abort(Path(path_opt_simul) / "early_abort.csv", i, j, result.loss, abort_loss)
+    print(f"Loss: {result.loss:.4f} | Runtime: {result.run_time:.2f}s")
+
+    # Compact record for the parent process, aligned with the sensor order
+    run_simul_info = [0, i, j, result.run_time, num_train_data]
+    link_flow = np.vstack(
+        [
+            scorer.align(result.link_stats, "interval_nVehContrib", fill_value=np.nan),
+            scorer.align(result.link_stats, "interval_harmonicMeanSpeed", fill_value=np.nan),
+        ]
     )
-    curr_loss = compute_nrmse_counts_all_links(sensor_flow_gt, curr_link_stats)
-    print(f"Loss: {curr_loss:.4f} | Runtime: {run_time:.2f}s")
 
-    # Annotate link stats
-    run_simul_info = [0, i, j, run_time, num_train_data]
-    curr_link_stats.insert(0, "epoch", i)
-    curr_link_stats.insert(1, "batch", j)
-
-    # Clean up intermediate simulation files (optional)
-    if config["eliminate_sumo_run_files"] == "True":
-        trips_out = config["trips_xml_out_str"]
-        try:
-            os.remove(sim_link_out)
-            os.remove(f"{base_path}/{prefix_output_simul}_{trips_out[:-4]}_beforeRteUpdates.xml")
-            os.remove(f"{base_path}/{prefix_output_simul}_{trips_out}")
-            # os.remove(f"{base_path}/{prefix_output_simul}_routes.vehroutes.xml")  # for sumo gui visualization
-        except FileNotFoundError:
-            print("[Warning] Some intermediate files were not found during cleanup.")
-
-    return run_simul_info, curr_loss, curr_link_stats
+    return run_simul_info, result.loss, link_flow
 
 
 def run_single_od_evaluation(
@@ -318,62 +586,30 @@ def run_single_od_evaluation(
     """
     print("\n########### Start simulation and evaluation ###########")
 
-    # Prepare file paths
-    new_od_xml = f"{path_run_simul}/od.xml"
-    prefix_output_simul = f"{path_run_simul}/result"
-
-    # Prepare OD matrix
-    curr_od = np.array(x)
-    print(f"Total expected demand: {curr_od.sum():.1f}")
-
-    base_od_copy = base_od.copy()
-    base_od_copy["count"] = [round(elem, 1) for elem in curr_od]
-    base_od_copy = base_od_copy.rename(columns={"fromTaz": "from", "toTaz": "to"})
-
-    # Save OD as TAZ XML
-    create_od_tazrelation_xml(
-        od_df=base_od_copy,
-        output_file=Path(new_od_xml),
-        od_end_time_seconds=config["od_end_time"],
-    )
-
-    # Run SUMO simulation
-    start_time = time.time()
-    simulate_od(
-        new_od_xml,
-        prefix_output_simul,
+    result = evaluate_od(
+        config,
         base_path,
-        config["net_xml"],
-        config["taz_xml"],
-        config["additional_xml"],
+        x,
+        base_od,
+        f"{path_run_simul}/od.xml",
+        f"{path_run_simul}/result",
         routes_df,
         routes_per_od,
-        config["sim_end_time"],
-        config["trips_xml_out_str"],
+        link_selection,
+        sensor_flow_gt,
+        (),
     )
-    run_time = time.time() - start_time
+    curr_link_stats, curr_loss = result.link_stats, result.loss
+    print(f"Loss: {curr_loss:.4f}")
 
     # Save simulation run time to a file
-    run_time_hours, rem = divmod(run_time, 3600)
+    run_time_hours, rem = divmod(result.run_time, 3600)
     run_time_minutes, run_time_seconds = divmod(rem, 60)
     run_time_str = f"simulation run time {int(run_time_hours)}h {int(run_time_minutes)}m {int(run_time_seconds)}s"
     run_time_file = Path(path_run_detail) / f"{run_time_str}.txt"
     with open(run_time_file, "w") as f:
         f.write(run_time_str)
 
-    # Load simulation output and compute loss
-    sim_link_out = f"{base_path}/{prefix_output_simul}_{config['link_data_out_str']}"
-    curr_link_stats, _, _ = parse_link_flow_xml_to_pandas(
-        base_path,
-        sim_link_out,
-        prefix_output_simul,
-        config["sensor_start_time"],
-        config["sensor_end_time"],
-        link_list=link_selection,
-    )
-    curr_loss = compute_nrmse_counts_all_links(sensor_flow_gt, curr_link_stats)
-    print(f"Loss: {curr_loss:.4f}")
-
     # Merge ground truth and simulated flow data
     sensor_flow_gt_temp = sensor_flow_gt.rename(columns={"interval_nVehContrib": "flow_gt"})[["link_id", "flow_gt"]]
     curr_link_stats_temp = curr_link_stats.rename(columns={"interval_nVehContrib": "flow_simul"})[
@@ -391,15 +627,4 @@ def run_single_od_evaluation(
     with open(nrmse_file, "w") as f:
         f.write(f"NRMSE: {curr_loss:.4f}")
 
-    # Clean up intermediate simulation files (optional)
-    if config["eliminate_sumo_run_files"] == "True":
-        trips_out = config["trips_xml_out_str"]
-        try:
-            os.remove(sim_link_out)
-            os.remove(f"{base_path}/{prefix_output_simul}_{trips_out[:-4]}_beforeRteUpdates.xml")
-            os.remove(f"{base_path}/{prefix_output_simul}_{trips_out}")
-            # os.remove(f"{base_path}/{prefix_output_simul}_routes.vehroutes.xml")
-        except FileNotFoundError:
-            print("[Warning] Some intermediate files were not found during cleanup.")
-
     return curr_link_stats
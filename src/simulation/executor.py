@@ -0,0 +1,262 @@
+# Standard library imports
+import itertools
+import os
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional
+
+# Local application imports
+from simulation.sumo_runner import TransientSimulationError
+from simulation.worker_pool import evaluate_initial_sample, evaluate_sample, report_task_start
+
+# Evaluation functions a task can run in the pool workers
+EVALUATION_FUNCTIONS = {
+    "initial": evaluate_initial_sample,
+    "sample": evaluate_sample,
+}
+
+# Failures worth another attempt: failed SUMO runs, lost TraCI connections, and timeouts
+TRANSIENT_ERRORS = (TransientSimulationError, TimeoutError)
+
+# Task starts reported by the pool workers, shared by all executors of the process
+_TASK_STARTS: dict = {}  # task token -> (worker pid, start time)
+_WORKER_TASKS: dict = {}  # worker pid -> token of the last task it started
+_TASK_TOKENS = itertools.count()
+
+# Seconds a terminated worker gets to kill its SUMO processes before it is killed outright
+# (a worker stuck inside libsumo cannot run its SIGTERM handler)
+TERMINATE_GRACE = 10.0
+
+# Seconds to wait for task start reports in transit before terminating a worker
+REPORT_WAIT = 0.5
+
+
+def collect_task_starts(task_starts, wait: float = 0.0) -> None:
+    """
+    Move the task starts reported on a pool's `task_starts` queue into `_TASK_STARTS`.
+
+    With `wait`, keep reading for that many seconds to also pick up reports that are still on
+    their way through the queue.
+    """
+    wait_until = time.time() + wait
+    while True:
+        try:
+            token, pid, start_time = task_starts.get(timeout=max(wait_until - time.time(), 0.0))
+        except queue.Empty:
+            return
+        _TASK_STARTS[token] = (pid, start_time)
+        _WORKER_TASKS[pid] = token
+
+
+@dataclass
+class EvaluationRecord:
+    """
+    Outcome of one evaluation task run by an EvaluationExecutor.
+
+    Attributes
+    ----------
+    kind : str
+        Evaluation function of the task ("initial" or "sample").
+    key : tuple
+        Identifier of the evaluation, e.g. (i,) for initial sample i or (epoch, batch).
+    status : str
+        "ok", "failed" (transient error on every attempt) or "timeout".
+    attempts : int
+        Number of attempts made.
+    wall_time : float
+        Wall-clock seconds from the first attempt to the end of the last one.
+    result : Any
+        Return value of the evaluation function if the status is "ok", otherwise None.
+    error : Optional[str]
+        Error of the last failed attempt.
+    """
+
+    kind: str
+    key: tuple
+    status: str
+    attempts: int
+    wall_time: float
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+def run_evaluation_task(
+    kind: str, key: tuple, args: tuple, retries: int, token: Optional[int] = None
+) -> EvaluationRecord:
+    """
+    Pool task: run one evaluation function, retrying transient failures.
+
+    Timeouts are enforced inside the simulation (see `sim_timeout`), which kills the SUMO
+    process of the attempt. Errors that are not transient (e.g. invalid inputs) are raised.
+    The start of the task is reported to the executor under `token`.
+    """
+    if token is not None:
+        report_task_start(token)
+    start_time = time.time()
+    status, error = "failed", None
+    for attempt in range(1, retries + 2):
+        try:
+            result = EVALUATION_FUNCTIONS[kind](*args)
+            return EvaluationRecord(kind, key, "ok", attempt, time.time() - start_time, result=result)
+        except TRANSIENT_ERRORS as e:
+            status = "timeout" if isinstance(e, TimeoutError) else "failed"
+            error = f"{type(e).__name__}: {e}"
+            print(f"[Retry] Evaluation {kind} {key}, attempt {attempt}/{retries + 1} failed: {error}")
+    return EvaluationRecord(kind, key, status, retries + 1, time.time() - start_time, error=error)
+
+
+class EvaluationExecutor:
+    """
+    Runs evaluation tasks on the evaluation pool and returns them as they finish.
+
+    Each task runs one evaluation function of the pool workers with a per-simulation timeout
+    (`sim_timeout` in the config, enforced by killing the SUMO process) and up to
+    `sim_retries` extra attempts after a transient failure. Results arrive as EvaluationRecords
+    in completion order. A task whose result has not arrived `(sim_retries + 1) *
+    (sim_timeout + grace)` seconds after a worker started it is reported as timed out, so a
+    stuck worker does not block the caller. Time spent queued behind other tasks does not
+    count. The stuck worker is terminated, which kills its SUMO processes, and the pool starts
+    a replacement. With `sim_timeout` 0, the default of the shipped configs, there is no
+    deadline: tasks are never reported as timed out and hung workers are left running.
+
+    Start times are reported by the workers of an EvaluationPool. With another pool, the
+    deadline runs from submission and overdue workers are left running.
+
+    Several executors can share one pool; each one only returns the tasks it submitted.
+    """
+
+    def __init__(self, pool, config: dict, grace: float = 120.0):
+        self.pool = pool
+        self.retries = int(config.get("sim_retries", 0))
+        timeout = float(config.get("sim_timeout", 0))
+        self.deadline = (self.retries + 1) * (timeout + grace) if timeout > 0 else None
+        self._task_starts = getattr(pool, "task_starts", None)
+        self._completed = queue.Queue()
+        self._in_flight = {}  # task token -> (kind, key, submit time)
+
+    def __len__(self) -> int:
+        """Number of submitted tasks not yet returned."""
+        return len(self._in_flight)
+
+    def submit(self, kind: str, key: tuple, args: tuple) -> None:
+        """
+        Submit one evaluation.
+
+        Parameters
+        ----------
+        kind : str
+            "initial" (args of evaluate_initial_sample) or "sample" (args of evaluate_sample).
+        key : tuple
+            Identifier returned in the record.
+        args : tuple
+            Arguments of the evaluation function.
+        """
+        token = next(_TASK_TOKENS)
+        self._in_flight[token] = (kind, key, time.time())
+        self.pool.apply_async(
+            run_evaluation_task,
+            (kind, key, args, self.retries, token if self._task_starts is not None else None),
+            callback=lambda record: self._completed.put((token, record)),
+            error_callback=lambda err: self._completed.put((token, err)),
+        )
+
+    def next_completed(self, timeout: Optional[float] = None) -> Optional[EvaluationRecord]:
+        """
+        Return the next finished task, waiting up to `timeout` seconds (None waits until one
+        finishes). Returns None if no task finished in time or none is in flight.
+        """
+        wait_until = None if timeout is None else time.time() + timeout
+        while self._in_flight:
+            if self._task_starts is not None:
+                collect_task_starts(self._task_starts)
+
+            # Results that already arrived take precedence over deadlines
+            try:
+                token, record = self._completed.get_nowait()
+            except queue.Empty:
+                overdue = self._pop_overdue()
+                if overdue is not None:
+                    return overdue
+
+                waits = [] if wait_until is None else [wait_until - time.time()]
+                if self.deadline is not None:
+                    # A task not started yet cannot be overdue before now + deadline
+                    waits.append(min(self._started(token) for token in self._in_flight) + self.deadline - time.time())
+                try:
+                    token, record = self._completed.get(timeout=max(min(waits), 0) if waits else None)
+                except queue.Empty:
+                    if wait_until is not None and time.time() >= wait_until:
+                        return None
+                    continue
+
+            _TASK_STARTS.pop(token, None)
+            if self._in_flight.pop(token, None) is None:
+                continue  # already reported as timed out
+            if isinstance(record, BaseException):
+                raise record
+            return record
+        return None
+
+    def _started(self, token: int) -> float:
+        """Return the time the deadline of a task runs from (now if no worker has started it)."""
+        if self._task_starts is None:
+            return self._in_flight[token][2]
+        return _TASK_STARTS.get(token, (None, time.time()))[1]
+
+    def _pop_overdue(self) -> Optional[EvaluationRecord]:
+        """Report the first task past its deadline as timed out and terminate its worker."""
+        if self.deadline is None:
+            return None
+        now = time.time()
+        for token, (kind, key, _) in self._in_flight.items():
+            elapsed = now - self._started(token)
+            if elapsed > self.deadline:
+                del self._in_flight[token]
+                error = f"No result {elapsed:.0f}s after the task started"
+                print(f"[Timeout] Evaluation {kind} {key}: {error}")
+                self._terminate_worker(token)
+                return EvaluationRecord(kind, key, "timeout", self.retries + 1, elapsed, error=error)
+        return None
+
+    def _terminate_worker(self, token: int) -> None:
+        """Terminate the worker still running task `token`; the pool replaces it."""
+        if self._task_starts is None:
+            return
+        # A report still in the queue would leave the worker mapped to a task it has finished
+        collect_task_starts(self._task_starts, wait=REPORT_WAIT)
+        pid, _ = _TASK_STARTS.pop(token, (None, None))
+        if pid is None or _WORKER_TASKS.get(pid) != token:
+            return  # start not reported, or the worker has moved on to another task
+        print(f"[Timeout] Terminating worker {pid}")
+        for signum, delay in ((signal.SIGTERM, 0.0), (signal.SIGKILL, TERMINATE_GRACE)):
+            timer = threading.Timer(delay, _send_signal, (pid, signum))
+            timer.daemon = True
+            timer.start()
+
+    def imap_unordered(self, tasks: Iterable[tuple]) -> Iterator[EvaluationRecord]:
+        """Submit (kind, key, args) tasks and yield their records as they finish."""
+        for kind, key, args in tasks:
+            self.submit(kind, key, args)
+        while self._in_flight:
+            yield self.next_completed()
+
+    def map(self, tasks: Iterable[tuple]) -> list:
+        """Submit (kind, key, args) tasks and return their records in task order."""
+        tasks = list(tasks)
+        records = {record.key: record for record in self.imap_unordered(tasks)}
+        return [records[key] for _, key, _ in tasks]
+
+
+def _send_signal(pid: int, signum: int) -> None:
+    """Send a signal to a process that may have exited already."""
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
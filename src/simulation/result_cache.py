@@ -0,0 +1,192 @@
+# Standard library imports
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local application imports
+from simulation.trip_generator import route_set_key
+
+# Configuration entries that change the outcome of a simulation
+SIM_CONFIG_KEYS = [
+    "sim_start_time",
+    "sim_end_time",
+    "sensor_start_time",
+    "sensor_end_time",
+    "od_end_time",
+    "sim_backend",
+    "demand_mode",
+    "trip_generator",
+    "precomputed_routes",
+]
+
+
+class SimulationCache:
+    """
+    Content-addressed on-disk cache of aggregated sensor link statistics.
+
+    Each entry is a small CSV named by the SHA-256 of the simulation input: network, route set,
+    rounded OD vector, SUMO seed, sensor links, the simulation settings, and the seeds of the
+    demand draws. The run seed is always part of the key, so entries are only reused by runs
+    with the same seed. Without common random numbers, the demand of an evaluation is also
+    seeded by its position in the run (e.g. epoch and batch), so a hit needs the same OD vector
+    at the same position, i.e. a rerun of the same seed. With common random numbers, the demand
+    of a run only depends on the OD vector, so repeated OD vectors within a run (SPSA clipping,
+    TuRBO re-centering) and reruns with another model hit the cache.
+
+    Entries are written atomically so parallel workers can use the cache concurrently, and
+    evicted in least-recently-used order (file modification time, refreshed on every hit) once
+    the cache exceeds its size limit.
+
+    The cache size is tracked as a running total of the entries written by this process. The
+    directory is only scanned when that estimate exceeds the limit, and every `rescan_every`
+    puts to pick up the entries written by other processes.
+    """
+
+    def __init__(self, cache_dir: Path, max_mb: float = 256, rescan_every: int = 100):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.rescan_every = rescan_every
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._size = None  # estimated cache size in bytes, None until the first scan
+        self._puts_since_scan = 0
+
+    @staticmethod
+    def key(
+        config: dict,
+        routes_df: pd.DataFrame,
+        routes_per_od: str,
+        od_df: pd.DataFrame,
+        link_list: list,
+        stream_key: tuple = (),
+        sumo_seed: int = 0,
+    ) -> str:
+        """
+        Return the cache key of one simulation.
+
+        Parameters
+        ----------
+        config : dict
+            Simulation configuration parameters.
+        routes_df : pd.DataFrame
+            Route information DataFrame.
+        routes_per_od : str
+            Type of routes to use for the simulation (single or multiple).
+        od_df : pd.DataFrame
+            OD matrix with "from", "to" and rounded "count" columns, as written to the OD XML.
+        link_list : list
+            Sensor link IDs.
+        stream_key : tuple, optional
+            Indices identifying the evaluation within the run, as passed to `get_demand_rng`.
+            They seed the demand draws unless common random numbers are enabled.
+        sumo_seed : int, optional
+            SUMO random seed. Defaults to 0.
+
+        Returns
+        -------
+        str
+            Hexadecimal SHA-256 digest.
+        """
+        # With common random numbers the demand is a function of the OD vector and the run seed,
+        # otherwise it also depends on the generator seeded from the run seed and stream key
+        seed = int(config.get("seed", 0))
+        if config.get("common_random_numbers") == "True":
+            demand_random = ["crn", seed]
+        else:
+            demand_random = ["independent", seed, *(int(k) for k in stream_key)]
+
+        settings = {
+            "network_name": config["network_name"],
+            "routes_per_od": routes_per_od,
+            "route_set": route_set_key(routes_df),
+            "sumo_seed": int(sumo_seed),
+            "demand_random": demand_random,
+            "links": [str(link_id) for link_id in link_list],
+            **{k: str(config.get(k)) for k in SIM_CONFIG_KEYS},
+        }
+
+        h = hashlib.sha256(json.dumps(settings, sort_keys=True).encode())
+        h.update("\0".join(od_df["from"].astype(str)).encode())
+        h.update("\0".join(od_df["to"].astype(str)).encode())
+        h.update(np.asarray(od_df["count"], dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.csv"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return the cached link statistics for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            link_stats = pd.read_csv(path, dtype={"link_id": str})
+            os.utime(path)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return None
+        print(f"[Cache] Reusing simulation result {key[:12]}")
+        return link_stats
+
+    def put(self, key: str, link_stats: pd.DataFrame) -> None:
+        """Store link statistics under `key` and evict old entries if the cache is too large."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        link_stats[["link_id", "interval_nVehContrib", "interval_harmonicMeanSpeed"]].to_csv(tmp_path, index=False)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, path)
+
+        self._puts_since_scan += 1
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_bytes or self._puts_since_scan >= self.rescan_every:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Scan the cache and, if it exceeds its size limit, remove least-recently-used entries
+        until it is back under 90% of the limit, so the next puts do not rescan right away.
+        """
+        entries = []
+        for path in self.cache_dir.glob("*/*.csv"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes if total <= self.max_bytes else 0.9 * self.max_bytes
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        self._size = total
+        self._puts_since_scan = 0
+
+
+# Per-process simulation caches, keyed by directory and size limit
+_SIMULATION_CACHES: dict = {}
+
+
+def get_simulation_cache(config: dict, base_path: str) -> Optional[SimulationCache]:
+    """
+    Return the simulation cache configured in `config`, or None if caching is disabled.
+
+    The cache is opt-in (`sim_cache_dir` is empty by default). Instances are reused within the
+    process so their running size estimate persists across evaluations.
+    """
+    if not config.get("sim_cache_dir"):
+        return None
+    key = (str(Path(base_path, config["sim_cache_dir"])), float(config.get("sim_cache_max_mb", 256)))
+    if key not in _SIMULATION_CACHES:
+        _SIMULATION_CACHES[key] = SimulationCache(Path(key[0]), key[1])
+    return _SIMULATION_CACHES[key]
@@ -0,0 +1,108 @@
+# Standard library imports
+import atexit
+import os
+import shutil
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Optional
+
+# Per-process scratch root and the additional files copied into it
+_SCRATCH_ROOT: Optional[Path] = None
+_SCRATCH_ADDITIONALS: dict = {}
+
+SCRATCH_PREFIX = "bo4mob_"
+
+
+def get_scratch_root(scratch_dir: Path) -> Path:
+    """
+    Return the scratch root of the current process, creating it on first use.
+
+    Every worker process gets its own directory `<scratch_dir>/bo4mob_<pid>`, removed when the
+    process exits. Pool workers are terminated without running exit handlers, so each new
+    root first removes the roots of processes that are no longer running.
+    """
+    global _SCRATCH_ROOT
+    scratch_root = Path(scratch_dir) / f"{SCRATCH_PREFIX}{os.getpid()}"
+    if _SCRATCH_ROOT != scratch_root:  # first use, new directory, or root inherited through fork
+        remove_stale_scratch_roots(scratch_dir)
+        _SCRATCH_ROOT = scratch_root
+        _SCRATCH_ROOT.mkdir(parents=True, exist_ok=True)
+        _SCRATCH_ADDITIONALS.clear()
+    return _SCRATCH_ROOT
+
+
+def get_scratch_additional_xml(additional_xml: Path, scratch_root: Path) -> Path:
+    """
+    Return a copy of an additional file whose edgeData output goes to the scratch root.
+
+    The copy is written once per process, so the persistent TraCI worker sees a stable path.
+    With a bare output prefix, SUMO then writes `<scratch_root>/<prefix>_edge_data.xml`.
+    """
+    additional_xml = Path(additional_xml)
+    if additional_xml not in _SCRATCH_ADDITIONALS:
+        tree = ET.parse(additional_xml)
+        for edge_data in tree.getroot().iter("edgeData"):
+            if edge_data.get("file") is not None:
+                edge_data.set("file", Path(edge_data.get("file")).name)
+
+        output_file = scratch_root / f"additional_{len(_SCRATCH_ADDITIONALS)}.xml"
+        tree.write(output_file, encoding="utf-8", xml_declaration=True)
+        _SCRATCH_ADDITIONALS[additional_xml] = output_file
+
+    return _SCRATCH_ADDITIONALS[additional_xml]
+
+
+def release_scratch_files(scratch_root: Path, name: str, output_dir: Path, keep_all: bool) -> None:
+    """
+    Move the kept artifacts of one evaluation to the output tree and delete the rest.
+
+    Parameters
+    ----------
+    scratch_root : Path
+        Scratch root of the current process.
+    name : str
+        Bare output prefix of the evaluation (e.g. "opt_3_1").
+    output_dir : Path
+        Simulation output directory of the run.
+    keep_all : bool
+        If True, every file of the evaluation is kept (eliminate_sumo_run_files is "False");
+        otherwise only the vehroutes file is kept, for SUMO GUI visualization.
+    """
+    for path in Path(scratch_root).glob(f"{name}_*"):
+        if keep_all or path.name.endswith("routes.vehroutes.xml"):
+            shutil.move(str(path), Path(output_dir) / path.name)
+        else:
+            path.unlink(missing_ok=True)
+
+
+def remove_stale_scratch_roots(scratch_dir: Path) -> None:
+    """Remove scratch roots left behind by processes that are no longer running."""
+    if os.name == "nt" or not Path(scratch_dir).is_dir():
+        return
+
+    for path in Path(scratch_dir).glob(f"{SCRATCH_PREFIX}*"):
+        try:
+            pid = int(path.name[len(SCRATCH_PREFIX) :])
+        except ValueError:
+            continue
+        if not _pid_alive(pid):
+            print(f"[Cleanup] Removing stale scratch directory: {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _pid_alive(pid: int) -> bool:
+    """Return True if a process with this id exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+@atexit.register
+def _remove_scratch_root() -> None:
+    """Remove the scratch root of the current process on interpreter exit."""
+    if _SCRATCH_ROOT is not None:
+        shutil.rmtree(_SCRATCH_ROOT, ignore_errors=True)
@@ -1,16 +1,77 @@
 # Standard library imports
+import gzip
+import os
 import subprocess
+import threading
 import time
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from xml.dom import minidom
+from typing import Optional
 
 # Third-party imports
 import numpy as np
 import pandas as pd
 
 # Local application imports
-from simulation.data_loader import xml2df_str_in_chunks
+from simulation.data_loader import od_interval_xml_to_df, xml2df_str_in_chunks
+from simulation.traci_worker import get_traci_worker
+from simulation.trip_generator import (
+    STREAM_ROUND,
+    STREAM_ROUTE,
+    TRIP_COLUMNS,
+    VEHICLE_COLUMNS,
+    CommonRandomNumbers,
+    DemandRandom,
+    draw_uniform,
+    generate_trips_df,
+    get_route_table,
+    get_trip_block_cache,
+)
+from utils.link_flow_analysis import EdgeDataAccumulator
+
+# SUMO tool processes started by this process, killed by kill_sumo_processes
+_ACTIVE_PROCESSES: set = set()
+
+
+class TransientSimulationError(RuntimeError):
+    """
+    A SUMO or od2trips run failed for a reason that may not recur on another attempt: the
+    process exited with an error status or the TraCI connection was lost. Invalid inputs and
+    configuration errors raise other exception types.
+    """
+
+
+def run_sumo_command(cmd: list[str], timeout: Optional[float] = None) -> None:
+    """
+    Run a SUMO tool and wait for it, killing it if it exceeds `timeout` seconds.
+
+    Raises
+    ------
+    TimeoutError
+        If the process did not finish in time (it is killed).
+    subprocess.CalledProcessError
+        If the process exited with a non-zero status.
+    """
+    process = subprocess.Popen(cmd)
+    _ACTIVE_PROCESSES.add(process)
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise TimeoutError(f"{cmd[0]} did not finish within {timeout} seconds") from None
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        _ACTIVE_PROCESSES.discard(process)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def kill_sumo_processes() -> None:
+    """Kill the SUMO tool processes still running in this process (e.g. when it is terminated)."""
+    for process in list(_ACTIVE_PROCESSES):
+        if process.poll() is None:
+            process.kill()
 
 
 def simulate_od(
@@ -27,7 +88,22 @@ def simulate_od(
     sim_start_time: int = 0,
     seed: int = 0,
     timeout: int = 300,
-) -> None:
+    sim_timeout: Optional[float] = None,
+    sim_backend: str = "subprocess",
+    demand_mode: str = "trips",
+    trip_generator: str = "numpy",
+    precomputed_routes: bool = False,
+    rng: Optional[DemandRandom] = None,
+    trip_cache_size: int = 0,
+    write_vehroutes: bool = False,
+    gt_counts: Optional[np.ndarray] = None,
+    abort_loss: Optional[float] = None,
+    edge_data_fifo: Optional[Path] = None,
+    edge_data_xml: Optional[Path] = None,
+    link_list: Optional[list[str]] = None,
+    sensor_start_time: float = 0,
+    sensor_end_time: Optional[float] = None,
+) -> Optional[pd.DataFrame]:
     """
     Run a full SUMO simulation: generate trips from OD matrix, fix routes, and simulate.
 
@@ -59,44 +135,159 @@ def simulate_od(
         Random seed for SUMO simulation. Defaults to 0.
     timeout : int, optional
         Timeout for waiting on trip file creation (seconds). Defaults to 300.
+    sim_timeout : Optional[float], optional
+        Wall-clock limit in seconds for each SUMO tool run (od2trips, sumo) and for a "traci"
+        simulation. A process that exceeds it is killed and TimeoutError is raised. None
+        (default) waits indefinitely.
+    sim_backend : str, optional
+        "subprocess" runs a fresh `sumo` process per call (default). "traci" reuses the
+        persistent libsumo/TraCI worker of the current process and returns the sensor link
+        statistics read from `edge_data_xml`.
+    demand_mode : str, optional
+        "trips" expands the OD matrix into one <trip> per vehicle with od2trips (default).
+        "flows" writes one <flow> per OD pair (or per OD route) and lets SUMO create the vehicles.
+    trip_generator : str, optional
+        How trips are expanded from the OD matrix in "trips" mode. "numpy" builds the trips table
+        in memory (default); "od2trips" runs the SUMO od2trips tool as a fallback.
+    precomputed_routes : bool, optional
+        If True, vehicles reference routes of a shared route library built from the
+        "route_edges" column, so SUMO does not compute a route per vehicle. Defaults to False.
+    rng : Optional[np.random.Generator or CommonRandomNumbers], optional
+        Random number generator for demand generation, or fixed per-OD streams to use common
+        random numbers across evaluations. Defaults to a freshly seeded generator.
+    trip_cache_size : int, optional
+        Number of recent trip tables kept per process for incremental regeneration with
+        common random numbers and the numpy trip generator. 0 disables the cache.
+    write_vehroutes : bool, optional
+        If True, SUMO writes the vehicle routes file used by the SUMO GUI viewer. Defaults to False.
+    gt_counts : Optional[np.ndarray], optional
+        Ground-truth counts aligned with `link_list`, used for early abort.
+    abort_loss : Optional[float], optional
+        Stop the simulation once its NRMSE lower bound exceeds this value ("traci" backend only).
+    edge_data_fifo : Optional[Path], optional
+        edgeData output path to replace with a named pipe ("subprocess" backend only). SUMO then
+        streams intervals to a reader thread that aggregates the sensor links while the
+        simulation runs, and the edgeData file never touches disk. Ignored where named pipes
+        are not available (Windows).
+    edge_data_xml : Optional[Path], optional
+        edgeData output file written through the additional file, with the output prefix
+        applied. Required by the "traci" backend.
+    link_list : Optional[list[str]], optional
+        Sensor link IDs to collect counts for (only used by the "traci" backend).
+    sensor_start_time : float, optional
+        Start of the sensor counting window in seconds (only used by the "traci" backend).
+    sensor_end_time : Optional[float], optional
+        End of the sensor counting window in seconds (only used by the "traci" backend).
+        Defaults to `sim_end_time`.
+
+    Returns
+    -------
+    Optional[pd.DataFrame]
+        Aggregated sensor link statistics of a "traci" run or a streamed edgeData output,
+        otherwise None (results are in the edgeData output file).
     """
     base_dir = Path(base_dir)
 
+    if rng is None:
+        rng = np.random.default_rng()
+
     # Prepare paths
-    trip_output_before = base_dir / f"{prefix_output}_{trips_xml_out_str[:-4]}_beforeRteUpdates.xml"
+    trip_output_before = base_dir / f"{prefix_output}_{trips_xml_out_str.split('.')[0]}_beforeRteUpdates.xml"
     trip_output_after = base_dir / f"{prefix_output}_{trips_xml_out_str}"
 
-    # Step 1: Generate trips using od2trips
-    od2trips_cmd = [
-        "od2trips",
-        "--spread.uniform",
-        "--taz-files",
-        str(taz_xml),
-        "--tazrelation-files",
-        str(od_xml),
-        "-o",
-        str(trip_output_before),
-    ]
-
-    print(f"Running od2trips:\n{' '.join(od2trips_cmd)}")
-    try:
-        subprocess.run(od2trips_cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to generate trips with od2trips: {e}")
-
-    # Step 2: Wait for trips file to be created
-    print(f"Waiting for trip file to be generated: {trip_output_before}")
-    start_time = time.time()
-    while not trip_output_before.exists():
-        if time.time() - start_time > timeout:
-            raise TimeoutError(f"Timeout: Trip file not created within {timeout} seconds: {trip_output_before}")
-        time.sleep(0.5)
-    print(f"Trip file ready after {time.time() - start_time:.2f} seconds.")
-
-    # Step 3: Fix trips with predefined route information
-    update_trip_routes(trip_output_before, trip_output_after, routes_df, routes_per_od)
+    # Route library shared by all evaluations writing to this directory
+    additional_files = str(additional_xml)
+    if precomputed_routes:
+        route_library_xml = get_route_library_xml(routes_df, (base_dir / prefix_output).parent)
+        additional_files = f"{additional_files},{route_library_xml}"
+
+    if demand_mode == "flows":
+        # Steps 1-3 collapse into a single flow file whose size grows with OD pairs, not vehicles
+        write_flows_xml(od_xml, trip_output_after, routes_df, routes_per_od, rng, precomputed_routes)
+    elif demand_mode == "trips" and trip_generator == "numpy":
+        # Steps 1-3: Expand the OD matrix in memory and fix trips with predefined route information
+        od_df, od_begin, od_end = od_interval_xml_to_df(od_xml)
+        if isinstance(rng, CommonRandomNumbers) and trip_cache_size > 0:
+            # Reuse the unchanged OD blocks of a recently evaluated, similar OD matrix
+            trips_df = get_trip_block_cache(trip_cache_size).generate(
+                od_df,
+                taz_xml,
+                od_begin,
+                od_end,
+                rng,
+                route_fn=lambda new_trips: assign_trip_routes(new_trips, routes_df, routes_per_od, rng),
+                context=(get_route_table(routes_df).key, routes_per_od),
+            )
+        else:
+            trips_df = generate_trips_df(od_df, taz_xml, od_begin, od_end, rng)
+            trips_df = assign_trip_routes(trips_df, routes_df, routes_per_od, rng)
+        print(f"Generated {len(trips_df)} trips in memory.")
+        if precomputed_routes:
+            write_trips_xml(trips_df, trip_output_after, VEHICLE_COLUMNS, tag="vehicle")
+        else:
+            write_trips_xml(trips_df, trip_output_after, TRIP_COLUMNS)
+    elif demand_mode == "trips" and trip_generator == "od2trips":
+        # Step 1: Generate trips using od2trips
+        od2trips_cmd = [
+            "od2trips",
+            "--spread.uniform",
+            "--taz-files",
+            str(taz_xml),
+            "--tazrelation-files",
+            str(od_xml),
+            "-o",
+            str(trip_output_before),
+        ]
+
+        print(f"Running od2trips:\n{' '.join(od2trips_cmd)}")
+        try:
+            run_sumo_command(od2trips_cmd, sim_timeout)
+        except subprocess.CalledProcessError as e:
+            raise TransientSimulationError(f"Failed to generate trips with od2trips: {e}") from e
+
+        # Step 2: Wait for trips file to be created
+        print(f"Waiting for trip file to be generated: {trip_output_before}")
+        start_time = time.time()
+        while not trip_output_before.exists():
+            if time.time() - start_time > timeout:
+                raise TimeoutError(
+                    f"Timeout: Trip file not created within {timeout} seconds: {trip_output_before}"
+                )
+            time.sleep(0.5)
+        print(f"Trip file ready after {time.time() - start_time:.2f} seconds.")
+
+        # Step 3: Fix trips with predefined route information
+        update_trip_routes(
+            trip_output_before, trip_output_after, routes_df, routes_per_od, rng, precomputed_routes
+        )
+    else:
+        raise ValueError(f"Unknown demand mode / trip generator: {demand_mode} / {trip_generator}")
 
     # Step 4: Run SUMO simulation
+    if sim_backend == "traci":
+        worker = get_traci_worker(net_xml, additional_files, seed)
+        print(f"Running SUMO through persistent TraCI worker: {trip_output_after}")
+        try:
+            return worker.run(
+                trip_output_after,
+                prefix_output,
+                edge_data_xml,
+                link_list or [],
+                sim_start_time,
+                sim_end_time,
+                sensor_start_time,
+                sim_end_time if sensor_end_time is None else sensor_end_time,
+                vehroutes_xml=base_dir / "routes.vehroutes.xml" if write_vehroutes else None,
+                gt_counts=gt_counts,
+                abort_loss=abort_loss,
+                timeout=sim_timeout,
+            )
+        except worker.traci.FatalTraCIError as e:
+            worker.close()  # the next run starts a new SUMO instance
+            raise TransientSimulationError(f"Lost the TraCI connection to SUMO: {e}") from e
+    elif sim_backend != "subprocess":
+        raise ValueError(f"Unknown simulation backend: {sim_backend}")
+
     sumo_cmd = [
         "sumo",
         "--output-prefix",
@@ -112,69 +303,158 @@ def simulate_od(
         "-e",
         str(sim_end_time),
         "--additional-files",
-        str(additional_xml),
+        additional_files,
         "--duration-log.statistics",
         "--xml-validation",
         "never",
-        "--vehroutes",
-        "routes.vehroutes.xml",
         "--no-warnings",
         "--mesosim",
         "true",
         "--seed",
         str(seed),
     ]
+    if write_vehroutes:
+        # The output prefix is inserted before the file name: <base_dir>/<prefix>_routes.vehroutes.xml
+        sumo_cmd += ["--vehroutes", str(base_dir / "routes.vehroutes.xml")]
+
+    edge_data_reader = None
+    if edge_data_fifo is not None and hasattr(os, "mkfifo"):
+        edge_data_reader = EdgeDataFifoReader(
+            edge_data_fifo,
+            link_list,
+            sensor_start_time,
+            sim_end_time if sensor_end_time is None else sensor_end_time,
+        )
 
     print(f"Running SUMO:\n{' '.join(sumo_cmd)}")
     try:
-        subprocess.run(sumo_cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to run SUMO simulation: {e}")
+        run_sumo_command(sumo_cmd, sim_timeout)
+    except (subprocess.CalledProcessError, TimeoutError) as e:
+        if edge_data_reader is not None:
+            edge_data_reader.finish(ignore_errors=True)
+        if isinstance(e, TimeoutError):
+            raise
+        raise TransientSimulationError(f"Failed to run SUMO simulation: {e}") from e
 
+    return edge_data_reader.finish() if edge_data_reader is not None else None
 
-def write_trips_to_xml_pretty(trips_df: pd.DataFrame, output_file: Path, attr_cols: list[str]) -> None:
+
+class EdgeDataFifoReader:
+    """
+    Named pipe in place of the edgeData output file, consumed by a background thread.
+
+    The thread iterparses intervals as SUMO flushes them and aggregates the sensor links in an
+    `EdgeDataAccumulator`, so parsing overlaps with the simulation and the edgeData file is
+    never written to disk.
+    """
+
+    def __init__(
+        self,
+        fifo_path: Path,
+        link_list: Optional[list[str]],
+        sensor_start_time: float,
+        sensor_end_time: float,
+    ):
+        self.fifo_path = Path(fifo_path)
+        self.accumulator = EdgeDataAccumulator(link_list, sensor_start_time, sensor_end_time)
+        self.error: Optional[Exception] = None
+
+        self.fifo_path.unlink(missing_ok=True)
+        os.mkfifo(self.fifo_path)
+        self.thread = threading.Thread(target=self._read, daemon=True)
+        self.thread.start()
+
+    def _read(self) -> None:
+        """Thread body: block until SUMO opens the pipe, then parse until it closes it."""
+        try:
+            with open(self.fifo_path, "rb") as f:
+                self.accumulator.feed(f)
+        except ET.ParseError as e:
+            self.error = e
+
+    def finish(self, ignore_errors: bool = False) -> pd.DataFrame:
+        """
+        Wait for the reader thread, remove the pipe, and return the aggregated link statistics.
+
+        If SUMO never opened the pipe (e.g. it failed during start-up), a short-lived writer is
+        opened so the blocked reader sees end-of-file instead of hanging. Parse errors are
+        raised unless `ignore_errors` is True.
+        """
+        self.thread.join(timeout=1.0)
+        while self.thread.is_alive():
+            try:
+                os.close(os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK))
+            except OSError:
+                pass  # reader not waiting on the pipe yet
+            self.thread.join(timeout=0.1)
+        self.fifo_path.unlink(missing_ok=True)
+
+        if self.error is not None and not ignore_errors:
+            raise RuntimeError(f"Failed to read streamed edgeData output: {self.error}")
+        return self.accumulator.to_frame()
+
+
+def write_trips_xml(
+    trips_df: pd.DataFrame,
+    output_file: Path,
+    attr_cols: list[str],
+    chunk_size: int = 50000,
+    tag: str = "trip",
+) -> None:
     """
-    Write a SUMO-compatible trips XML file from a DataFrame with pretty formatting.
+    Stream a SUMO-compatible trips XML file from a DataFrame.
 
-    This function converts a DataFrame containing trip information into an XML file
-    that follows the SUMO <trip> format. The output is formatted with indentation 
-    and line breaks for improved readability.
+    Each <trip> line is assembled column-wise from the DataFrame and written in chunks to a
+    buffered file handle, so memory use does not grow with the number of trips. The layout
+    (XML declaration, tab indentation, attribute order and escaping) is the same as the
+    previous ElementTree/minidom pretty-printed output. If `output_file` ends with ".gz",
+    the file is gzip-compressed, which SUMO reads directly.
 
     Parameters
     ----------
     trips_df : pd.DataFrame
         DataFrame containing trip data, where each row corresponds to a <trip> entry.
     output_file : Path
-        Path to save the formatted trips XML file.
+        Path to save the trips XML file.
     attr_cols : list of str
         List of column names to include as attributes in each <trip> element.
+    chunk_size : int, optional
+        Number of trips formatted and written at once. Defaults to 50000.
+    tag : str, optional
+        Element name of each row, "trip" (default) or "vehicle" for pre-routed vehicles.
     """
-    def clean_val(x):
-        try:
-            return str(x)
-        except Exception:
-            return ""
-
-    # Root <routes> element
-    root = ET.Element("routes")
-
-    # Add each trip as a <trip> element
-    for _, row in trips_df.iterrows():
-        trip_attrs = {col: clean_val(row[col]) for col in attr_cols}
-        ET.SubElement(root, "trip", trip_attrs)
-
-    # Convert to string and pretty-print
-    rough_string = ET.tostring(root, encoding="utf-8")
-    reparsed = minidom.parseString(rough_string)
-    pretty_xml = reparsed.toprettyxml(indent="\t", encoding="utf-8")
-
-    # Write to file
-    with open(output_file, "wb") as f:
-        f.write(pretty_xml)
+    output_file = Path(output_file)
+    if output_file.suffix == ".gz":
+        f = gzip.open(output_file, "wt", encoding="utf-8", compresslevel=1)
+    else:
+        f = open(output_file, "w", encoding="utf-8", buffering=1 << 20)
+
+    with f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<routes>\n')
+        for chunk_start in range(0, len(trips_df), chunk_size):
+            chunk = trips_df.iloc[chunk_start : chunk_start + chunk_size]
+            lines = pd.Series(f"\t<{tag}", index=chunk.index)
+            for col in attr_cols:
+                values = chunk[col].astype(str)
+                if values.str.contains('[&<>"]', regex=True).any():
+                    values = (
+                        values.str.replace("&", "&amp;", regex=False)
+                        .str.replace("<", "&lt;", regex=False)
+                        .str.replace(">", "&gt;", regex=False)
+                        .str.replace('"', "&quot;", regex=False)
+                    )
+                lines = lines + f' {col}="' + values + '"'
+            f.write("/>\n".join(lines) + "/>\n")
+        f.write("</routes>\n")
 
 
 def update_trip_routes(
-    input_trip_file: Path, output_trip_file: Path, routes_df: pd.DataFrame, routes_per_od: str
+    input_trip_file: Path,
+    output_trip_file: Path,
+    routes_df: pd.DataFrame,
+    routes_per_od: str,
+    rng: DemandRandom,
+    precomputed_routes: bool = False,
 ) -> None:
     """
     Update the trips XML file to align start and end edges with a given route set.
@@ -189,6 +469,10 @@ def update_trip_routes(
         DataFrame with ["fromTaz", "toTaz", "start_edge", "last_edge"] columns.
     routes_per_od : str
         Type of routes to use for the simulation (single or multiple).
+    rng : np.random.Generator
+        Random number generator for route choice.
+    precomputed_routes : bool, optional
+        If True, write <vehicle> elements referencing the shared route library. Defaults to False.
     """
     # Read trip XML in chunks and combine into a single DataFrame
     all_chunks = []
@@ -199,80 +483,270 @@ def update_trip_routes(
         trips_df = pd.concat(all_chunks, ignore_index=True)
     else:
         print(f"[Warning] No trips found in {input_trip_file.name} — skipping trip update.")
-        trips_df = pd.DataFrame(
-            columns=[
-                "id",
-                "depart",
-                "from",
-                "to",
-                "type",
-                "fromTaz",
-                "toTaz",
-                "departLane",
-                "departSpeed",
-                "depart_float",
-            ]
-        )
+        trips_df = pd.DataFrame(columns=TRIP_COLUMNS + ["depart_float"])
 
-    # Ensure route DataFrame uses string type
-    routes_df["fromTaz"] = routes_df["fromTaz"].astype(str)
-    routes_df["toTaz"] = routes_df["toTaz"].astype(str)
-    routes_df["start_edge"] = routes_df["start_edge"].astype(str)
-    routes_df["last_edge"] = routes_df["last_edge"].astype(str)
-
-    # Remove original 'from' and 'to' edges
-    trips_df = trips_df.drop(columns=["from", "to"])
-
-    if routes_per_od == "single":
-        # Merge correct start and end edges
-        trips_df = trips_df.merge(
-            routes_df[["fromTaz", "toTaz", "start_edge", "last_edge"]],
-            on=["fromTaz", "toTaz"],
-            how="inner",
-        )
-    elif routes_per_od == "multiple":
-        # For each unique fromTaz, toTaz pair in trips_df
-        for (from_taz, to_taz), group in trips_df.groupby(['fromTaz', 'toTaz']):
-            # Filter routes_df for the current fromTaz, toTaz pair
-            matching_routes = routes_df[(routes_df['fromTaz'] == from_taz) & (routes_df['toTaz'] == to_taz)].copy()
-
-            # If there are matching routes
-            if not matching_routes.empty:
-                # Normalize the ratio to sum to 1
-                matching_routes['ratio'] = matching_routes['ratio'] / matching_routes['ratio'].sum()
-                
-                # Assign start_edge and last_edge to trips_df based on the ratio using random selection
-                probabilities = matching_routes['ratio'].values
-                selected_routes = np.random.choice(matching_routes.index, size=len(group), p=probabilities)
-
-                # Apply the selected routes to the trips_df
-                trips_df.loc[group.index, 'start_edge'] = matching_routes.loc[selected_routes, 'start_edge'].values
-                trips_df.loc[group.index, 'last_edge'] = matching_routes.loc[selected_routes, 'last_edge'].values
-
-    # Rename columns to SUMO format
-    trips_df = trips_df.rename(columns={"start_edge": "from", "last_edge": "to"})
-
-    # Sort trips by departure time
-    trips_df["depart_float"] = trips_df["depart"].astype(float)
-    trips_df = trips_df.sort_values(by="depart_float")
+    trips_df = assign_trip_routes(trips_df, routes_df, routes_per_od, rng)
+
+    if precomputed_routes:
+        write_trips_xml(trips_df, output_trip_file, VEHICLE_COLUMNS, tag="vehicle")
+    else:
+        write_trips_xml(trips_df, output_trip_file, TRIP_COLUMNS)
+
+
+def assign_trip_routes(
+    trips_df: pd.DataFrame, routes_df: pd.DataFrame, routes_per_od: str, rng: DemandRandom
+) -> pd.DataFrame:
+    """
+    Replace the from/to edges of a trips table with the start and last edges of the route set.
+
+    Parameters
+    ----------
+    trips_df : pd.DataFrame
+        Trips table with od2trips columns (see `TRIP_COLUMNS`).
+    routes_df : pd.DataFrame
+        DataFrame with ["fromTaz", "toTaz", "start_edge", "last_edge"] (and "ratio" for multiple) columns.
+    routes_per_od : str
+        Type of routes to use for the simulation (single or multiple).
+    rng : np.random.Generator or CommonRandomNumbers
+        Random number generator for route choice. Common random numbers require the
+        "od_idx" and "veh_idx" columns produced by `generate_trips_df`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Trips table sorted by departure time, ready to be written as SUMO trips.
+        Trips whose OD pair has no route are dropped.
+    """
+    if routes_per_od not in ("single", "multiple"):
+        raise ValueError(f"Unknown routes_per_od: {routes_per_od}")
+
+    # Draw one route per trip from the compiled route table (single: one route per OD pair)
+    route_table = get_route_table(routes_df)
+    route_od_idx = route_table.lookup(trips_df["fromTaz"], trips_df["toTaz"])
+    trips_df = trips_df[route_od_idx >= 0].copy()
+    route_od_idx = route_od_idx[route_od_idx >= 0]
+
+    if isinstance(rng, CommonRandomNumbers):
+        if "od_idx" not in trips_df.columns:
+            raise ValueError("Common random numbers require trips from the numpy trip generator.")
+        u_route = rng.uniform(STREAM_ROUTE, trips_df["od_idx"].to_numpy(), trips_df["veh_idx"].to_numpy())
+    else:
+        u_route = rng.random(len(trips_df))
+    route_pos = route_table.sample(route_od_idx, u_route)
+
+    # Replace original 'from' and 'to' edges and record the route library id
+    trips_df["from"] = route_table.start_edge[route_pos]
+    trips_df["to"] = route_table.last_edge[route_pos]
+    trips_df["route"] = route_table.route_label[route_pos]
+
+    # Sort trips by departure time (keeping exact departures of generated trips)
+    if "depart_float" not in trips_df.columns:
+        trips_df["depart_float"] = trips_df["depart"].astype(float)
+    trips_df = trips_df.sort_values(by="depart_float", kind="stable")
 
     # Set departLane to "best" for all trips
     trips_df["departLane"] = "best"
 
-    # Save updated trips to XML
-    attr_cols = [
-        "id",
-        "depart",
-        "from",
-        "to",
-        "type",
-        "fromTaz",
-        "toTaz",
-        "departLane",
-        "departSpeed",
-    ]
+    return trips_df
+
+
+def write_flows_xml(
+    od_xml: Path,
+    output_file: Path,
+    routes_df: pd.DataFrame,
+    routes_per_od: str,
+    rng: DemandRandom,
+    precomputed_routes: bool = False,
+) -> None:
+    """
+    Write a SUMO <flow> file with one flow per OD pair (single) or per OD route (multiple).
+
+    Each flow inserts a fixed number of vehicles evenly spread over the OD interval, using the
+    start and last edge of its route, so SUMO creates the vehicles internally. Fractional OD
+    counts are rounded up with probability equal to their fractional part, as od2trips does,
+    and for multiple routes the vehicles of an OD pair are split across routes by their ratio.
+    If `output_file` ends with ".gz", the file is gzip-compressed, as in `write_trips_xml`.
+
+    Parameters
+    ----------
+    od_xml : Path
+        Path to the OD TAZ relation XML file.
+    output_file : Path
+        Path to save the flow XML file.
+    routes_df : pd.DataFrame
+        DataFrame with ["fromTaz", "toTaz", "start_edge", "last_edge"] (and "ratio" for multiple) columns.
+    routes_per_od : str
+        Type of routes to use for the simulation (single or multiple).
+    rng : np.random.Generator or CommonRandomNumbers
+        Random number generator for rounding and route splitting.
+    precomputed_routes : bool, optional
+        If True, flows reference routes of the shared route library instead of from/to edges.
+    """
+    if routes_per_od not in ("single", "multiple"):
+        raise ValueError(f"Unknown routes_per_od: {routes_per_od}")
+
+    # Read OD interval and relations
+    od_df, begin, end = od_interval_xml_to_df(od_xml)
+    od_df = od_df.rename(columns={"from": "fromTaz", "to": "toTaz"})
+
+    # Integer vehicle numbers per OD pair
+    counts = od_df["count"].to_numpy()
+    n_whole = np.floor(counts)
+    u_round = draw_uniform(rng, STREAM_ROUND, np.arange(len(counts)), np.zeros(len(counts)))
+    n_veh = (n_whole + (u_round < counts - n_whole)).astype(np.int64)
+
+    # Split the vehicles of each OD pair across its routes (single: one route per OD pair)
+    route_table = get_route_table(routes_df)
+    route_od_idx = route_table.lookup(od_df["fromTaz"], od_df["toTaz"])
+    valid = route_od_idx >= 0
+    veh_od_idx = np.repeat(np.flatnonzero(valid), n_veh[valid])
+    veh_idx = np.arange(len(veh_od_idx)) - np.repeat(np.cumsum(n_veh[valid]) - n_veh[valid], n_veh[valid])
+    u_route = draw_uniform(rng, STREAM_ROUTE, veh_od_idx, veh_idx)
+    route_pos = route_table.sample(np.repeat(route_od_idx[valid], n_veh[valid]), u_route)
+    number = np.bincount(route_pos, minlength=len(route_table.route_id))
+
+    od_keys = route_table.od_index[route_table.group_idx]
+    flows_df = pd.DataFrame(
+        {
+            "number": number,
+            "start_edge": route_table.start_edge,
+            "last_edge": route_table.last_edge,
+            "route": route_table.route_label,
+            "fromTaz": od_keys.get_level_values(0),
+            "toTaz": od_keys.get_level_values(1),
+        }
+    )
+    flows_df = flows_df[flows_df["number"] > 0].reset_index(drop=True)
+
+    # Root <routes> element with one <flow> per row
+    root = ET.Element("routes")
+    for k, row in enumerate(flows_df.itertuples(index=False)):
+        if precomputed_routes:
+            route_attrs = {"route": row.route}
+        else:
+            route_attrs = {"from": row.start_edge, "to": row.last_edge}
+        ET.SubElement(
+            root,
+            "flow",
+            {
+                "id": f"flow_{k}",
+                "begin": f"{begin:.2f}",
+                "end": f"{end:.2f}",
+                "number": str(row.number),
+                **route_attrs,
+                "type": "DEFAULT_VEHTYPE",
+                "fromTaz": row.fromTaz,
+                "toTaz": row.toTaz,
+                "departLane": "best",
+                "departSpeed": "max",
+            },
+        )
+
+    tree = ET.ElementTree(root)
+    ET.indent(tree, space="\t")
+    if Path(output_file).suffix == ".gz":
+        with gzip.open(output_file, "wb", compresslevel=1) as f:
+            tree.write(f, encoding="utf-8", xml_declaration=True)
+    else:
+        tree.write(output_file, encoding="utf-8", xml_declaration=True)
+    print(f"Created flow XML with {len(flows_df)} flows at: {output_file}")
+
+
+def get_route_library_xml(routes_df: pd.DataFrame, output_dir: Path) -> Path:
+    """
+    Return the shared route library file for a route set, writing it on first use.
+
+    The library holds one <route id="route_<index>" edges="..."/> per row of `routes_df`
+    and is named after the route set fingerprint, so it is written once per output directory
+    and route set and reused by every evaluation (and every worker) writing there afterwards.
+
+    Parameters
+    ----------
+    routes_df : pd.DataFrame
+        DataFrame with a "route_edges" column holding space-separated edge ids.
+    output_dir : Path
+        Directory to store the library in (the simulation output directory of the run, or the
+        scratch root of the process).
+
+    Returns
+    -------
+    Path
+        Path to the route library XML file.
+    """
+    route_table = get_route_table(routes_df)
+    if route_table.route_edges is None:
+        raise ValueError("Precomputed routes require a 'route_edges' column in the routes CSV.")
+
+    output_file = Path(output_dir) / f"route_library_{route_table.key:016x}.add.xml"
+    if not output_file.exists():
+        # Loaded as an additional file so all routes exist before the first vehicle is read
+        root = ET.Element("additional")
+        for label, edges in zip(route_table.route_label, route_table.route_edges):
+            ET.SubElement(root, "route", {"id": label, "edges": edges})
+
+        tree = ET.ElementTree(root)
+        ET.indent(tree, space="\t")
+
+        # Write atomically: parallel workers may race to create the same library
+        tmp_file = output_file.with_name(f"{output_file.name}.{os.getpid()}.tmp")
+        tree.write(tmp_file, encoding="utf-8", xml_declaration=True)
+        os.replace(tmp_file, output_file)
+        print(f"Created route library with {len(route_table.route_label)} routes at: {output_file}")
+
+    return output_file
+
+
+def create_sensor_additional_xml(
+    additional_xml: Path,
+    link_list: list[str],
+    sensor_start_time: float,
+    sensor_end_time: float,
+    output_file: Path,
+) -> Path:
+    """
+    Write a copy of the network additional file whose edgeData only covers the sensor links.
+
+    Every <edgeData> element is restricted to `link_list` (SUMO `edges` attribute), to the
+    attributes used for the sensor counts ("arrived", "left", "speed"), and to the sensor
+    window. Its output file is rewritten relative to the new location, so SUMO writes to the
+    same path as with the original additional file.
+
+    Parameters
+    ----------
+    additional_xml : Path
+        Path to the network additional file.
+    link_list : list of str
+        Sensor link IDs.
+    sensor_start_time : float
+        Start of the sensor counting window (seconds).
+    sensor_end_time : float
+        End of the sensor counting window (seconds).
+    output_file : Path
+        Path of the generated additional file.
+
+    Returns
+    -------
+    Path
+        Path to the generated additional file.
+    """
+    additional_xml = Path(additional_xml)
+    output_file = Path(output_file)
+
+    tree = ET.parse(additional_xml)
+    for edge_data in tree.getroot().iter("edgeData"):
+        edge_data.set("edges", " ".join(str(link_id) for link_id in link_list))
+        edge_data.set("writeAttributes", "arrived left speed")
+        edge_data.set("begin", str(sensor_start_time))
+        edge_data.set("end", str(sensor_end_time))
+        if edge_data.get("file") is not None:
+            target = os.path.normpath(additional_xml.parent / edge_data.get("file"))
+            edge_data.set("file", os.path.relpath(target, output_file.parent))
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tree.write(output_file, encoding="utf-8", xml_declaration=True)
+    print(f"Created sensor-only additional file at: {output_file}")
 
-    write_trips_to_xml_pretty(trips_df, output_trip_file, attr_cols)
+    return output_file
 
 
 def create_od_tazrelation_xml(od_df: pd.DataFrame, output_file: Path, od_end_time_seconds: int) -> None:
@@ -0,0 +1,290 @@
+# Standard library imports
+import atexit
+import time
+from pathlib import Path
+from typing import Optional
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local application imports
+from utils.link_flow_analysis import EdgeDataAccumulator
+
+# Per-process worker cache (one SUMO instance per process is a libsumo limitation)
+_WORKER: Optional["TraciSimulationWorker"] = None
+
+
+class TraciSimulationWorker:
+    """
+    Persistent SUMO instance driven through libsumo/TraCI.
+
+    The first run starts SUMO; every following run reuses the same connection and passes the
+    new route file to `simulation.load`. A load re-parses the network and additional files,
+    which is cheap next to the simulation itself (about 0.06 s against 200 s of simulation on
+    4smallRegion), so the saving is the process start and connection set-up of each run.
+
+    After a run, SUMO is loaded once more with the bare network and no outputs, which closes
+    the output files of the run. The sensor counts are then read from the complete edgeData
+    output, exactly as with the subprocess backend. Only the early-abort check follows the
+    sensor edges step by step through edge subscriptions.
+    """
+
+    def __init__(self, net_xml: Path, additional_xml: Path, seed: int = 0):
+        self.net_xml = Path(net_xml)
+        self.additional_xml = Path(additional_xml)
+        self.seed = seed
+        self.started = False
+
+        try:
+            import traci  # resolves to libsumo when LIBSUMO_AS_TRACI=1
+        except ImportError as e:
+            raise RuntimeError(
+                "sim_backend 'traci' requires SUMO's python tools (traci/libsumo) on the python path."
+            ) from e
+        self.traci = traci
+
+    def _build_options(
+        self,
+        routes_xml: Path,
+        prefix_output: str,
+        sim_start_time: int,
+        sim_end_time: int,
+        vehroutes_xml: Optional[Path] = None,
+    ) -> list[str]:
+        """Build the SUMO option list shared by `traci.start` and `traci.load`."""
+        options = [
+            "--output-prefix",
+            f"{prefix_output}_",
+            "--ignore-route-errors",
+            "true",
+            "--net-file",
+            str(self.net_xml),
+            "--routes",
+            str(routes_xml),
+            "-b",
+            str(sim_start_time),
+            "-e",
+            str(sim_end_time),
+            "--additional-files",
+            str(self.additional_xml),
+            "--xml-validation",
+            "never",
+            "--no-warnings",
+            "--mesosim",
+            "true",
+            "--seed",
+            str(self.seed),
+        ]
+        if vehroutes_xml is not None:
+            options += ["--vehroutes", str(vehroutes_xml)]
+        return options
+
+    def _close_outputs(self, sim_start_time: int) -> None:
+        """Load the bare network for an empty simulation so SUMO closes the run's output files."""
+        self.traci.load(
+            [
+                "--net-file",
+                str(self.net_xml),
+                "-b",
+                str(sim_start_time),
+                "-e",
+                str(sim_start_time),
+                "--xml-validation",
+                "never",
+                "--no-warnings",
+                "--mesosim",
+                "true",
+            ]
+        )
+        # A TraCI server acknowledges the load before executing it; the next command waits for it
+        self.traci.simulation.getTime()
+
+    def run(
+        self,
+        routes_xml: Path,
+        prefix_output: str,
+        edge_data_xml: Path,
+        link_list: list[str],
+        sim_start_time: int,
+        sim_end_time: int,
+        sensor_start_time: float,
+        sensor_end_time: float,
+        vehroutes_xml: Optional[Path] = None,
+        gt_counts: Optional[np.ndarray] = None,
+        abort_loss: Optional[float] = None,
+        abort_check_sec: float = 60,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """
+        Simulate one route file and return its sensor link statistics.
+
+        The sensor counts of a completed run are aggregated from the edgeData output of the
+        additional file once SUMO has closed it. With `abort_loss`, vehicles leaving the sensor
+        edges are counted step by step for the NRMSE lower bound. That count can miss vehicles
+        that cross an edge within one step, so the bound stays a lower bound.
+
+        Parameters
+        ----------
+        routes_xml : Path
+            Route/trip file for this evaluation.
+        prefix_output : str
+            Prefix used for SUMO output files.
+        edge_data_xml : Path
+            edgeData output file of the run, i.e. the path in the additional file with the
+            output prefix applied.
+        link_list : list of str
+            Sensor link IDs to collect counts for.
+        sim_start_time : int
+            Simulation start time in seconds.
+        sim_end_time : int
+            Simulation end time in seconds.
+        sensor_start_time : float
+            Start of the sensor counting window (seconds).
+        sensor_end_time : float
+            End of the sensor counting window (seconds).
+        vehroutes_xml : Optional[Path], optional
+            Vehicle routes output file (prefixed like the other outputs). None disables it.
+        gt_counts : Optional[np.ndarray], optional
+            Ground-truth counts aligned with `link_list`, required for early abort.
+        abort_loss : Optional[float], optional
+            Stop the simulation once the NRMSE lower bound exceeds this value. None disables it.
+        abort_check_sec : float, optional
+            Simulated seconds between two lower bound checks. Defaults to 60.
+        timeout : Optional[float], optional
+            Wall-clock limit in seconds. A run that exceeds it closes the SUMO instance (the
+            next run starts a new one) and raises TimeoutError. None disables it.
+
+        Returns
+        -------
+        pd.DataFrame
+            Aggregated statistics with ["link_id", "interval_nVehContrib",
+            "interval_harmonicMeanSpeed"]. For a run stopped early, these are the partial
+            step-wise statistics with `attrs["early_abort"]` set to True and
+            `attrs["loss_bound"]` holding the bound.
+        """
+        traci = self.traci
+        options = self._build_options(routes_xml, prefix_output, sim_start_time, sim_end_time, vehroutes_xml)
+
+        if self.started:
+            traci.load(options)
+        else:
+            traci.start(["sumo"] + options)
+            self.started = True
+
+        link_list = [str(link_id) for link_id in link_list]
+        link_index = {link_id: k for k, link_id in enumerate(link_list)}
+        counts = np.zeros(len(link_list), dtype=np.float64)
+        speed_sum = np.zeros(len(link_list), dtype=np.float64)
+        speed_n = np.zeros(len(link_list), dtype=np.int64)
+        prev_ids = [set() for _ in link_list]
+
+        loss_bound = None
+        next_check = sensor_start_time + abort_check_sec
+        deadline = None if timeout is None else time.time() + timeout
+
+        var_ids = [traci.constants.LAST_STEP_VEHICLE_ID_LIST, traci.constants.LAST_STEP_MEAN_SPEED]
+        # Subscriptions are dropped by load, so edges are only subscribed for the abort check
+        track_edges = abort_loss is not None
+        if track_edges:
+            for link_id in link_list:
+                traci.edge.subscribe(link_id, var_ids)
+
+        # A vehicle that was on the edge in the previous step and is gone now has either
+        # left the edge or arrived on it; vehicles crossing within one step are missed, so the
+        # tracked counts are a lower bound of the edgeData counts
+        while traci.simulation.getTime() < sim_end_time:
+            traci.simulationStep()
+            if deadline is not None and time.time() > deadline:
+                self.close()
+                raise TimeoutError(f"SUMO simulation did not finish within {timeout} seconds")
+            if not track_edges:
+                continue
+            now = traci.simulation.getTime()
+            in_window = sensor_start_time < now <= sensor_end_time
+
+            for link_id, values in traci.edge.getAllSubscriptionResults().items():
+                k = link_index[link_id]
+                curr_ids = set(values[traci.constants.LAST_STEP_VEHICLE_ID_LIST])
+                if in_window:
+                    counts[k] += len(prev_ids[k] - curr_ids)
+                    if curr_ids:
+                        speed_sum[k] += values[traci.constants.LAST_STEP_MEAN_SPEED]
+                        speed_n[k] += 1
+                prev_ids[k] = curr_ids
+
+            # Counts only grow, so the current overshoot bounds the final NRMSE from below
+            if abort_loss is not None and in_window and now >= next_check:
+                next_check = now + abort_check_sec
+                bound = nrmse_lower_bound(counts, gt_counts)
+                if bound > abort_loss:
+                    loss_bound = bound
+                    print(f"[Early abort] t={now:.0f}s, NRMSE lower bound {bound:.4f} > {abort_loss:.4f}")
+                    break
+
+        self._close_outputs(sim_start_time)
+
+        if loss_bound is None:
+            accumulator = EdgeDataAccumulator(link_list, sensor_start_time, sensor_end_time)
+            accumulator.feed(edge_data_xml)
+            return accumulator.to_frame()
+
+        mean_speed = np.full(len(link_list), np.nan)
+        np.divide(speed_sum, speed_n, out=mean_speed, where=speed_n > 0)
+
+        link_stats = pd.DataFrame(
+            {
+                "link_id": link_list,
+                "interval_nVehContrib": counts,
+                "interval_harmonicMeanSpeed": mean_speed,
+            }
+        )
+        link_stats.attrs["early_abort"] = True
+        link_stats.attrs["loss_bound"] = loss_bound
+        return link_stats
+
+    def close(self) -> None:
+        """Close the SUMO instance if it is running."""
+        if self.started:
+            self.started = False
+            try:
+                self.traci.close()
+            except self.traci.FatalTraCIError:
+                pass  # connection already lost
+
+
+def nrmse_lower_bound(counts: np.ndarray, gt_counts: np.ndarray) -> float:
+    """
+    Lower bound on the final NRMSE given partial sensor counts of a running simulation.
+
+    Simulated counts can only increase, so every link whose partial count already exceeds
+    the ground truth contributes at least its current overshoot to the final error.
+    """
+    overshoot = np.maximum(counts - gt_counts, 0.0)
+    return float(np.sqrt(len(gt_counts) * np.sum(overshoot**2)) / np.sum(gt_counts))
+
+
+def get_traci_worker(net_xml: Path, additional_xml: Path, seed: int = 0) -> TraciSimulationWorker:
+    """
+    Return the persistent TraCI worker of the current process, creating it on first use.
+
+    The worker is replaced if a different network, additional file, or seed is requested.
+    """
+    global _WORKER
+    if _WORKER is not None and (
+        _WORKER.net_xml != Path(net_xml) or _WORKER.additional_xml != Path(additional_xml) or _WORKER.seed != seed
+    ):
+        _WORKER.close()
+        _WORKER = None
+
+    if _WORKER is None:
+        _WORKER = TraciSimulationWorker(net_xml, additional_xml, seed)
+
+    return _WORKER
+
+
+@atexit.register
+def _close_traci_worker() -> None:
+    """Shut down the process-level TraCI worker on interpreter exit."""
+    if _WORKER is not None:
+        _WORKER.close()
@@ -0,0 +1,526 @@
+# Standard library imports
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+TRIP_COLUMNS = [
+    "id",
+    "depart",
+    "from",
+    "to",
+    "type",
+    "fromTaz",
+    "toTaz",
+    "departLane",
+    "departSpeed",
+]
+
+VEHICLE_COLUMNS = [
+    "id",
+    "depart",
+    "route",
+    "type",
+    "fromTaz",
+    "toTaz",
+    "departLane",
+    "departSpeed",
+]
+
+
+# Independent random streams used during demand generation
+STREAM_ROUND = 0
+STREAM_SOURCE = 1
+STREAM_SINK = 2
+STREAM_ROUTE = 3
+
+
+class CommonRandomNumbers:
+    """
+    Fixed per-OD random streams shared by all evaluations of a run (common random numbers).
+
+    Draw i of stream s for OD relation k is a pure function of (seed, s, k, i), computed with
+    a counter-based SplitMix64 hash. It behaves like a pre-drawn array of uniforms per OD pair
+    that is never materialized. When an OD count changes from n to n', vehicles 0..min(n, n')-1
+    keep their rounding, source/sink, and route draws, so candidates in a batch and across
+    epochs differ only through their OD counts and not through re-randomized demand.
+    Departure times follow the deterministic `--spread.uniform` grid and need no draws.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.seed = np.uint64(seed)
+
+    @staticmethod
+    def _mix(x: np.ndarray) -> np.ndarray:
+        """SplitMix64 finalizer on uint64 arrays (wrap-around arithmetic)."""
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+    def uniform(self, stream: int, od_idx: np.ndarray, veh_idx: np.ndarray) -> np.ndarray:
+        """Return draw `veh_idx` of `stream` for each OD relation in `od_idx`, uniform on [0, 1)."""
+        with np.errstate(over="ignore"):
+            h = self._mix(np.full(len(od_idx), self.seed ^ np.uint64(stream), dtype=np.uint64))
+            h = self._mix(h ^ np.asarray(od_idx, dtype=np.uint64))
+            h = self._mix(h ^ np.asarray(veh_idx, dtype=np.uint64))
+        return (h >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+DemandRandom = Union[np.random.Generator, CommonRandomNumbers]
+
+
+def draw_uniform(rng: DemandRandom, stream: int, od_idx: np.ndarray, veh_idx: np.ndarray) -> np.ndarray:
+    """Draw one uniform number per (OD relation, vehicle) pair from a generator or common random numbers."""
+    if isinstance(rng, CommonRandomNumbers):
+        return rng.uniform(stream, od_idx, veh_idx)
+    return rng.random(len(od_idx))
+
+
+@lru_cache(maxsize=8)
+def load_taz_edges(taz_xml: Path) -> dict:
+    """
+    Parse a TAZ file into flat, group-indexed source and sink tables.
+
+    Parameters
+    ----------
+    taz_xml : Path
+        Path to the TAZ (Traffic Assignment Zones) file.
+
+    Returns
+    -------
+    dict
+        Dictionary with
+        - "taz_index": mapping from TAZ id to integer index
+        - "source_edges", "source_cum": source edge ids and grouped cumulative weights
+        - "sink_edges", "sink_cum": sink edge ids and grouped cumulative weights
+    """
+    root = ET.parse(taz_xml).getroot()
+    taz_index = {}
+    tables = {"tazSource": ([], [], []), "tazSink": ([], [], [])}
+
+    for k, taz in enumerate(root.iter("taz")):
+        taz_index[taz.get("id")] = k
+        for tag, (edges, weights, groups) in tables.items():
+            for elem in taz.iter(tag):
+                edges.append(elem.get("id"))
+                weights.append(float(elem.get("weight", 1.0)))
+                groups.append(k)
+
+    taz_edges = {"taz_index": taz_index}
+    for tag, key in (("tazSource", "source"), ("tazSink", "sink")):
+        edges, weights, groups = tables[tag]
+        taz_edges[f"{key}_edges"] = np.array(edges, dtype=object)
+        taz_edges[f"{key}_cum"] = grouped_cumulative_weights(np.array(groups), np.array(weights))
+
+    return taz_edges
+
+
+def grouped_cumulative_weights(group_idx: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Build a grouped cumulative-probability table for vectorized weighted sampling.
+
+    Entries must be ordered by group. Entry k of group g holds g + (normalized cumulative
+    weight of group g up to k), so each group occupies the interval (g, g + 1] and a draw
+    for group g is a single `searchsorted` of g + u with u ~ U[0, 1).
+
+    Parameters
+    ----------
+    group_idx : np.ndarray
+        Integer group index of each entry (non-decreasing).
+    weights : np.ndarray
+        Non-negative weight of each entry.
+
+    Returns
+    -------
+    np.ndarray
+        Grouped cumulative table with the same length as `weights`.
+
+    Raises
+    ------
+    ValueError
+        If the weights of a group do not sum to a positive value.
+    """
+    if len(weights) == 0:
+        return np.zeros(0)
+    group_idx = np.asarray(group_idx, dtype=np.int64)
+    cum = np.cumsum(weights, dtype=np.float64)
+    group_start = np.r_[True, group_idx[1:] != group_idx[:-1]]
+    group_offset = np.maximum.accumulate(np.where(group_start, cum - weights, 0.0))
+    within = cum - group_offset
+    group_total = np.zeros(group_idx.max() + 1)
+    np.maximum.at(group_total, group_idx, within)
+    empty = np.unique(group_idx[group_total[group_idx] <= 0])
+    if len(empty):
+        raise ValueError(f"Groups {empty.tolist()} have no positive weight")
+    return group_idx + within / group_total[group_idx]
+
+
+def sample_from_groups(
+    cum_table: np.ndarray,
+    group_idx: np.ndarray,
+    u: np.ndarray,
+    group_names: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Draw one entry per sample from its group of a `grouped_cumulative_weights` table.
+
+    Parameters
+    ----------
+    cum_table : np.ndarray
+        Table built by `grouped_cumulative_weights`.
+    group_idx : np.ndarray
+        Group index of each sample.
+    u : np.ndarray
+        Uniform [0, 1) random numbers, one per sample.
+    group_names : Optional[np.ndarray], optional
+        Name of every group, used in the error message.
+
+    Returns
+    -------
+    np.ndarray
+        Index into the table for each sample.
+
+    Raises
+    ------
+    ValueError
+        If a sample belongs to a group without entries in the table.
+    """
+    group_idx = np.asarray(group_idx, dtype=np.int64)
+    if len(cum_table) == 0:
+        outside = np.ones(len(group_idx), dtype=bool)
+        idx = np.zeros(len(group_idx), dtype=np.int64)
+    else:
+        idx = np.minimum(np.searchsorted(cum_table, group_idx + u, side="right"), len(cum_table) - 1)
+        # A draw that lands outside (g, g + 1] fell through to another group
+        drawn = cum_table[idx]
+        outside = (drawn <= group_idx) | (drawn > group_idx + 1)
+
+    if outside.any():
+        missing = np.unique(group_idx[outside])
+        if group_names is not None:
+            missing = np.asarray(group_names)[missing]
+        raise ValueError(f"Groups {missing.tolist()} have no entries")
+    return idx
+
+
+class RouteTable:
+    """
+    Route set compiled into grouped cumulative-probability tables keyed by integer OD index.
+
+    Routes are grouped by (fromTaz, toTaz); within a group they are drawn proportionally to
+    their "ratio" column (uniformly if the column is missing). All trips of an evaluation
+    are assigned with one vectorized draw instead of a loop over OD groups.
+    """
+
+    def __init__(self, routes_df: pd.DataFrame):
+        self.key = route_set_key(routes_df)
+        routes = routes_df.copy()
+        for col in ["fromTaz", "toTaz", "start_edge", "last_edge"]:
+            routes[col] = routes[col].astype(str)
+        if "ratio" not in routes.columns:
+            routes["ratio"] = 1.0
+        routes = routes.sort_values(by=["fromTaz", "toTaz"], kind="stable")
+
+        od_keys = pd.MultiIndex.from_frame(routes[["fromTaz", "toTaz"]])
+        self.od_index = od_keys.unique()
+        self.group_idx = self.od_index.get_indexer(od_keys)
+
+        self.cum = grouped_cumulative_weights(self.group_idx, routes["ratio"].to_numpy(dtype=np.float64))
+        self.route_id = routes.index.to_numpy()
+        self.start_edge = routes["start_edge"].to_numpy()
+        self.last_edge = routes["last_edge"].to_numpy()
+        self.route_label = np.array([f"route_{route_id}" for route_id in self.route_id], dtype=object)
+        self.route_edges = routes["route_edges"].astype(str).to_numpy() if "route_edges" in routes.columns else None
+
+    def lookup(self, from_taz, to_taz) -> np.ndarray:
+        """Return the OD index of each (fromTaz, toTaz) pair, or -1 if the pair has no route."""
+        keys = pd.MultiIndex.from_arrays([np.asarray(from_taz, dtype=str), np.asarray(to_taz, dtype=str)])
+        return self.od_index.get_indexer(keys)
+
+    def sample(self, od_idx: np.ndarray, u: np.ndarray) -> np.ndarray:
+        """Map one uniform draw per trip to a route position for valid (non-negative) OD indices."""
+        return sample_from_groups(self.cum, od_idx, u)
+
+
+# Per-process cache of compiled route tables, keyed by route set content
+_ROUTE_TABLES: dict = {}
+
+
+def route_set_key(routes_df: pd.DataFrame) -> int:
+    """Return a content fingerprint of a route set."""
+    return int(pd.util.hash_pandas_object(routes_df, index=True).sum())
+
+
+def get_route_table(routes_df: pd.DataFrame) -> RouteTable:
+    """Return the compiled `RouteTable` for a route set, compiling it on first use in this process."""
+    key = route_set_key(routes_df)
+    if key not in _ROUTE_TABLES:
+        _ROUTE_TABLES[key] = RouteTable(routes_df)
+    return _ROUTE_TABLES[key]
+
+
+def round_od_counts(counts: np.ndarray, rng: DemandRandom) -> np.ndarray:
+    """Round fractional OD counts stochastically: floor(c) plus one with probability c - floor(c)."""
+    counts = np.asarray(counts, dtype=np.float64)
+    n_whole = np.floor(counts)
+    u_round = draw_uniform(rng, STREAM_ROUND, np.arange(len(counts)), np.zeros(len(counts)))
+    return (n_whole + (u_round < counts - n_whole)).astype(np.int64)
+
+
+def expand_od_blocks(
+    od_df: pd.DataFrame,
+    n_veh: np.ndarray,
+    od_subset: np.ndarray,
+    taz_xml: Path,
+    begin: float,
+    end: float,
+    rng: DemandRandom,
+) -> pd.DataFrame:
+    """
+    Expand the selected OD relations into one trip block each, ordered by relation and vehicle.
+
+    Parameters
+    ----------
+    od_df : pd.DataFrame
+        DataFrame with "from" and "to" (TAZ ids) columns.
+    n_veh : np.ndarray
+        Integer number of vehicles of every OD relation.
+    od_subset : np.ndarray
+        Ascending indices of the OD relations to expand.
+    taz_xml : Path
+        Path to the TAZ file.
+    begin : float
+        Begin of the OD interval (seconds).
+    end : float
+        End of the OD interval (seconds).
+    rng : np.random.Generator or CommonRandomNumbers
+        Random number generator, or fixed per-OD streams for common random numbers.
+
+    Returns
+    -------
+    pd.DataFrame
+        Unsorted trips table with `TRIP_COLUMNS` plus "depart_float", "od_idx" and "veh_idx".
+
+    Raises
+    ------
+    ValueError
+        If an origin TAZ has no tazSource or a destination TAZ has no tazSink edges.
+    """
+    taz_edges = load_taz_edges(Path(taz_xml))
+    taz_index = taz_edges["taz_index"]
+
+    # One row per vehicle: relation index and position within the relation
+    od_subset = np.asarray(od_subset, dtype=np.int64)
+    n_sub = n_veh[od_subset]
+    od_idx = np.repeat(od_subset, n_sub)
+    veh_idx = np.arange(n_sub.sum()) - np.repeat(np.cumsum(n_sub) - n_sub, n_sub)
+    n_rel = n_veh[od_idx]
+
+    # Uniform spreading over the interval
+    depart = begin + (end - begin) * (veh_idx + 0.5) / n_rel
+
+    # Weighted source and sink edges
+    from_taz = od_df["from"].astype(str).to_numpy()
+    to_taz = od_df["to"].astype(str).to_numpy()
+    origin = np.array([taz_index[taz] for taz in from_taz[od_subset]], dtype=np.int64)
+    destination = np.array([taz_index[taz] for taz in to_taz[od_subset]], dtype=np.int64)
+    origin = np.repeat(origin, n_sub)
+    destination = np.repeat(destination, n_sub)
+    u_source = draw_uniform(rng, STREAM_SOURCE, od_idx, veh_idx)
+    u_sink = draw_uniform(rng, STREAM_SINK, od_idx, veh_idx)
+    taz_ids = np.array(list(taz_index), dtype=object)
+    try:
+        from_edge = taz_edges["source_edges"][
+            sample_from_groups(taz_edges["source_cum"], origin, u_source, group_names=taz_ids)
+        ]
+    except ValueError as e:
+        raise ValueError(f"Origin TAZ without tazSource edges in {taz_xml}: {e}") from e
+    try:
+        to_edge = taz_edges["sink_edges"][
+            sample_from_groups(taz_edges["sink_cum"], destination, u_sink, group_names=taz_ids)
+        ]
+    except ValueError as e:
+        raise ValueError(f"Destination TAZ without tazSink edges in {taz_xml}: {e}") from e
+
+    trips_df = pd.DataFrame(
+        {
+            "id": np.char.add(np.char.add(od_idx.astype(str), "_"), veh_idx.astype(str)),
+            "depart": np.char.mod("%.2f", depart),
+            "from": from_edge,
+            "to": to_edge,
+            "type": "DEFAULT_VEHTYPE",
+            "fromTaz": from_taz[od_idx],
+            "toTaz": to_taz[od_idx],
+            "departLane": "free",
+            "departSpeed": "max",
+        },
+        columns=TRIP_COLUMNS,
+    )
+    trips_df["depart_float"] = depart
+    trips_df["od_idx"] = od_idx
+    trips_df["veh_idx"] = veh_idx
+
+    return trips_df
+
+
+def sort_trips(trips_df: pd.DataFrame) -> pd.DataFrame:
+    """Order trips by departure, breaking ties by OD relation and vehicle index."""
+    order = np.lexsort(
+        (
+            trips_df["veh_idx"].to_numpy(),
+            trips_df["od_idx"].to_numpy(),
+            trips_df["depart_float"].to_numpy(),
+        )
+    )
+    return trips_df.iloc[order].reset_index(drop=True)
+
+
+def generate_trips_df(
+    od_df: pd.DataFrame,
+    taz_xml: Path,
+    begin: float,
+    end: float,
+    rng: DemandRandom,
+) -> pd.DataFrame:
+    """
+    Expand an OD matrix into a trips table with od2trips `--spread.uniform` semantics.
+
+    For each OD relation with count c, floor(c) vehicles are inserted plus one more with
+    probability c - floor(c). The n vehicles of a relation depart at
+    begin + (end - begin) * (i + 0.5) / n, and their from/to edges are drawn from the
+    weighted sources of the origin TAZ and sinks of the destination TAZ.
+
+    Parameters
+    ----------
+    od_df : pd.DataFrame
+        DataFrame with "from", "to" (TAZ ids) and "count" columns.
+    taz_xml : Path
+        Path to the TAZ file.
+    begin : float
+        Begin of the OD interval (seconds).
+    end : float
+        End of the OD interval (seconds).
+    rng : np.random.Generator or CommonRandomNumbers
+        Random number generator, or fixed per-OD streams for common random numbers.
+
+    Returns
+    -------
+    pd.DataFrame
+        Trips table sorted by departure with the same columns as an od2trips output file,
+        plus "od_idx" and "veh_idx" columns identifying each vehicle within its relation.
+    """
+    n_veh = round_od_counts(od_df["count"].to_numpy(), rng)
+    trips_df = expand_od_blocks(od_df, n_veh, np.arange(len(n_veh)), taz_xml, begin, end, rng)
+    return sort_trips(trips_df)
+
+
+class TripBlockCache:
+    """
+    Per-process LRU of recently generated trip tables for incremental regeneration.
+
+    Under common random numbers the trip block of an OD relation depends only on its index and
+    rounded vehicle count, so a candidate that differs from a cached parent in a few OD pairs
+    (e.g. a TuRBO perturbation of the trust-region center) reuses every unchanged block. Only
+    the changed relations are expanded and routed, and the result is spliced into the parent's
+    sorted trip stream. The output is identical to a full regeneration.
+    """
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.next_key = 0
+
+    def _closest_parent(self, context: tuple, od_keys: tuple, n_veh: np.ndarray) -> Optional[int]:
+        """Return the key of the compatible entry with the fewest changed OD relations."""
+        best_key, best_changed = None, None
+        for key, entry in self.entries.items():
+            if entry["context"] != context or len(entry["n_veh"]) != len(n_veh):
+                continue
+            if not all(np.array_equal(a, b) for a, b in zip(entry["od_keys"], od_keys)):
+                continue
+            n_changed = np.count_nonzero(entry["n_veh"] != n_veh)
+            if best_changed is None or n_changed < best_changed:
+                best_key, best_changed = key, n_changed
+        return best_key
+
+    def generate(
+        self,
+        od_df: pd.DataFrame,
+        taz_xml: Path,
+        begin: float,
+        end: float,
+        rng: CommonRandomNumbers,
+        route_fn: Callable[[pd.DataFrame], pd.DataFrame],
+        context: tuple = (),
+    ) -> pd.DataFrame:
+        """
+        Return the routed trips table of an OD matrix, regenerating only relations that changed.
+
+        Parameters
+        ----------
+        od_df : pd.DataFrame
+            DataFrame with "from", "to" (TAZ ids) and "count" columns.
+        taz_xml : Path
+            Path to the TAZ file.
+        begin : float
+            Begin of the OD interval (seconds).
+        end : float
+            End of the OD interval (seconds).
+        rng : CommonRandomNumbers
+            Fixed per-OD streams; independent generators make cached blocks non-reproducible.
+        route_fn : Callable
+            Route assignment applied to newly expanded trips (e.g. `assign_trip_routes`).
+        context : tuple, optional
+            Extra settings the routed trips depend on (e.g. route set and routes_per_od).
+
+        Returns
+        -------
+        pd.DataFrame
+            Routed trips table sorted by departure.
+        """
+        n_veh = round_od_counts(od_df["count"].to_numpy(), rng)
+        od_keys = (od_df["from"].astype(str).to_numpy(), od_df["to"].astype(str).to_numpy())
+        context = (str(taz_xml), float(begin), float(end), int(rng.seed), *context)
+
+        parent_key = self._closest_parent(context, od_keys, n_veh)
+        if parent_key is None:
+            changed = np.arange(len(n_veh))
+            kept_df = None
+        else:
+            parent = self.entries[parent_key]
+            self.entries.move_to_end(parent_key)
+            changed = np.flatnonzero(parent["n_veh"] != n_veh)
+            kept_df = parent["trips_df"][~np.isin(parent["trips_df"]["od_idx"].to_numpy(), changed)]
+
+        new_df = route_fn(expand_od_blocks(od_df, n_veh, changed, taz_xml, begin, end, rng))
+        if kept_df is not None:
+            # An empty block (changed relations without vehicles) would turn string columns into object
+            new_df = pd.concat([kept_df, new_df], ignore_index=True) if len(new_df) else kept_df
+        trips_df = sort_trips(new_df)
+        print(f"Regenerated {len(changed)} of {len(n_veh)} OD relations.")
+
+        self.entries[self.next_key] = {"context": context, "od_keys": od_keys, "n_veh": n_veh, "trips_df": trips_df}
+        self.next_key += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+        return trips_df
+
+
+# Per-process trip block cache
+_TRIP_BLOCK_CACHE: Optional[TripBlockCache] = None
+
+
+def get_trip_block_cache(max_entries: int) -> TripBlockCache:
+    """Return the trip block cache of the current process, creating or resizing it as needed."""
+    global _TRIP_BLOCK_CACHE
+    if _TRIP_BLOCK_CACHE is None:
+        _TRIP_BLOCK_CACHE = TripBlockCache(max_entries)
+    _TRIP_BLOCK_CACHE.max_entries = max_entries
+    return _TRIP_BLOCK_CACHE
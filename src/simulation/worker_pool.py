@@ -0,0 +1,135 @@
+# Standard library imports
+import multiprocessing as mp
+import os
+import signal
+import time
+from multiprocessing.pool import Pool
+from typing import Optional
+
+# Local application imports
+from simulation.evaluation import run_initial_evaluation, run_sample_evaluation
+from simulation.sumo_runner import kill_sumo_processes
+from utils.link_flow_analysis import NRMSEScorer
+
+# Static inputs of the run, set once per worker process by init_evaluation_worker
+_WORKER_CONTEXT: dict = {}
+
+# Queue on which the worker reports the tasks it starts (see report_task_start)
+_TASK_STARTS: Optional[mp.Queue] = None
+
+CONTEXT_KEYS = [
+    "config",
+    "base_od",
+    "base_path",
+    "routes_df",
+    "routes_per_od",
+    "sensor_flow_gt",
+    "link_selection",
+    "dim_od",
+    "path_init_simul",
+    "path_opt_simul",
+]
+
+
+def init_evaluation_worker(context: dict, task_starts: Optional[mp.Queue] = None) -> None:
+    """
+    Pool initializer: keep the static inputs of the run in the worker process, build the NRMSE
+    scorer of the sensor links once, and kill its running SUMO processes when the pool
+    terminates the worker (or an executor terminates it after a timeout).
+    """
+    global _TASK_STARTS
+    _WORKER_CONTEXT.clear()
+    _WORKER_CONTEXT.update(context)
+    _WORKER_CONTEXT["scorer"] = NRMSEScorer(context["link_selection"])
+    _TASK_STARTS = task_starts
+    signal.signal(signal.SIGTERM, _terminate_worker)
+
+
+def report_task_start(token: int) -> None:
+    """Report that this worker starts the task `token` now, if the pool collects task starts."""
+    if _TASK_STARTS is not None:
+        _TASK_STARTS.put((token, os.getpid(), time.time()))
+
+
+def _terminate_worker(signum, frame) -> None:
+    """SIGTERM handler: kill the SUMO children of the worker, then exit as signalled."""
+    kill_sumo_processes()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+class EvaluationPool(Pool):
+    """
+    Process pool whose workers hold the static inputs of the run and report, on `task_starts`,
+    the worker pid and start time of every evaluation task they pick up.
+    """
+
+    def __init__(self, processes: int, context: dict):
+        self.task_starts = mp.Queue()
+        super().__init__(processes=processes, initializer=init_evaluation_worker, initargs=(context, self.task_starts))
+
+
+def create_evaluation_pool(processes: int, context: dict) -> EvaluationPool:
+    """
+    Create the process pool that runs all simulations of an optimization run.
+
+    The static inputs (configuration, base OD, routes, ground truth, sensor links, and output
+    directories) are sent to each worker once when it starts, so tasks only carry the OD vector
+    and its indices. A worker that exits (e.g. terminated after a timeout) is replaced by the pool.
+
+    Parameters
+    ----------
+    processes : int
+        Number of worker processes.
+    context : dict
+        Static inputs with the keys in CONTEXT_KEYS.
+
+    Returns
+    -------
+    EvaluationPool
+        Pool whose workers can run evaluate_initial_sample and evaluate_sample.
+    """
+    missing = [key for key in CONTEXT_KEYS if key not in context]
+    if missing:
+        raise ValueError(f"Missing evaluation context entries: {missing}")
+    return EvaluationPool(processes, context)
+
+
+def evaluate_initial_sample(i, x):
+    """Run run_initial_evaluation for initial sample `i` with the worker's static inputs."""
+    ctx = _WORKER_CONTEXT
+    return run_initial_evaluation(
+        i,
+        x,
+        ctx["base_od"],
+        ctx["config"],
+        ctx["base_path"],
+        str(ctx["path_init_simul"]),
+        ctx["routes_df"],
+        ctx["routes_per_od"],
+        ctx["link_selection"],
+        ctx["sensor_flow_gt"],
+        ctx["dim_od"],
+        scorer=ctx["scorer"],
+    )
+
+
+def evaluate_sample(j, x_j, i, num_train_data, best_loss=None):
+    """Run run_sample_evaluation for batch `j` of epoch `i` with the worker's static inputs."""
+    ctx = _WORKER_CONTEXT
+    return run_sample_evaluation(
+        j,
+        x_j,
+        i,
+        ctx["config"],
+        ctx["base_od"],
+        str(ctx["path_opt_simul"]),
+        ctx["base_path"],
+        ctx["routes_df"],
+        ctx["routes_per_od"],
+        ctx["sensor_flow_gt"],
+        ctx["link_selection"],
+        num_train_data,
+        best_loss,
+        scorer=ctx["scorer"],
+    )
@@ -14,8 +14,9 @@ import pandas as pd
 from botorch.exceptions import BadInitialCandidatesWarning
 
 # Local application imports
-from simulation.data_loader import load_config_single_od_run, od_xml_to_df
+from simulation.data_loader import load_config_single_od_run, load_sensor_gt, od_xml_to_df
 from simulation.evaluation import run_single_od_evaluation
+from simulation.sumo_runner import create_sensor_additional_xml
 from utils.path_utils import prepare_run_paths
 from utils.plot_utils import save_fit_to_gt_plots_single_run
 
@@ -162,8 +163,7 @@ def main():
     routes_df = pd.read_csv(routes_csv, index_col=0)
 
     # Load ground-truth sensor flow data
-    true_sensor_file_name = f"gt_link_data_{network_name}_{date}_{hour}.csv"
-    sensor_flow_gt = pd.read_csv(base_path + f"/sensor_data/{date}/" + true_sensor_file_name)
+    sensor_flow_gt = load_sensor_gt(base_path, network_name, date, hour)
 
     # Extract the list of links where sensors are located
     link_selection = sensor_flow_gt["link_id"].tolist()
@@ -212,6 +212,15 @@ def main():
         # Run simulation
         # =====================
 
+        # Restrict SUMO edgeData output to the sensor links of this run
+        config["additional_xml"] = create_sensor_additional_xml(
+            config["additional_xml"],
+            link_selection,
+            config["sensor_start_time"],
+            config["sensor_end_time"],
+            Path(base_path, path_run_detail, "additional_sensors.xml"),
+        )
+
         curr_link_stats = run_single_od_evaluation(
             x,
             od_df_base,
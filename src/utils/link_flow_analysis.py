@@ -1,13 +1,137 @@
 # Standard library imports
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import IO, Optional, Tuple, Union
 
 # Third-party imports
 import numpy as np
 import pandas as pd
 
 
+class EdgeDataAccumulator:
+    """
+    Incremental aggregation of SUMO edgeData intervals into per-link NumPy arrays.
+
+    Edges are mapped to array slots through a precomputed id-to-index map, so intervals can be
+    consumed one at a time (e.g. while SUMO is still writing them) without materializing the
+    interval-level table. The aggregation matches `parse_link_flow_xml_to_pandas`: intervals
+    inside [sensor_start_time, sensor_end_time] contribute arrived + left to the count, and the
+    speed is averaged over intervals in which the link had traffic.
+    """
+
+    def __init__(
+        self,
+        link_list: Optional[list[str]],
+        sensor_start_time: float,
+        sensor_end_time: float,
+    ):
+        self.sensor_start_time = sensor_start_time
+        self.sensor_end_time = sensor_end_time
+        self.fixed_links = link_list is not None
+
+        link_ids = [str(link_id) for link_id in link_list] if link_list is not None else []
+        self.link_ids = link_ids
+        self.index = {link_id: k for k, link_id in enumerate(link_ids)}
+        self._allocate(max(len(link_ids), 1))
+
+    def _allocate(self, size: int) -> None:
+        """(Re)allocate the per-link arrays, keeping existing values."""
+        old = getattr(self, "counts", None)
+        arrays = {
+            "counts": np.zeros(size, dtype=np.float64),
+            "speed_sum": np.zeros(size, dtype=np.float64),
+            "speed_n": np.zeros(size, dtype=np.int64),
+            "seen": np.zeros(size, dtype=bool),
+        }
+        if old is not None:
+            for name, array in arrays.items():
+                array[: len(old)] = getattr(self, name)
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    def _slot(self, link_id: str) -> int:
+        """Return the array slot of a link, or -1 if the link is not tracked."""
+        k = self.index.get(link_id, -1)
+        if k < 0 and not self.fixed_links:
+            k = len(self.link_ids)
+            if k >= len(self.counts):
+                self._allocate(2 * len(self.counts))
+            self.link_ids.append(link_id)
+            self.index[link_id] = k
+        return k
+
+    def add_edge(self, link_id: str, arrived: float, left: float, speed: Optional[float]) -> None:
+        """Add one <edge> record of an interval inside the sensor window."""
+        k = self._slot(link_id)
+        if k < 0:
+            return
+        n_veh = arrived + left
+        self.seen[k] = True
+        self.counts[k] += n_veh
+        if n_veh > 0 and speed is not None:
+            self.speed_sum[k] += speed
+            self.speed_n[k] += 1
+
+    def in_window(self, begin: float, end: float) -> bool:
+        """Return True if an interval lies inside the sensor window."""
+        return begin >= self.sensor_start_time and end <= self.sensor_end_time
+
+    def feed(self, source: Union[str, Path, IO], records: Optional[list] = None) -> None:
+        """
+        Consume an edgeData XML document interval by interval.
+
+        Parameters
+        ----------
+        source : str, Path, or file object
+            edgeData file, or a stream such as the read end of a FIFO.
+        records : Optional[list], optional
+            If given, every <edge> record of every interval is appended to it as
+            (interval_begin, interval_end, link_id, link_speed, link_arrived, link_left).
+        """
+        in_window = False
+        begin = end = 0.0
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if elem.tag == "interval":
+                if event == "start":
+                    begin = float(elem.get("begin", 0.0))
+                    end = float(elem.get("end", 0.0))
+                    in_window = self.in_window(begin, end)
+                else:
+                    elem.clear()
+            elif elem.tag == "edge" and event == "end" and (in_window or records is not None):
+                link_id = elem.get("id")
+                speed = float(elem.get("speed", 0.0))
+                arrived = float(elem.get("arrived", 0.0))
+                left = float(elem.get("left", 0.0))
+                if in_window:
+                    self.add_edge(link_id, arrived, left, speed)
+                if records is not None:
+                    records.append((begin, end, link_id, speed, arrived, left))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Return aggregated statistics of the links that reported in the sensor window.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with ["link_id", "interval_nVehContrib", "interval_harmonicMeanSpeed"],
+            sorted by link_id.
+        """
+        n = len(self.link_ids)
+        mean_speed = np.full(n, np.nan)
+        np.divide(self.speed_sum[:n], self.speed_n[:n], out=mean_speed, where=self.speed_n[:n] > 0)
+        link_stats = pd.DataFrame(
+            {
+                "link_id": self.link_ids,
+                "interval_nVehContrib": self.counts[:n],
+                "interval_harmonicMeanSpeed": mean_speed,
+            }
+        )
+        link_stats = link_stats[self.seen[:n]]
+        return link_stats.sort_values("link_id").reset_index(drop=True)
+
+
 def parse_link_flow_xml_to_pandas(
     base_dir: Path,
     sim_link_file: Path,
@@ -15,10 +139,15 @@ def parse_link_flow_xml_to_pandas(
     sensor_start_time: float,
     sensor_end_time: float,
     link_list: Optional[list[str]] = None,
-) -> Tuple[pd.DataFrame, pd.DataFrame, Path]:
+    write_csv: bool = False,
+) -> Tuple[pd.DataFrame, pd.DataFrame, Optional[Path]]:
     """
     Parse a SUMO edgeData XML file and return aggregated link-level statistics as pandas DataFrames.
 
+    The file is streamed with `iterparse` into an `EdgeDataAccumulator`, so only the links in
+    `link_list` are kept and no per-record objects are built unless the interval-level table
+    is requested with `write_csv`.
+
     Parameters
     ----------
     base_dir : Path
@@ -33,105 +162,179 @@ def parse_link_flow_xml_to_pandas(
         Sensor data collection end time (seconds).
     link_list : Optional[list[str]]
         List of links to filter (if specified).
+    write_csv : bool, optional
+        If True, save every interval record to "<prefix_output>_link_flow.csv" and return the
+        interval-level DataFrame. Defaults to False.
 
     Returns
     -------
-    Tuple[pd.DataFrame, pd.DataFrame, Path]
+    Tuple[pd.DataFrame, pd.DataFrame, Optional[Path]]
         - Aggregated link-level DataFrame
-        - Raw interval-level DataFrame
-        - Path to the saved CSV file
+        - Raw interval-level DataFrame within the sensor window (empty unless `write_csv`)
+        - Path to the saved CSV file (None unless `write_csv`)
     """
-    output_file = Path(base_dir) / f"{prefix_output}_link_flow.csv"
-
-    root = ET.parse(sim_link_file).getroot()
-    data = []
-
-    for interval in root.findall("interval"):
-        interval_id = interval.get("id")
-
-        interval_begin_str = interval.get("begin")
-        interval_end_str = interval.get("end")
-        interval_begin = float(interval_begin_str) if interval_begin_str is not None else 0.0
-        interval_end = float(interval_end_str) if interval_end_str is not None else 0.0
-
-        for link in interval.findall("edge"):
-            link_id = link.get("id")
-            speed_str = link.get("speed")
-            arrived_str = link.get("arrived")
-            left_str = link.get("left")
-
-            link_data = {
-                "interval_begin": interval_begin,
-                "interval_end": interval_end,
-                "interval_id": interval_id,
-                "link_id": link_id,
-                "link_speed": float(speed_str) if speed_str is not None else 0.0,
-                "link_arrived": float(arrived_str) if arrived_str is not None else 0.0,
-                "link_left": float(left_str) if left_str is not None else 0.0,
-            }
-            data.append(link_data)
-
-    df_trips = pd.DataFrame(data)[
-        [
-            "interval_begin",
-            "interval_end",
-            "link_id",
-            "link_speed",
-            "link_arrived",
-            "link_left",
+    accumulator = EdgeDataAccumulator(link_list, sensor_start_time, sensor_end_time)
+    records = [] if write_csv else None
+    accumulator.feed(sim_link_file, records=records)
+    df_agg = accumulator.to_frame()
+
+    raw_columns = ["interval_begin", "interval_end", "link_id", "link_speed", "link_arrived", "link_left"]
+    df_trips = pd.DataFrame(records or [], columns=raw_columns)
+    output_file = None
+
+    if write_csv:
+        output_file = Path(base_dir) / f"{prefix_output}_link_flow.csv"
+        df_trips.to_csv(output_file, index=False)
+
+        df_trips["interval_nVehContrib"] = df_trips["link_arrived"] + df_trips["link_left"]
+        df_trips["interval_harmonicMeanSpeed"] = df_trips.loc[df_trips["interval_nVehContrib"] > 0, "link_speed"]
+        df_trips = df_trips[
+            (df_trips["interval_begin"] >= sensor_start_time) & (df_trips["interval_end"] <= sensor_end_time)
         ]
-    ]
 
-    df_trips.to_csv(output_file, index=False)
+    return df_agg, df_trips, output_file
 
-    df_trips["interval_nVehContrib"] = df_trips["link_arrived"] + df_trips["link_left"]
 
-    df_trips["interval_harmonicMeanSpeed"] = df_trips.loc[df_trips["interval_nVehContrib"] > 0, "link_speed"]
+class NRMSEScorer:
+    """
+    Vectorized NRMSE scoring against a fixed, index-aligned sensor set.
 
-    df_trips = df_trips[
-        (df_trips["interval_begin"] >= sensor_start_time) & (df_trips["interval_end"] <= sensor_end_time)
-    ]
+    The sensor index (link id -> column) is built once. Simulated link statistics are aligned
+    into a (batch x sensors) count matrix, and a whole batch is scored against one or many
+    ground-truth vectors (e.g. all dates or hours of a network) in a single call. NaN entries
+    of a ground-truth vector mark sensors missing on that date and are left out of its score.
+    """
 
-    df_agg = df_trips.groupby("link_id", as_index=False).agg(
-        {"interval_nVehContrib": "sum", "interval_harmonicMeanSpeed": "mean"}
-    )
+    def __init__(self, link_ids):
+        self.link_ids = np.asarray([str(link_id) for link_id in link_ids], dtype=object)
+        self.index = pd.Index(self.link_ids)
 
-    if link_list is not None:
-        print(f"Filtering links to: {link_list}")
-        df_agg = df_agg[df_agg["link_id"].isin(link_list)]
+    def align(
+        self, link_stats: pd.DataFrame, column: str = "interval_nVehContrib", fill_value: float = 0.0
+    ) -> np.ndarray:
+        """Return one column of a link statistics frame ordered like the sensor index (`fill_value` if missing)."""
+        values = pd.Series(link_stats[column].to_numpy(dtype=np.float64), index=link_stats["link_id"].astype(str))
+        return values.reindex(self.index, fill_value=fill_value).to_numpy()
 
-    return df_agg, df_trips, output_file
+    def count_matrix(
+        self,
+        sensor_flow_simul: pd.DataFrame,
+        keys: tuple = ("epoch", "batch"),
+        column: str = "interval_nVehContrib",
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Pivot long-format link statistics of many evaluations into a count matrix.
 
+        Parameters
+        ----------
+        sensor_flow_simul : pd.DataFrame
+            Link statistics with the `keys` columns, "link_id" and `column`
+            (e.g. the contents of sensor_flow_simul.csv).
+        keys : tuple, optional
+            Columns identifying an evaluation. Defaults to ("epoch", "batch").
+        column : str, optional
+            Count column. Defaults to "interval_nVehContrib".
 
-def compute_nrmse_counts_all_links(df_true: pd.DataFrame, df_simulated: pd.DataFrame) -> float:
+        Returns
+        -------
+        Tuple[pd.DataFrame, np.ndarray]
+            - One row per evaluation with the `keys` columns
+            - (evaluations x sensors) count matrix, 0 for links without output
+        """
+        keys = list(keys)
+        flows = sensor_flow_simul.assign(link_id=sensor_flow_simul["link_id"].astype(str))
+        matrix = flows.pivot_table(index=keys, columns="link_id", values=column, aggfunc="sum")
+        matrix = matrix.reindex(columns=self.index).fillna(0.0)
+        return matrix.index.to_frame(index=False), matrix.to_numpy(dtype=np.float64)
+
+    def score(self, sim_counts: np.ndarray, gt_counts: np.ndarray) -> np.ndarray:
+        """
+        Compute the NRMSE of every simulated count vector against every ground-truth vector.
+
+        Parameters
+        ----------
+        sim_counts : np.ndarray
+            (sensors,) or (batch x sensors) simulated counts aligned with the sensor index.
+        gt_counts : np.ndarray
+            (sensors,) or (targets x sensors) ground-truth counts, NaN for missing sensors.
+
+        Returns
+        -------
+        np.ndarray
+            (batch x targets) NRMSE values, with singleton input dimensions squeezed.
+        """
+        sim = np.atleast_2d(np.asarray(sim_counts, dtype=np.float64))
+        gt = np.atleast_2d(np.asarray(gt_counts, dtype=np.float64))
+        valid = ~np.isnan(gt)
+        gt_filled = np.where(valid, gt, 0.0)
+
+        diff = np.where(valid[None, :, :], gt_filled[None, :, :] - sim[:, None, :], 0.0)
+        sq_err = np.sum(diff**2, axis=2)
+        n_valid = valid.sum(axis=1)
+        nrmse = np.sqrt(n_valid[None, :] * sq_err) / gt_filled.sum(axis=1)[None, :]
+
+        squeeze_axes = tuple(axis for axis, arr in enumerate((sim_counts, gt_counts)) if np.ndim(arr) == 1)
+        return np.squeeze(nrmse, axis=squeeze_axes) if squeeze_axes else nrmse
+
+
+def score_sensor_flow_simul(
+    sensor_flow_simul: pd.DataFrame,
+    gt_counts: np.ndarray,
+    link_ids,
+    target_names: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """
+    Re-score archived simulation results against one or many ground-truth targets offline.
+
+    Parameters
+    ----------
+    sensor_flow_simul : pd.DataFrame
+        Contents of a sensor_flow_simul.csv file.
+    gt_counts : np.ndarray
+        (targets x sensors) ground-truth counts aligned with `link_ids`, NaN for missing sensors.
+    link_ids : array-like
+        Sensor link IDs defining the columns of `gt_counts`.
+    target_names : Optional[list[str]]
+        Column names of the targets in the output. Defaults to "loss_<k>".
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per (epoch, batch) with one loss column per target.
+    """
+    scorer = NRMSEScorer(link_ids)
+    keys_df, sim_counts = scorer.count_matrix(sensor_flow_simul)
+    losses = scorer.score(sim_counts, np.atleast_2d(gt_counts))
+
+    if target_names is None:
+        target_names = [f"loss_{k}" for k in range(losses.shape[1])]
+    return pd.concat([keys_df, pd.DataFrame(losses, columns=target_names)], axis=1)
+
+
+def compute_nrmse_counts_all_links(
+    df_true: pd.DataFrame, df_simulated: pd.DataFrame, scorer: Optional[NRMSEScorer] = None
+) -> float:
     """
     Compute NRMSE (Normalized Root Mean Squared Error) between simulated and ground truth link flows.
 
+    Links without simulated output count as zero. Neither input frame is modified.
+
     Parameters
     ----------
     df_true : pd.DataFrame
         DataFrame containing ground truth link flows with column 'interval_nVehContrib'.
     df_simulated : pd.DataFrame
         DataFrame containing simulated link flows with column 'interval_nVehContrib'.
+    scorer : Optional[NRMSEScorer], optional
+        Scorer built on the link ids of `df_true`, in the same order. Reuse one across calls to
+        avoid rebuilding the sensor index; built from `df_true` if None.
 
     Returns
     -------
     float
         NRMSE value across all links.
     """
-    # Convert link_id columns to string
-    df_true["link_id"] = df_true["link_id"].astype(str)
-    df_simulated["link_id"] = df_simulated["link_id"].astype(str)
-    df_merged = df_true.merge(df_simulated, on="link_id", suffixes=("_GT", "_sim"), how="left")
-
-    # Fill missing simulated values with 0
-    df_merged["interval_nVehContrib_sim"] = df_merged["interval_nVehContrib_sim"].fillna(0)
-
-    # Compute squared differences
-    df_merged["diff_square"] = (df_merged["interval_nVehContrib_GT"] - df_merged["interval_nVehContrib_sim"]) ** 2
-
-    n = df_merged.shape[0]
-
-    nrmse: float = np.sqrt(n * df_merged["diff_square"].sum()) / df_merged["interval_nVehContrib_GT"].sum()
-
-    return nrmse
+    if scorer is None:
+        scorer = NRMSEScorer(df_true["link_id"])
+    gt_counts = df_true["interval_nVehContrib"].to_numpy(dtype=np.float64)
+    return float(scorer.score(scorer.align(df_simulated), gt_counts))
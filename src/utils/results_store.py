@@ -0,0 +1,180 @@
+# Standard library imports
+import sqlite3
+from pathlib import Path
+from typing import Union
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+RUN_INFO_COLUMNS = ["init_search", "epoch", "batch", "run_time", "num_train_data"]
+SENSOR_FLOW_COLUMNS = ["epoch", "batch", "link_id", "interval_nVehContrib", "interval_harmonicMeanSpeed"]
+MODEL_RUN_TIME_COLUMNS = ["epoch", "num_train_data", "run_time"]
+
+RESULTS_DB_NAME = "results.sqlite"
+
+
+class ResultsStore:
+    """
+    Append-only SQLite store of the results of one optimization run.
+
+    Holds the three result tables of the run (evaluations, simulated sensor flows, and model
+    run times). Each epoch only inserts its new rows in one transaction; the OD vector of an
+    evaluation is stored as a float64 blob instead of one column per OD pair. export_csv()
+    writes data_set.csv, sensor_flow_simul.csv and model_run_time.csv in their usual layout.
+    """
+
+    def __init__(self, db_path: Union[str, Path], dim_od: int, reset: bool = False):
+        self.db_path = Path(db_path)
+        self.dim_od = dim_od
+        if reset:
+            self.db_path.unlink(missing_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS evaluations ("
+                "init_search REAL, epoch REAL, batch REAL, run_time REAL, num_train_data REAL, loss REAL, x BLOB)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS sensor_flow ("
+                "epoch INTEGER, batch INTEGER, link_id TEXT, "
+                "interval_nVehContrib REAL, interval_harmonicMeanSpeed REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS model_run_time (epoch INTEGER, num_train_data INTEGER, run_time REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS evaluation_timeline ("
+                "epoch INTEGER, batch INTEGER, dispatch_time REAL, completion_time REAL)"
+            )
+
+    def append_evaluations(self, run_simul_info: np.ndarray, loss: np.ndarray, x: np.ndarray) -> None:
+        """
+        Append evaluations to the store.
+
+        Parameters
+        ----------
+        run_simul_info : np.ndarray
+            (n, 5) array of init_search, epoch, batch, run_time and num_train_data.
+        loss : np.ndarray
+            (n,) array of NRMSE losses.
+        x : np.ndarray
+            (n, dim_od) array of OD vectors.
+        """
+        run_simul_info = np.asarray(run_simul_info, dtype=np.float64).reshape(-1, len(RUN_INFO_COLUMNS))
+        loss = np.asarray(loss, dtype=np.float64).reshape(-1)
+        x = np.ascontiguousarray(x, dtype=np.float64).reshape(-1, self.dim_od)
+        rows = [(*map(float, info), float(l), x_i.tobytes()) for info, l, x_i in zip(run_simul_info, loss, x)]
+        with self.conn:
+            self.conn.executemany("INSERT INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def append_sensor_flow(self, link_stats: pd.DataFrame) -> None:
+        """Append simulated sensor link statistics with epoch and batch columns."""
+        rows = link_stats[SENSOR_FLOW_COLUMNS].astype({"link_id": str}).itertuples(index=False, name=None)
+        with self.conn:
+            self.conn.executemany("INSERT INTO sensor_flow VALUES (?, ?, ?, ?, ?)", rows)
+
+    def append_model_run_time(self, epoch: int, num_train_data: int, run_time: float) -> None:
+        """Append the suggestion time of the optimization model for one epoch."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO model_run_time VALUES (?, ?, ?)", (int(epoch), int(num_train_data), float(run_time))
+            )
+
+    def append_timeline(self, epoch: int, batch: int, dispatch_time: float, completion_time: float) -> None:
+        """Append the wall-clock dispatch and completion times (seconds since loop start) of one evaluation."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO evaluation_timeline VALUES (?, ?, ?, ?)",
+                (int(epoch), int(batch), float(dispatch_time), float(completion_time)),
+            )
+
+    def count(self, table: str) -> int:
+        """Return the number of rows of a table."""
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def truncate(self, n_evaluations: int, n_model_runs: int) -> None:
+        """
+        Drop the rows written after a checkpoint.
+
+        Keeps the first `n_evaluations` evaluations with their sensor flows and timeline entries,
+        and the first `n_model_runs` model run times.
+        """
+        kept_evaluations = (
+            "SELECT 1 FROM evaluations e WHERE e.init_search = 0 AND e.epoch = {0}.epoch AND e.batch = {0}.batch"
+        )
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM evaluations WHERE rowid NOT IN "
+                "(SELECT rowid FROM evaluations ORDER BY rowid LIMIT ?)",
+                (int(n_evaluations),),
+            )
+            for table in ("sensor_flow", "evaluation_timeline"):
+                self.conn.execute(f"DELETE FROM {table} WHERE NOT EXISTS ({kept_evaluations.format(table)})")
+            self.conn.execute(
+                "DELETE FROM model_run_time WHERE rowid NOT IN "
+                "(SELECT rowid FROM model_run_time ORDER BY rowid LIMIT ?)",
+                (int(n_model_runs),),
+            )
+
+    def data_set(self) -> pd.DataFrame:
+        """Return all evaluations in the layout of data_set.csv."""
+        rows = self.conn.execute(
+            "SELECT init_search, epoch, batch, run_time, num_train_data, loss, x FROM evaluations ORDER BY rowid"
+        ).fetchall()
+        columns = RUN_INFO_COLUMNS + ["loss"] + [f"x_{j}" for j in range(1, self.dim_od + 1)]
+        if not rows:
+            return pd.DataFrame(columns=columns)
+
+        data_np = np.empty((len(rows), len(columns)))
+        for k, row in enumerate(rows):
+            data_np[k, :6] = row[:6]
+            data_np[k, 6:] = np.frombuffer(row[6], dtype=np.float64)
+        return pd.DataFrame(data_np, columns=columns)
+
+    def sensor_flow_simul(self) -> pd.DataFrame:
+        """Return all simulated sensor link statistics in the layout of sensor_flow_simul.csv."""
+        return pd.read_sql_query(
+            f"SELECT {', '.join(SENSOR_FLOW_COLUMNS)} FROM sensor_flow ORDER BY rowid", self.conn
+        )
+
+    def model_run_time(self) -> pd.DataFrame:
+        """Return the model run times in the layout of model_run_time.csv."""
+        return pd.read_sql_query(
+            f"SELECT {', '.join(MODEL_RUN_TIME_COLUMNS)} FROM model_run_time ORDER BY rowid", self.conn
+        )
+
+    def evaluation_timeline(self) -> pd.DataFrame:
+        """Return the dispatch and completion times of asynchronously run evaluations."""
+        return pd.read_sql_query(
+            "SELECT epoch, batch, dispatch_time, completion_time FROM evaluation_timeline ORDER BY rowid", self.conn
+        )
+
+    def export_csv(self, output_dir: Union[str, Path]) -> None:
+        """
+        Write data_set.csv, sensor_flow_simul.csv and model_run_time.csv to `output_dir`, and
+        evaluation_timeline.csv for asynchronous runs.
+        """
+        output_dir = Path(output_dir)
+        self.data_set().to_csv(output_dir / "data_set.csv", index=False)
+        self.sensor_flow_simul().to_csv(output_dir / "sensor_flow_simul.csv", index=False)
+        self.model_run_time().to_csv(output_dir / "model_run_time.csv", index=False)
+        if self.count("evaluation_timeline") > 0:
+            self.evaluation_timeline().to_csv(output_dir / "evaluation_timeline.csv", index=False)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_results_store(path_result: Union[str, Path]) -> ResultsStore:
+    """Open the results store of an existing run, reading the OD dimension from its first evaluation."""
+    db_path = Path(path_result) / RESULTS_DB_NAME
+    if not db_path.exists():
+        raise FileNotFoundError(f"Results store not found: {db_path}")
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT x FROM evaluations LIMIT 1").fetchone()
+    conn.close()
+    dim_od = 0 if row is None else len(row[0]) // np.dtype(np.float64).itemsize
+    return ResultsStore(db_path, dim_od)
@@ -0,0 +1,6 @@
+# Standard library imports
+import sys
+from pathlib import Path
+
+# Modules under src/ are imported as top-level packages, as in the entry scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
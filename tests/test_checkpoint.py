@@ -0,0 +1,52 @@
+# Standard library imports
+import random
+
+# Third-party imports
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+# Local application imports
+from optimizers.checkpoint import get_rng_state, load_checkpoint, save_checkpoint, set_rng_state
+from optimizers.evaluation_history import EvaluationHistory
+
+
+def draw() -> tuple:
+    return random.random(), np.random.rand(3).tolist(), torch.rand(3).tolist()
+
+
+def test_checkpoint_restores_history_and_rng_state(tmp_path):
+    assert load_checkpoint(tmp_path, "vanillabo", 2) is None
+
+    history = EvaluationHistory(2, ["10", "11"])
+    history.append(np.zeros((1, 5)), np.array([0.5]), np.array([[1.0, 2.0]]), np.ones((1, 2, 2)))
+    random.seed(0)
+    np.random.seed(0)
+    torch.manual_seed(0)
+    save_checkpoint(
+        tmp_path,
+        {
+            "epoch": 3,
+            "model_name": "vanillabo",
+            "dim_od": 2,
+            "history": history.state_dict(),
+            "strategy": {},
+            "rng": get_rng_state(),
+        },
+    )
+    expected = draw()
+    assert [path.name for path in tmp_path.iterdir()] == ["checkpoint.pt"]
+
+    checkpoint = load_checkpoint(tmp_path, "vanillabo", 2)
+    set_rng_state(checkpoint["rng"])
+    assert draw() == expected
+
+    restored = EvaluationHistory(2, ["10", "11"])
+    restored.load_state_dict(checkpoint["history"])
+    assert checkpoint["epoch"] == 3
+    np.testing.assert_array_equal(restored.X, history.X)
+    np.testing.assert_array_equal(restored.counts, history.counts)
+
+    with pytest.raises(ValueError, match="belongs to model vanillabo"):
+        load_checkpoint(tmp_path, "turbo", 2)
@@ -0,0 +1,41 @@
+# Standard library imports
+from pathlib import Path
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local application imports
+from simulation.data_loader import build_gt_store, load_gt_store, load_sensor_gt, load_sensor_gt_matrix
+
+NETWORK_NAME = "testnet"
+
+# Two targets listing overlapping sensors in different orders, as in the 3junction files
+GT_FILES = {
+    (221008, "08-09"): pd.DataFrame({"link_id": ["b", "a", "c"], "interval_nVehContrib": [20.0, 10.0, 30.0]}),
+    (221009, "17-18"): pd.DataFrame({"link_id": ["c", "d", "a"], "interval_nVehContrib": [31.0, 41.0, 11.0]}),
+}
+
+
+def write_gt_files(base_path: Path) -> None:
+    for (date, hour), gt_df in GT_FILES.items():
+        date_dir = base_path / "sensor_data" / str(date)
+        date_dir.mkdir(parents=True, exist_ok=True)
+        gt_df.to_csv(date_dir / f"gt_link_data_{NETWORK_NAME}_{date}_{hour}.csv", index=False)
+
+
+def test_gt_store_reads_targets_in_csv_row_order(tmp_path):
+    write_gt_files(tmp_path)
+    from_csv = {target: load_sensor_gt(str(tmp_path), NETWORK_NAME, *target) for target in GT_FILES}
+    targets_csv, matrix_csv, link_ids_csv = load_sensor_gt_matrix(str(tmp_path), NETWORK_NAME)
+
+    build_gt_store(str(tmp_path), NETWORK_NAME)
+    assert load_gt_store(str(tmp_path), NETWORK_NAME) is not None
+
+    for target, gt_df in from_csv.items():
+        pd.testing.assert_frame_equal(load_sensor_gt(str(tmp_path), NETWORK_NAME, *target), gt_df)
+
+    targets_store, matrix_store, link_ids_store = load_sensor_gt_matrix(str(tmp_path), NETWORK_NAME)
+    assert link_ids_store == link_ids_csv == ["b", "a", "c", "d"]
+    pd.testing.assert_frame_equal(targets_store, targets_csv)
+    np.testing.assert_array_equal(matrix_store, matrix_csv)
@@ -0,0 +1,64 @@
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local application imports
+from optimizers.evaluation_history import EvaluationHistory
+
+DIM_OD = 4
+LINK_IDS = ["10", "11", "12"]
+
+
+def make_batch(rng: np.random.Generator, epoch: int, n: int) -> tuple:
+    run_info = np.column_stack([np.zeros(n), np.full(n, epoch), np.arange(1, n + 1), rng.random(n), np.zeros(n)])
+    link_flow = rng.random((n, 2, len(LINK_IDS)))
+    link_flow[0, :, 1] = np.nan  # a sensor without output
+    return run_info, rng.random(n), rng.random((n, DIM_OD)), link_flow
+
+
+@pytest.mark.parametrize("use_memmap", [False, True])
+def test_append_grows_past_capacity(tmp_path, use_memmap):
+    rng = np.random.default_rng(0)
+    history = EvaluationHistory(DIM_OD, LINK_IDS, capacity=2, memmap_dir=tmp_path if use_memmap else None)
+    batches = [make_batch(rng, epoch, n) for epoch, n in enumerate([3, 1, 5])]
+    for batch in batches:
+        history.append(*batch)
+
+    assert history.n == 9 and history.capacity == 9
+    np.testing.assert_array_equal(history.run_info, np.concatenate([b[0] for b in batches]))
+    np.testing.assert_array_equal(history.loss, np.concatenate([b[1] for b in batches]))
+    np.testing.assert_array_equal(history.X, np.concatenate([b[2] for b in batches]))
+    link_flow = np.concatenate([b[3] for b in batches])
+    np.testing.assert_array_equal(history.counts, link_flow[:, 0])
+    np.testing.assert_array_equal(history.speeds, link_flow[:, 1])
+    if use_memmap:
+        # Arrays of the outgrown capacities are deleted
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "counts_9.dat", "loss_9.dat", "run_info_9.dat", "speeds_9.dat", "x_9.dat"
+        ]
+
+    stats = history.link_stats_frame(start=4)
+    assert len(stats) == 5 * len(LINK_IDS) - 1
+    assert stats[["epoch", "batch", "link_id"]].iloc[:2].values.tolist() == [[2, 1, "10"], [2, 1, "12"]]
+    history.close()
+    assert not list(tmp_path.iterdir())
+
+
+def test_load_state_dict_reorders_sensors():
+    rng = np.random.default_rng(1)
+    history = EvaluationHistory(DIM_OD, LINK_IDS)
+    history.append(*make_batch(rng, 1, 3))
+    state = history.state_dict()
+
+    reordered = EvaluationHistory(DIM_OD, ["12", "10", "11"])
+    reordered.load_state_dict(state)
+
+    np.testing.assert_array_equal(reordered.X, history.X)
+    np.testing.assert_array_equal(reordered.counts, history.counts[:, [2, 0, 1]])
+    np.testing.assert_array_equal(reordered.speeds, history.speeds[:, [2, 0, 1]])
+    assert reordered.link_stats_frame().sort_values(["batch", "link_id"]).reset_index(drop=True).equals(
+        history.link_stats_frame().sort_values(["batch", "link_id"]).reset_index(drop=True)
+    )
+
+    with pytest.raises(ValueError, match="different set of sensors"):
+        EvaluationHistory(DIM_OD, ["10", "11", "13"]).load_state_dict(state)
@@ -0,0 +1,145 @@
+# Standard library imports
+import os
+import queue
+import signal
+import time
+
+# Third-party imports
+import pytest
+
+# Local application imports
+import simulation.executor as executor
+from simulation.executor import EvaluationExecutor
+from simulation.sumo_runner import TransientSimulationError
+from simulation.worker_pool import EvaluationPool
+
+_ATTEMPTS: dict = {}  # per worker process: evaluation i -> attempts made
+
+
+def flaky_evaluation(i: int, failures: int, error: type, sleep: float = 0.0):
+    """Raise `error` on the first `failures` attempts of evaluation `i`, then return i * 10."""
+    time.sleep(sleep)
+    _ATTEMPTS[i] = _ATTEMPTS.get(i, 0) + 1
+    if _ATTEMPTS[i] <= failures:
+        raise error(f"attempt {_ATTEMPTS[i]} of evaluation {i}")
+    return i * 10
+
+
+def hanging_evaluation(pid_file: str):
+    """Write the worker pid to `pid_file` and never return."""
+    with open(pid_file, "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(300)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Registered before the pool forks its workers
+    monkeypatch.setitem(executor.EVALUATION_FUNCTIONS, "flaky", flaky_evaluation)
+    monkeypatch.setitem(executor.EVALUATION_FUNCTIONS, "hang", hanging_evaluation)
+    pool = EvaluationPool(2, {"link_selection": []})
+    yield pool
+    pool.terminate()
+    pool.join()
+
+
+def test_transient_errors_are_retried(pool):
+    exe = EvaluationExecutor(pool, {"sim_retries": 1})
+    records = exe.map([
+        ("flaky", (0,), (0, 0, TransientSimulationError)),
+        ("flaky", (1,), (1, 1, TransientSimulationError)),
+        ("flaky", (2,), (2, 2, TransientSimulationError)),
+        ("flaky", (3,), (3, 2, TimeoutError)),
+    ])
+
+    assert [(r.key, r.status, r.attempts, r.result) for r in records] == [
+        ((0,), "ok", 1, 0),
+        ((1,), "ok", 2, 10),
+        ((2,), "failed", 2, None),
+        ((3,), "timeout", 2, None),
+    ]
+    assert records[2].error == "TransientSimulationError: attempt 2 of evaluation 2"
+
+
+def test_other_errors_are_raised(pool):
+    exe = EvaluationExecutor(pool, {"sim_retries": 3})
+    with pytest.raises(ValueError, match="attempt 1 of evaluation 0"):
+        exe.map([("flaky", (0,), (0, 1, ValueError))])
+
+
+def test_queued_time_does_not_count_towards_the_deadline(pool):
+    exe = EvaluationExecutor(pool, {"sim_timeout": 0.2}, grace=0.4)
+    # Three 0.4 s tasks on two workers: the last one finishes 0.8 s after submission
+    records = exe.map([("flaky", (i,), (i, 0, ValueError, 0.4)) for i in range(3)])
+
+    assert [r.status for r in records] == ["ok", "ok", "ok"]
+
+
+def test_overdue_worker_is_terminated_and_replaced(pool, tmp_path):
+    pid_file = tmp_path / "pid"
+    exe = EvaluationExecutor(pool, {"sim_timeout": 0.2}, grace=0.3)
+    records = exe.map([("hang", ("hang",), (str(pid_file),)), ("flaky", (0,), (0, 0, ValueError))])
+
+    assert [(r.key, r.status) for r in records] == [(("hang",), "timeout"), ((0,), "ok")]
+    pid = int(pid_file.read_text())
+    wait_until = time.time() + 5.0
+    while time.time() < wait_until:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail(f"Worker {pid} still running")
+
+    # The pool still runs tasks on both workers
+    assert [r.status for r in exe.map([("flaky", (i,), (i, 0, ValueError)) for i in range(2)])] == ["ok", "ok"]
+
+
+class QueuePool:
+    """Stand-in for an EvaluationPool that only provides the task start queue."""
+
+    def __init__(self):
+        self.task_starts = queue.Queue()
+
+
+@pytest.fixture
+def signals(monkeypatch):
+    sent = []
+    monkeypatch.setattr(executor, "_send_signal", lambda pid, signum: sent.append((pid, signum)))
+    monkeypatch.setattr(executor, "TERMINATE_GRACE", 0.0)
+    monkeypatch.setattr(executor, "REPORT_WAIT", 0.05)
+    monkeypatch.setattr(executor, "_TASK_STARTS", {})
+    monkeypatch.setattr(executor, "_WORKER_TASKS", {})
+    return sent
+
+
+def wait_for(sent, n, timeout=2.0):
+    wait_until = time.time() + timeout
+    while len(sent) < n and time.time() < wait_until:
+        time.sleep(0.01)
+    return sent
+
+
+def test_terminate_worker_still_running_the_task(signals):
+    pool = QueuePool()
+    exe = EvaluationExecutor(pool, {"sim_timeout": 1})
+    pool.task_starts.put((7, 4242, time.time()))
+
+    exe._terminate_worker(7)
+
+    assert wait_for(signals, 2) == [(4242, signal.SIGTERM), (4242, signal.SIGKILL)]
+
+
+def test_terminate_worker_skips_worker_with_queued_report_of_next_task(signals):
+    pool = QueuePool()
+    exe = EvaluationExecutor(pool, {"sim_timeout": 1})
+    pool.task_starts.put((7, 4242, time.time()))
+    executor.collect_task_starts(pool.task_starts)
+    # The worker finished task 7 and started task 8, but the report has not been read yet
+    pool.task_starts.put((8, 4242, time.time()))
+
+    exe._terminate_worker(7)
+
+    assert wait_for(signals, 1, timeout=0.2) == []
+    assert executor._WORKER_TASKS[4242] == 8
@@ -0,0 +1,72 @@
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local application imports
+from utils.link_flow_analysis import NRMSEScorer, compute_nrmse_counts_all_links, score_sensor_flow_simul
+
+LINK_IDS = [101, 102, 103, 104, 105]
+
+
+def merge_nrmse(df_true: pd.DataFrame, df_simulated: pd.DataFrame) -> float:
+    """Previous merge-based compute_nrmse_counts_all_links, kept as the reference."""
+    df_true = df_true.assign(link_id=df_true["link_id"].astype(str))
+    df_simulated = df_simulated.assign(link_id=df_simulated["link_id"].astype(str))
+    df_merged = df_true.merge(df_simulated, on="link_id", suffixes=("_GT", "_sim"), how="left")
+    df_merged["interval_nVehContrib_sim"] = df_merged["interval_nVehContrib_sim"].fillna(0)
+    df_merged["diff_square"] = (df_merged["interval_nVehContrib_GT"] - df_merged["interval_nVehContrib_sim"]) ** 2
+    n = df_merged.shape[0]
+    return np.sqrt(n * df_merged["diff_square"].sum()) / df_merged["interval_nVehContrib_GT"].sum()
+
+
+def simulated_links(rng: np.random.Generator) -> pd.DataFrame:
+    # Link 104 has no output, and link 999 is not a sensor
+    return pd.DataFrame({
+        "link_id": ["103", "101", "105", "102", "999"],
+        "interval_nVehContrib": rng.integers(0, 500, 5).astype(float),
+        "interval_harmonicMeanSpeed": rng.random(5),
+    })
+
+
+def test_scorer_matches_merge_based_nrmse():
+    rng = np.random.default_rng(0)
+    df_true = pd.DataFrame({"link_id": LINK_IDS, "interval_nVehContrib": rng.integers(1, 500, 5).astype(float)})
+    batch = [simulated_links(rng) for _ in range(4)]
+    expected = np.array([merge_nrmse(df_true, df_sim) for df_sim in batch])
+
+    df_true_before, df_sim_before = df_true.copy(), batch[0].copy()
+    losses = [compute_nrmse_counts_all_links(df_true, df_sim) for df_sim in batch]
+    np.testing.assert_allclose(losses, expected, rtol=1e-12)
+    pd.testing.assert_frame_equal(df_true, df_true_before)
+    pd.testing.assert_frame_equal(batch[0], df_sim_before)
+
+    scorer = NRMSEScorer(LINK_IDS)
+    sim_counts = np.stack([scorer.align(df_sim) for df_sim in batch])
+    np.testing.assert_allclose(scorer.score(sim_counts, df_true["interval_nVehContrib"].to_numpy()), expected)
+
+
+def test_scorer_skips_sensors_without_gt_per_target():
+    rng = np.random.default_rng(1)
+    # Target 1 has no GT for link 102, target 2 none for 104 and 105
+    gt_counts = rng.integers(1, 500, (3, 5)).astype(float)
+    gt_counts[1, 1] = np.nan
+    gt_counts[2, 3:] = np.nan
+    sensor_flow_simul = pd.concat(
+        [simulated_links(rng).assign(epoch=epoch, batch=batch) for epoch in (1, 2) for batch in (1, 2)],
+        ignore_index=True,
+    )
+
+    losses = score_sensor_flow_simul(sensor_flow_simul, gt_counts, LINK_IDS, target_names=["a", "b", "c"])
+
+    assert losses[["epoch", "batch"]].values.tolist() == [[1, 1], [1, 2], [2, 1], [2, 2]]
+    for k, name in enumerate(["a", "b", "c"]):
+        valid = ~np.isnan(gt_counts[k])
+        df_true = pd.DataFrame({
+            "link_id": np.array(LINK_IDS)[valid],
+            "interval_nVehContrib": gt_counts[k, valid],
+        })
+        expected = [
+            merge_nrmse(df_true, df_sim)
+            for _, df_sim in sensor_flow_simul.groupby(["epoch", "batch"])
+        ]
+        np.testing.assert_allclose(losses[name], expected, rtol=1e-12)
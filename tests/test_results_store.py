@@ -0,0 +1,64 @@
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local application imports
+from utils.results_store import RESULTS_DB_NAME, ResultsStore, open_results_store
+
+DIM_OD = 3
+
+
+def sensor_flow(epoch: int, batch: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "epoch": epoch,
+        "batch": batch,
+        "link_id": ["10", "11"],
+        "interval_nVehContrib": [100.0 * epoch + batch, 5.0],
+        "interval_harmonicMeanSpeed": [12.5, 13.5],
+    })
+
+
+def write_epoch(store: ResultsStore, epoch: int, rng: np.random.Generator) -> None:
+    """Append two evaluations of `epoch` (epoch 0 is the initial search) with their side tables."""
+    init_search = 1 if epoch == 0 else 0
+    run_info = np.array([[init_search, epoch, batch, 1.5 + batch, 2 * epoch] for batch in range(1, 3)])
+    store.append_evaluations(run_info, rng.random(2), rng.random((2, DIM_OD)))
+    if epoch > 0:
+        store.append_model_run_time(epoch, 2 * epoch, 0.25 * epoch)
+        for batch in range(1, 3):
+            store.append_sensor_flow(sensor_flow(epoch, batch))
+            store.append_timeline(epoch, batch, epoch + 0.1, epoch + 0.9)
+
+
+def test_truncate_and_export_csv_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    store = ResultsStore(tmp_path / RESULTS_DB_NAME, DIM_OD, reset=True)
+    for epoch in range(3):
+        write_epoch(store, epoch, rng)
+    expected = {
+        "data_set": store.data_set().iloc[:4],
+        "sensor_flow_simul": store.sensor_flow_simul().iloc[:4],
+        "model_run_time": store.model_run_time().iloc[:1],
+        "evaluation_timeline": store.evaluation_timeline().iloc[:2],
+    }
+
+    # Back to the checkpoint after epoch 1, then epoch 2 runs again
+    store.truncate(n_evaluations=4, n_model_runs=1)
+    for name, frame in expected.items():
+        pd.testing.assert_frame_equal(getattr(store, name)(), frame)
+    write_epoch(store, 2, rng)
+    store.close()
+
+    store = open_results_store(tmp_path)
+    assert store.dim_od == DIM_OD
+    assert store.count("evaluations") == 6
+    store.export_csv(tmp_path)
+    for name in expected:
+        from_csv = pd.read_csv(tmp_path / f"{name}.csv", dtype={"link_id": str})
+        pd.testing.assert_frame_equal(from_csv, getattr(store, name)(), check_dtype=False)
+    data_set = pd.read_csv(tmp_path / "data_set.csv")
+    assert list(data_set.columns) == [
+        "init_search", "epoch", "batch", "run_time", "num_train_data", "loss", "x_1", "x_2", "x_3"
+    ]
+    assert data_set["epoch"].tolist() == [0, 0, 1, 1, 2, 2]
+    store.close()
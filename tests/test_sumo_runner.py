@@ -0,0 +1,52 @@
+# Standard library imports
+import gzip
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local application imports
+from simulation.sumo_runner import write_trips_xml
+from simulation.trip_generator import TRIP_COLUMNS, VEHICLE_COLUMNS
+
+
+def write_trips_to_xml_pretty(trips_df: pd.DataFrame, attr_cols: list[str], tag: str) -> bytes:
+    """Previous ElementTree/minidom writer, kept as the reference layout."""
+    root = ET.Element("routes")
+    for _, row in trips_df.iterrows():
+        ET.SubElement(root, tag, {col: str(row[col]) for col in attr_cols})
+    return minidom.parseString(ET.tostring(root, encoding="utf-8")).toprettyxml(indent="\t", encoding="utf-8")
+
+
+def make_trips(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    trips_df = pd.DataFrame({
+        "id": [f"{k // 3}_{k % 3}" for k in range(n)],
+        "depart": np.char.mod("%.2f", np.sort(rng.uniform(0, 3600, n))),
+        "from": rng.choice(["509747331", "-8923686#1", "a&b"], n),
+        "to": rng.choice(["8923686", 'quote"d', "<edge>"], n),
+        "type": "DEFAULT_VEHTYPE",
+        "fromTaz": "taz_0",
+        "toTaz": rng.choice(["taz_1", "taz_60"], n),
+        "departLane": "free",
+        "departSpeed": "max",
+    })
+    trips_df["route"] = trips_df["from"] + "_" + trips_df["to"]
+    return trips_df
+
+
+@pytest.mark.parametrize("attr_cols, tag", [(TRIP_COLUMNS, "trip"), (VEHICLE_COLUMNS, "vehicle")])
+def test_write_trips_xml_matches_minidom_output(tmp_path, attr_cols, tag):
+    trips_df = make_trips(250)
+    expected = write_trips_to_xml_pretty(trips_df, attr_cols, tag)
+
+    # Chunks of 100 trips, the last one partial
+    write_trips_xml(trips_df, tmp_path / "trips.xml", attr_cols, chunk_size=100, tag=tag)
+    assert (tmp_path / "trips.xml").read_bytes() == expected
+
+    write_trips_xml(trips_df, tmp_path / "trips.xml.gz", attr_cols, tag=tag)
+    with gzip.open(tmp_path / "trips.xml.gz", "rb") as f:
+        assert f.read() == expected
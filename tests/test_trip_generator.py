@@ -0,0 +1,176 @@
+# Standard library imports
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local application imports
+from simulation.data_loader import od_interval_xml_to_df
+from simulation.sumo_runner import assign_trip_routes
+from simulation.trip_generator import (
+    STREAM_ROUTE,
+    STREAM_SOURCE,
+    CommonRandomNumbers,
+    TripBlockCache,
+    draw_uniform,
+    generate_trips_df,
+    grouped_cumulative_weights,
+    sample_from_groups,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = Path(__file__).resolve().parent / "data"
+TAZ_XML = REPO_ROOT / "network" / "network_1ramp" / "taz.xml"
+JUNCTION_DIR = REPO_ROOT / "network" / "network_3junction"
+JUNCTION_TAZ_XML = JUNCTION_DIR / "taz.xml"
+
+# Fixture generated with:
+#   od2trips --spread.uniform --taz-files network/network_1ramp/taz.xml
+#            --tazrelation-files tests/data/od2trips_1ramp_od.xml -o tests/data/od2trips_1ramp_trips.xml
+OD_XML = DATA_DIR / "od2trips_1ramp_od.xml"
+OD2TRIPS_XML = DATA_DIR / "od2trips_1ramp_trips.xml"
+
+BIN_SEC = 300
+
+
+def read_od(od_xml: Path) -> tuple[pd.DataFrame, float, float]:
+    interval = ET.parse(od_xml).getroot().find("interval")
+    od_df = pd.DataFrame([rel.attrib for rel in interval.iter("tazRelation")])
+    od_df["count"] = od_df["count"].astype(float)
+    return od_df, float(interval.get("begin")), float(interval.get("end"))
+
+
+def read_trips(trips_xml: Path) -> pd.DataFrame:
+    trips_df = pd.DataFrame([trip.attrib for trip in ET.parse(trips_xml).getroot().iter("trip")])
+    trips_df["depart"] = trips_df["depart"].astype(float)
+    return trips_df
+
+
+def binned_counts(trips_df: pd.DataFrame) -> pd.Series:
+    """Number of trips per (fromTaz, toTaz, from, to, departure bin)."""
+    depart_bin = (trips_df["depart"].astype(float) // BIN_SEC).astype(int).rename("bin")
+    return trips_df.groupby(["fromTaz", "toTaz", "from", "to", depart_bin]).size().sort_index()
+
+
+def test_generate_trips_df_matches_od2trips():
+    od_df, begin, end = read_od(OD_XML)
+    expected = read_trips(OD2TRIPS_XML)
+
+    trips_df = generate_trips_df(od_df, TAZ_XML, begin, end, np.random.default_rng(0))
+
+    assert len(trips_df) == len(expected)
+    pd.testing.assert_series_equal(
+        trips_df.groupby(["fromTaz", "toTaz"]).size(),
+        expected.groupby(["fromTaz", "toTaz"]).size(),
+    )
+    pd.testing.assert_series_equal(binned_counts(trips_df), binned_counts(expected))
+
+
+def test_sample_from_groups_rejects_group_without_entries():
+    # Groups 0 and 2 have entries, group 1 has none
+    cum_table = grouped_cumulative_weights(np.array([0, 0, 2]), np.array([1.0, 3.0, 1.0]))
+
+    assert sample_from_groups(cum_table, np.array([0, 0, 2]), np.array([0.1, 0.9, 0.5])).tolist() == [0, 1, 2]
+    with pytest.raises(ValueError):
+        sample_from_groups(cum_table, np.array([0, 1]), np.array([0.5, 0.5]))
+    with pytest.raises(ValueError):
+        sample_from_groups(np.zeros(0), np.array([0]), np.array([0.5]))
+
+
+def test_grouped_cumulative_weights_rejects_zero_weight_group():
+    with pytest.raises(ValueError):
+        grouped_cumulative_weights(np.array([0, 1, 1]), np.array([1.0, 0.0, 0.0]))
+
+
+def test_generate_trips_df_rejects_taz_without_sources():
+    # taz_1 only has a tazSink
+    od_df = pd.DataFrame({"from": ["taz_0", "taz_1"], "to": ["taz_1", "taz_49"], "count": [5.0, 3.0]})
+
+    with pytest.raises(ValueError, match="taz_1"):
+        generate_trips_df(od_df, TAZ_XML, 0.0, 3600.0, np.random.default_rng(0))
+
+
+def test_common_random_numbers_depend_only_on_seed_stream_od_and_vehicle():
+    od_idx = np.array([0, 0, 3, 7, 7, 7])
+    veh_idx = np.array([0, 1, 0, 0, 1, 2])
+    u = draw_uniform(CommonRandomNumbers(seed=5), STREAM_SOURCE, od_idx, veh_idx)
+
+    assert u.shape == (6,) and np.all((u >= 0) & (u < 1))
+    # Same draws from a new instance, in any order and batch composition
+    np.testing.assert_array_equal(draw_uniform(CommonRandomNumbers(seed=5), STREAM_SOURCE, od_idx, veh_idx), u)
+    np.testing.assert_array_equal(
+        CommonRandomNumbers(seed=5).uniform(STREAM_SOURCE, od_idx[::-1][:4], veh_idx[::-1][:4]), u[::-1][:4]
+    )
+    # Other seeds and streams give other draws
+    assert not np.any(CommonRandomNumbers(seed=6).uniform(STREAM_SOURCE, od_idx, veh_idx) == u)
+    assert not np.any(CommonRandomNumbers(seed=5).uniform(STREAM_ROUTE, od_idx, veh_idx) == u)
+
+
+def junction_od(seed: int) -> tuple[pd.DataFrame, float, float]:
+    """OD relations of the 3junction network with random fractional counts."""
+    od_df, begin, end = od_interval_xml_to_df(JUNCTION_DIR / "od.xml")
+    od_df["count"] = np.random.default_rng(seed).uniform(0.0, 40.0, len(od_df))
+    return od_df, begin, end
+
+
+def test_common_random_numbers_keep_trips_of_unchanged_relations():
+    od_df, begin, end = junction_od(0)
+    trips_df = generate_trips_df(od_df, JUNCTION_TAZ_XML, begin, end, CommonRandomNumbers(seed=1))
+
+    # Add vehicles to the relation whose trips use the most source edges
+    k = trips_df.groupby("od_idx")["from"].nunique().idxmax()
+    changed_df = od_df.copy()
+    changed_df.loc[k, "count"] += 5
+    changed_trips_df = generate_trips_df(changed_df, JUNCTION_TAZ_XML, begin, end, CommonRandomNumbers(seed=1))
+
+    # Reproducible for the same OD matrix and seed
+    pd.testing.assert_frame_equal(
+        generate_trips_df(od_df, JUNCTION_TAZ_XML, begin, end, CommonRandomNumbers(seed=1)), trips_df
+    )
+    # Relations with unchanged counts keep every trip
+    columns = ["depart", "from", "to"]
+    unchanged = trips_df[trips_df["od_idx"] != k].set_index("id")
+    pd.testing.assert_frame_equal(
+        changed_trips_df[changed_trips_df["od_idx"] != k].set_index("id").loc[unchanged.index, columns],
+        unchanged[columns],
+    )
+    # The changed relation keeps the edges of its first vehicles
+    first = trips_df[trips_df["od_idx"] == k].set_index("veh_idx")[["from", "to"]].sort_index()
+    resized = changed_trips_df[changed_trips_df["od_idx"] == k].set_index("veh_idx")[["from", "to"]].sort_index()
+    assert len(resized) == len(first) + 5
+    pd.testing.assert_frame_equal(resized.iloc[: len(first)], first)
+
+
+def test_trip_block_cache_matches_full_regeneration(capsys):
+    od_df, begin, end = junction_od(1)
+    routes_df = pd.read_csv(JUNCTION_DIR / "routes_multiple.csv", index_col=0)
+    rng = CommonRandomNumbers(seed=2)
+    cache = TripBlockCache(max_entries=2)
+
+    def generate(counts: np.ndarray) -> tuple[pd.DataFrame, pd.DataFrame]:
+        candidate_df = od_df.assign(count=counts)
+        cached = cache.generate(
+            candidate_df,
+            JUNCTION_TAZ_XML,
+            begin,
+            end,
+            rng,
+            route_fn=lambda new_trips: assign_trip_routes(new_trips, routes_df, "multiple", rng),
+        )
+        full = assign_trip_routes(
+            generate_trips_df(candidate_df, JUNCTION_TAZ_XML, begin, end, rng), routes_df, "multiple", rng
+        )
+        return cached, full.reset_index(drop=True)
+
+    counts = od_df["count"].to_numpy()
+    candidates = [counts, counts + np.where(np.arange(len(counts)) % 7 == 0, 3.5, 0.0)]
+    candidates += [candidates[1] * np.where(np.arange(len(counts)) == 4, 0.0, 1.0), counts]
+    for k, candidate in enumerate(candidates):
+        cached, full = generate(candidate)
+        pd.testing.assert_frame_equal(cached, full, obj=f"candidate {k}")
+    # Later candidates only regenerate the relations that differ from their closest cached parent
+    regenerated = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Regenerated")]
+    assert [int(line.split()[1]) for line in regenerated] == [44, 7, 1, 7]
@@ -1,6 +1,7 @@
 # Standard library imports
 import argparse
 import subprocess
+import sys
 import xml.etree.ElementTree as ET
 from pathlib import Path
 from typing import Optional
@@ -48,6 +49,7 @@ def run_sumo_gui(
     batch: int,
     network_name: str,
     overwrite: bool = False,
+    replay_cmd: Optional[list] = None,
 ):
     """
     Launch SUMO-GUI for a specific epoch and batch.
@@ -64,6 +66,8 @@ def run_sumo_gui(
         Name of the network folder to locate net.xml and additional.xml.
     overwrite : bool
         Whether to overwrite the original route file or create a sorted copy.
+    replay_cmd : Optional[list]
+        Command that re-simulates this evaluation with vehroutes output, run if the route file is missing.
     """
     experiment_path = Path(experiment_path)
 
@@ -88,6 +92,11 @@ def run_sumo_gui(
     net_file = network_folder / "net.xml"
     additional_file = network_folder / "additional.xml"
 
+    # Regenerate the route file on demand (optimization runs do not write vehroutes by default)
+    if not route_file.exists() and replay_cmd is not None:
+        print(f"[Info] Route file not found, replaying the evaluation: {' '.join(replay_cmd)}")
+        subprocess.run(replay_cmd, check=True)
+
     # Check existence
     if not route_file.exists():
         raise FileNotFoundError(f"Route file not found: {route_file}")
@@ -253,12 +262,37 @@ def main():
 
     experiment_path = matching_folders[0]
 
+    # Optimization runs can regenerate a missing vehroutes file by replaying the evaluation
+    replay_cmd = None
+    if args.mode == "full_optimization":
+        replay_cmd = [
+            sys.executable,
+            "src/replay_run.py",
+            "--network_name",
+            args.network_name,
+            "--model_name",
+            args.model_name,
+            "--seed",
+            str(args.seed),
+            "--epoch",
+            str(args.epoch),
+            "--batch",
+            str(args.batch),
+            "--date",
+            str(args.date),
+            "--hour",
+            args.hour,
+            "--routes_per_od",
+            args.routes_per_od,
+        ]
+
     run_sumo_gui(
         experiment_path=Path(experiment_path),
         epoch=args.epoch,
         batch=args.batch,
         network_name=args.network_name,
         overwrite=args.overwrite,
+        replay_cmd=replay_cmd,
     )
 
 